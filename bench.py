@@ -0,0 +1,339 @@
+
+"""
+Offline benchmarks of the scraper and the update/alert pipeline.
+
+Fixture UniSat market and detail pages are served from a local aiohttp server, so
+nothing touches unisat.io. Recorded pages can be dropped into BENCH_FIXTURES_DIR
+as market.html / detail.html (the string {TICK} is replaced per rune); otherwise
+pages are generated from the selectors and response keys in runescrape.py.
+
+Every case prints one JSON line with throughput, p50/p99 latency and peak RSS:
+
+    python bench.py --sizes 10 100 1000 --concurrency 1 4 16 --output bench_output.txt
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import tempfile
+import inspect
+import contextlib
+
+from typing import Dict, List
+from urllib.parse import unquote
+from aiohttp import web
+
+# Keep the bot's databases out of the working directory before anything imports it
+BENCH_DIR = tempfile.mkdtemp(prefix='runescrape-bench-')
+os.environ.setdefault('PRICE_DATABASE_PATH', os.path.join(BENCH_DIR, 'runes_db.json'))
+os.environ.setdefault('HISTORY_DATABASE_PATH', os.path.join(BENCH_DIR, 'history.sqlite3'))
+os.environ.setdefault('DISCOVERY_STATE_PATH', os.path.join(BENCH_DIR, 'discovery_state.json'))
+
+import runescrape
+
+from history import PriceHistory
+from persistence import DbStore
+from price_window import PriceWindow
+from stats import StreamingStats
+from sats_to_usd import RATES
+
+
+# Config variables
+BENCH_FIXTURES_DIR = os.getenv('BENCH_FIXTURES_DIR')
+BENCH_SIZES = [10, 100, 1000] # runes per scrape case
+BENCH_CONCURRENCY = [1, 4, 16] # pages (or connections) per scrape case
+BENCH_DB_SIZES = [100, 1000, 10000] # runes per update/alert case
+BENCH_REPEATS = 20 # timed calls per update/alert case
+BENCH_RATE = 0.00065 # USD per sat used instead of CoinGecko
+
+
+def selector_to_html(selector: str, text: str) -> str:
+    """Nested elements matched by a `a > b:nth-child(n) > c` selector, innermost holding `text`.
+    """
+    html = text
+    for compound in reversed(selector.split(" > ")):
+        tag = re.match(r"[a-z0-9]*", compound).group(0) or "div"
+        element_id = re.search(r"#([\w-]+)", compound)
+        classes = re.findall(r"\.([\w-]+)", compound)
+        nth_child = re.search(r":nth-child\((\d+)\)", compound)
+
+        attrs = f' id="{element_id.group(1)}"' if element_id else ""
+        attrs += f' class="{" ".join(classes)}"' if classes else ""
+        siblings = "<div></div>"*(int(nth_child.group(1)) - 1) if nth_child else ""
+        html = f"{siblings}<{tag}{attrs}>{html}</{tag}>"
+    return html
+
+def fixture_page(selectors: List[str], texts: List[str], payload: dict) -> str:
+    """Page with one element per selector plus an embedded `__NEXT_DATA__` payload.
+    """
+    body = "".join(selector_to_html(selector, text) for selector, text in zip(selectors, texts))
+    next_data = json.dumps({'props': {'pageProps': payload}})
+    return (f"<html><head><title>bench</title></head><body>{body}"
+            f'<script id="__NEXT_DATA__" type="application/json">{next_data}</script></body></html>')
+
+def load_fixtures() -> Dict[str, str]:
+    """Market and detail page templates; {TICK} is replaced by the rune's ticker.
+    """
+    fixtures = {
+        'market': fixture_page(runescrape.PRICE_VOLUME_SELECTOR_LIST, ["1.234 sats", "5.67 BTC"],
+                               {'tick': '{TICK}', 'curPrice': 1.234, 'btcVolume24h': 5.67}),
+        'detail': fixture_page(runescrape.MINT_AMOUNT_SELECTOR_LIST, ["1,000"],
+                               {'tick': '{TICK}', 'amountPerMint': 1000})
+        }
+    if BENCH_FIXTURES_DIR:
+        for name in fixtures:
+            path = os.path.join(BENCH_FIXTURES_DIR, f"{name}.html")
+            if os.path.exists(path):
+                with open(path, 'r') as file:
+                    fixtures[name] = file.read()
+    return fixtures
+
+class FixtureServer:
+    """Local stand-in for unisat.io; records when each rune's page was requested.
+    """
+    def __init__(self, fixtures: Dict[str, str]):
+        self.fixtures = fixtures
+        self.requested: Dict[str, float] = {} # ticker -> time.perf_counter() of the request
+        self.base_url = None
+        self._runner = None
+
+    async def _market(self, request):
+        tick = request.query['tick']
+        self.requested[tick] = time.perf_counter()
+        return web.Response(text=self.fixtures['market'].replace('{TICK}', tick), content_type='text/html')
+
+    async def _detail(self, request):
+        tick = request.match_info['tick']
+        self.requested[tick] = time.perf_counter()
+        return web.Response(text=self.fixtures['detail'].replace('{TICK}', tick), content_type='text/html')
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_get('/runes/market', self._market)
+        app.router.add_get('/runes/detail/{tick}', self._detail)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}"
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+    def urls(self, page: str, runes: int) -> List[str]:
+        if page == 'market':
+            return [f"{self.base_url}/runes/market?tick=BENCH•RUNE•{i}" for i in range(runes)]
+        return [f"{self.base_url}/runes/detail/BENCH•RUNE•{i}" for i in range(runes)]
+
+def _tick_of(target) -> str:
+    """Ticker a fixture page was requested for, from a Playwright page or a payload.
+    """
+    if isinstance(target, dict):
+        return target['props']['pageProps']['tick']
+    url = unquote(target.url)
+    return re.split(r"tick=|/detail/", url)[-1]
+
+def timed(extract_func, server: FixtureServer, latencies: List[float]):
+    """Wrap an extractor to record request-to-extracted latency per URL.
+    """
+    if inspect.iscoroutinefunction(extract_func):
+        async def wrapper(selectors, target):
+            result = await extract_func(selectors, target)
+            latencies.append(time.perf_counter() - server.requested[_tick_of(target)])
+            return result
+    else:
+        def wrapper(selectors, target):
+            result = extract_func(selectors, target)
+            latencies.append(time.perf_counter() - server.requested[_tick_of(target)])
+            return result
+    return wrapper
+
+def percentile(values: List[float], q: float) -> float:
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q*(len(values) - 1))))]
+
+def peak_rss_kb() -> int:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss # KB on Linux, process-wide peak so far
+
+def report(out, case: dict, seconds: float, items: int, latencies: List[float], errors: int = 0) -> None:
+    case.update({
+        'seconds': round(seconds, 6),
+        'throughput': round(items/seconds, 3) if seconds > 0 else None,
+        'p50_ms': None if not latencies else round(percentile(latencies, 0.5)*1000, 3),
+        'p99_ms': None if not latencies else round(percentile(latencies, 0.99)*1000, 3),
+        'errors': errors,
+        'peak_rss_kb': peak_rss_kb()
+        })
+    out.write(json.dumps(case) + "\n")
+    out.flush()
+
+def unlimited_rate_limiter() -> runescrape.HostRateLimiter:
+    # Nothing to be polite to locally; measure the scraper, not the throttle
+    return runescrape.HostRateLimiter(rate=1e9, burst=10**9)
+
+async def bench_scrape(out, server: FixtureServer, mode: str, page: str, runes: int, concurrency: int) -> None:
+    """Time `extract_elements` (browser) or `HttpFetcher` over `runes` fixture pages.
+    """
+    case = {'bench': 'scrape', 'mode': mode, 'page': page, 'runes': runes, 'concurrency': concurrency}
+    if page == 'market':
+        extractors = runescrape.PRICE_VOLUME_EXTRACTORS
+    else:
+        extractors = runescrape.MINT_AMOUNT_EXTRACTORS
+    extract_func, selectors = extractors[mode]
+
+    latencies = []
+    url_list = server.urls(page, runes)
+    funcs = [timed(extract_func, server, latencies)]*runes
+    try:
+        start = time.perf_counter()
+        if mode == 'http':
+            fetcher = runescrape.HttpFetcher(concurrency=concurrency, rate_limiter=unlimited_rate_limiter())
+            try:
+                elements = await fetcher.extract_elements(url_list, funcs, [selectors]*runes)
+            finally:
+                await fetcher.close()
+        else:
+            elements = await runescrape.extract_elements(url_list, funcs, [selectors]*runes,
+                                                         concurrency=concurrency,
+                                                         rate_limiter=unlimited_rate_limiter())
+        seconds = time.perf_counter() - start
+    except Exception as e:
+        case['error'] = f"{type(e).__name__}: {e}".splitlines()[0]
+        out.write(json.dumps(case) + "\n")
+        return
+
+    errors = sum(isinstance(el, Exception) for el in elements)
+    report(out, case, seconds, runes - errors, latencies, errors)
+
+def synthetic_db(runes: int, samples: int = runescrape.PRICE_ARRAY_LEN) -> dict:
+    """DB of `runes` runes with full price windows, one sample per 5 minutes.
+    """
+    now = int(time.time())
+    entries = {'last_updated': runescrape.epoch_to_timestamp(now)}
+    for i in range(runes):
+        name = f"bench.rune.{i}"
+        window = PriceWindow.from_samples(runescrape.PRICE_ARRAY_LEN,
+                                          [1 + (i % 7)*0.01*k for k in range(samples)],
+                                          [now - (samples - k)*300 for k in range(samples)])
+        entries[name] = {'url': runescrape.rune_name_std_to_prices_url(name),
+                         'tokens_per_mint': 1000,
+                         'price_window': window,
+                         'last_notified': -1,
+                         'volume': 1.0}
+    return entries
+
+def bench_update_db(out, runes: int, repeats: int = BENCH_REPEATS) -> None:
+    """Time `update_db_entries` (journal, history and stats included) over a synthetic DB.
+    """
+    with tempfile.TemporaryDirectory(dir=BENCH_DIR) as tmp_dir:
+        db_path = os.path.join(tmp_dir, 'runes_db.json')
+        store = DbStore(db_path, runescrape.PRICE_ARRAY_LEN)
+        history = PriceHistory(os.path.join(tmp_dir, 'history.sqlite3'))
+        stats = StreamingStats()
+        entries = synthetic_db(runes)
+        store.snapshot(entries)
+
+        url_list = [entries[name]['url'] for name in entries if name != 'last_updated']
+        latencies = []
+        start = time.perf_counter()
+        for r in range(repeats):
+            call_start = time.perf_counter()
+            runescrape.update_db_entries(prices_url_list=url_list,
+                                         cached_db=entries,
+                                         file_path=db_path,
+                                         price_elements_list=[[1 + 0.001*r]]*runes,
+                                         volume_elements_list=[2.0]*runes,
+                                         history=history,
+                                         store=store,
+                                         stats=stats)
+            latencies.append(time.perf_counter() - call_start)
+        seconds = time.perf_counter() - start
+        history.close()
+
+    report(out, {'bench': 'update_db_entries', 'runes': runes, 'repeats': repeats},
+           seconds, runes*repeats, latencies)
+
+async def bench_mvmt_check(out, runes: int, repeats: int = BENCH_REPEATS) -> None:
+    """Time `bot.schedule_price_mvmt_check` over a synthetic DB fed into the detector.
+    """
+    import bot as bot_module
+    from movement import MovementDetector
+
+    class Channel:
+        sent = 0
+        async def send(self, msg):
+            Channel.sent += 1
+
+    if bot_module.STORE is None:
+        bot_module.setup()
+    bot_module.bot.get_channel = lambda channel_id: Channel()
+    RATES._store(BENCH_RATE)
+
+    entries = synthetic_db(runes)
+    bot_module.RUNES_DB = entries
+    bot_module.DETECTOR = MovementDetector()
+    bot_module.STATS = StreamingStats()
+    for name, rune_data in entries.items():
+        if name == 'last_updated':
+            continue
+        window = rune_data['price_window']
+        for k in range(len(window)):
+            bot_module.DETECTOR.update(name, window.timestamp(k), window.price(k), rune_data['volume'])
+            bot_module.STATS.update(name, window.timestamp(k), window.price(k), rune_data['volume'])
+
+    latencies = []
+    start = time.perf_counter()
+    for r in range(repeats):
+        bot_module.PRICE_MVMT_LAST_CHECKED = None # force a check every call
+        bot_module.UNEVALUATED_RUNES.update(bot_module.DETECTOR.runes) # worst case: every rune changed
+        call_start = time.perf_counter()
+        await bot_module.schedule_price_mvmt_check()
+        latencies.append(time.perf_counter() - call_start)
+    seconds = time.perf_counter() - start
+
+    report(out, {'bench': 'schedule_price_mvmt_check', 'runes': runes, 'repeats': repeats, 'alerts_sent': Channel.sent},
+           seconds, runes*repeats, latencies)
+
+async def main(args) -> None:
+    out = open(args.output, 'a') if args.output else sys.stdout
+
+    # Progress prints of the scraper and bot go to stderr so stdout stays JSON lines
+    with contextlib.redirect_stdout(sys.stderr):
+        if not args.skip_scrape:
+            server = FixtureServer(load_fixtures())
+            await server.start()
+            try:
+                for mode in args.modes:
+                    for page in ('market', 'detail'):
+                        for runes in args.sizes:
+                            for concurrency in args.concurrency:
+                                await bench_scrape(out, server, mode, page, runes, concurrency)
+            finally:
+                await server.stop()
+
+        for runes in args.db_sizes:
+            bench_update_db(out, runes, args.repeats)
+        for runes in args.db_sizes:
+            await bench_mvmt_check(out, runes, args.repeats)
+
+    if out is not sys.stdout:
+        out.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline runescrape benchmarks (one JSON line per case).")
+    parser.add_argument('--sizes', type=int, nargs='+', default=BENCH_SIZES)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=BENCH_CONCURRENCY)
+    parser.add_argument('--modes', nargs='+', default=['dom', 'http'], choices=['dom', 'http'])
+    parser.add_argument('--db-sizes', type=int, nargs='+', default=BENCH_DB_SIZES)
+    parser.add_argument('--repeats', type=int, default=BENCH_REPEATS)
+    parser.add_argument('--skip-scrape', action='store_true')
+    parser.add_argument('--output', help="append JSON lines here instead of stdout")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,105 @@
+
+import os
+import asyncio
+import aiohttp
+
+from typing import Awaitable, Callable, List, Optional
+
+
+# Config variables
+BLOCK_HEIGHT_URL = os.getenv('BLOCK_HEIGHT_URL', 'https://mempool.space/api/blocks/tip/height')
+BLOCK_POLL_INTERVAL = 15 # s between tip height checks
+BLOCK_TIMEOUT = 10 # s per tip height request
+BLOCK_MILESTONE_EVERY = int(os.getenv('BLOCK_MILESTONE_EVERY', 10000)) # announce every multiple of this height
+HALVING_INTERVAL = 210000 # blocks between subsidy halvings, always announced
+
+
+def crossed_milestones(previous: Optional[int], height: int, every: int = BLOCK_MILESTONE_EVERY) -> List[int]:
+    """Milestone heights in (previous, height]: multiples of `every` and halvings.
+    """
+    if previous is None:
+        return []
+    return [h for h in range(previous + 1, height + 1) if h % every == 0 or h % HALVING_INTERVAL == 0]
+
+class HttpBlockSource:
+    """Chain tip height from a mempool.space-style endpoint returning the height as plain text.
+    """
+    def __init__(self, url: str = BLOCK_HEIGHT_URL):
+        self.url = url
+        self._session: aiohttp.ClientSession = None
+
+    async def height(self) -> int:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=BLOCK_TIMEOUT))
+        async with self._session.get(self.url) as response:
+            response.raise_for_status()
+            return int((await response.text()).strip())
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+class LocalBlockSource:
+    """Stand-in source whose height is moved by hand, e.g. in tests or offline runs.
+    """
+    def __init__(self, height: int = 0):
+        self.tip = height
+
+    def advance(self, blocks: int = 1) -> int:
+        self.tip += blocks
+        return self.tip
+
+    async def height(self) -> int:
+        return self.tip
+
+class BlockWatcher:
+    """Polls a block source and emits an event per new chain tip.
+
+    Subscribers are awaited as `callback(height, previous_height)`; the first poll
+    only records the height. Any object with an async `height()` works as a source.
+    """
+    def __init__(self, source = None, poll_interval: float = BLOCK_POLL_INTERVAL):
+        self.source = source or HttpBlockSource()
+        self.poll_interval = poll_interval
+        self.height: Optional[int] = None
+        self._subscribers: List[Callable[[int, Optional[int]], Awaitable[None]]] = []
+        self._new_block = asyncio.Event()
+
+    def subscribe(self, callback: Callable[[int, Optional[int]], Awaitable[None]]) -> None:
+        self._subscribers.append(callback)
+
+    async def poll(self) -> bool:
+        """Check the tip once; returns True (after notifying subscribers) if a new block arrived.
+        """
+        height = await self.source.height()
+        if self.height is not None and height <= self.height:
+            return False # same tip, or a lagging backend
+
+        previous, self.height = self.height, height
+        if previous is None:
+            return False
+        self._new_block.set()
+        self._new_block = asyncio.Event()
+        for callback in self._subscribers:
+            try:
+                await callback(height, previous)
+            except Exception as e:
+                print(f"Block subscriber failed: {e}")
+        return True
+
+    async def wait_for_block(self) -> int:
+        """Wait for the next new block and return its height.
+        """
+        await self._new_block.wait()
+        return self.height
+
+    async def run(self) -> None:
+        """Poll forever; source errors are logged and retried on the next interval.
+        """
+        while True:
+            try:
+                await self.poll()
+            except Exception as e:
+                print(f"Block height check failed: {e}")
+            await asyncio.sleep(self.poll_interval)
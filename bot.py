@@ -1,45 +1,82 @@
 
 import os
+import time
 import random
 import requests
-import bot
 import asyncio
-import nest_asyncio
 import discord
 import numbers
 import runescrape
 
 from dotenv import load_dotenv
 from discord.ext import commands, tasks
-from sats_to_usd import sats_to_usd
-from runescrape import PRICE_SELECTOR_LIST, PRICE_VOLUME_SELECTOR_LIST, MINT_AMOUNT_SELECTOR_LIST
+from browser_service import BrowserService
+from worker_pool import ScrapeWorkerPool, SCRAPE_WORKERS
+from history import PriceHistory
+from persistence import DbStore
+from movement import MovementDetector
+from stats import StreamingStats
+from scheduler import ScrapeScheduler
+from refresh import RefreshCoordinator
+from status_cache import StatusCache, paginate
+from name_index import NameIndex, AmbiguousName
+from discovery import DiscoveryCrawler
+from breaker import CircuitBreaker
+from blocks import BlockWatcher, crossed_milestones, BLOCK_POLL_INTERVAL
+from sats_to_usd import RATES
+from metrics import METRICS, METRICS_PORT
+from runescrape import PRICE_EXTRACTORS, PRICE_VOLUME_EXTRACTORS, MINT_AMOUNT_EXTRACTORS, MARKET_LISTING_EXTRACTORS
 from runescrape import PRICE_ARRAY_LEN
-from sheets import init_worksheet_and_runes, construct_runes_corresponding_prices, update_worksheet
-from sheets import SHEETS_URL
+from sheets import SheetsSync
+from feed import FeedClient, apply_records
 
 load_dotenv()
 
 # Config variables
-PRICE_DATABASE_PATH = os.getenv('PRICE_DATABASE_PATH')
+PRICE_DATABASE_PATH = os.getenv('PRICE_DATABASE_PATH', runescrape.PRICE_DATABASE_PATH)
 NICKNAME_DATABASE_PATH = os.getenv('NICKNAME_DATABASE_PATH')
 BOT_CHANNEL_ID = 1232761629549265006
-PERCENT_THRESHOLD = 7.5
+PRICE_EXTRACTION_MODE = os.getenv('PRICE_EXTRACTION_MODE', 'dom') # 'dom', 'network' or 'http'
+MINT_AMOUNT_EXTRACTION_MODE = os.getenv('MINT_AMOUNT_EXTRACTION_MODE', 'dom') # 'dom', 'network' or 'http'
+HTTP_FETCH = os.getenv('HTTP_FETCH', '0') == '1' # try plain HTTP first, use the browser only for failures
+SCHEDULER_TICK = 15 # s between checks for runes that are due
+SHEETS_SYNC = os.getenv('SHEETS_SYNC', '0') == '1' # push changed prices to the Google Sheet
+BLOCK_TRIGGERED = os.getenv('BLOCK_TRIGGERED', '0') == '1' # scrape right after new blocks instead of on every tick
+BLOCK_LOOKAHEAD = 10*60 # s; runes due before the next expected block are refreshed with this one
+BLOCK_MAX_WAIT = 30*60 # s without a block after which due runes are scraped anyway
+DISCOVERY = os.getenv('DISCOVERY', '0') == '1' # crawl the market listing for new runes
+DISCOVERY_MODE = os.getenv('DISCOVERY_MODE', 'network') # 'network' or 'http'
+DISCOVERY_INTERVAL = 10*60 # s between market listing crawls
+DISCOVERY_BATCH = 25 # new runes scraped and announced per crawl at most
+STREAM_FLUSH_SIZE = 25 # streamed scrape results stored per update_db_entries call at most
+STREAM_FLUSH_INTERVAL = 5 # s; streamed results are stored at least this often
+SCRAPER_FEED = os.getenv('SCRAPER_FEED', '0') == '1' # mirror scrape_daemon.py's database instead of scraping here
 
 # Global variables
-try:
-    RUNES_DB = runescrape.read_json(PRICE_DATABASE_PATH)
-    PRICE_MVMT_LAST_CHECKED = RUNES_DB['last_updated']
-except:
-    RUNES_DB = {}
-    PRICE_MVMT_LAST_CHECKED = "04:20:69 PM, 04/20/2000"
-try:
-    NICKNAMES_DB = runescrape.read_json(NICKNAME_DATABASE_PATH)
-except:
-    NICKNAMES_DB = {}
-CURR_PRICE_USD = 0
-
-# Enable nested asyncio calls
-nest_asyncio.apply()
+# Anything read from disk or backed by processes is built by setup(), which runs once at startup:
+# spawned scrape workers re-import this module and must not recover the database again
+# RUNES_DB is recovered from the last snapshot plus the journal of changes written since
+STORE = None
+RUNES_DB = {}
+PRICE_MVMT_LAST_CHECKED = "04:20:69 PM, 04/20/2000"
+# Every scraped sample is kept in the history store; the in-memory windows are rebuilt from it
+HISTORY = None
+
+# Price movements are detected over several windows (see movement.ALERT_WINDOWS), seeded from history
+DETECTOR = MovementDetector()
+
+# Runes whose price or volume changed since the last movement check
+UNEVALUATED_RUNES = set()
+
+# Streaming per-rune stats (EWMA, volatility, rolling min/max) updated on every sample
+STATS = StreamingStats()
+
+# Each rune is rescraped when due; intervals adapt to volatility, volume and !status interest
+SCHEDULER = ScrapeScheduler()
+NICKNAMES_DB = {}
+
+# Rune names and nicknames indexed for prefix ("sat.n") and misspelling lookups
+NAME_INDEX = NameIndex()
 
 # Discord bot setup
 intents = discord.Intents.default()
@@ -49,6 +86,54 @@ bot = commands.Bot(command_prefix='!', intents=intents)
 access_token = os.getenv('DISCORD_TOKEN')
 lock = asyncio.Lock()
 
+# Chromium is launched once and shared by commands and scheduled scrapes;
+# with SCRAPE_WORKERS set, each worker process runs its own and results stream back
+BROWSER = None
+HTTP_FETCHER = runescrape.HttpFetcher()
+
+# New blocks trigger scrapes (and milestone notifications) when BLOCK_TRIGGERED is set
+WATCHER = BlockWatcher() if BLOCK_TRIGGERED else None
+BLOCK_PENDING = False # a new block arrived and its due runes are not all scraped yet
+LAST_BLOCK_TIME = time.time()
+BLOCK_HORIZON = LAST_BLOCK_TIME + BLOCK_LOOKAHEAD # runes due before this are scraped with the latest block
+
+# Prometheus-format timings at http://METRICS_HOST:METRICS_PORT/metrics, started with the bot
+METRICS_SERVER = None
+
+# Changed prices are pushed to the sheet from a worker thread, only the cells that differ
+SHEETS = SheetsSync() if SHEETS_SYNC else None
+
+# Runes whose scrapes keep failing (e.g. delisted) are quarantined and only probed now and then;
+# in feed mode the daemon's breaker decides and its quarantined runes are mirrored here
+BREAKER = CircuitBreaker()
+FEED_QUARANTINE = None # latest list from the daemon, None until the first one arrives
+FEED_SAMPLED = set() # runes with a journaled sample since the daemon's last finished scrape batch
+
+
+def scrape_allowed(rune_name: str) -> bool:
+    """False while the rune is quarantined and its next probe is not due; in feed mode per the daemon's breaker.
+    """
+    if FEED is None:
+        return BREAKER.allow(rune_name)
+    now = time.time()
+    return not any(entry.rune == rune_name and now < entry.next_probe for entry in FEED_QUARANTINE or [])
+
+async def scrape_elements(url_list: list, extractor_tables: list, modes: list) -> list:
+    """Scrape each URL with the extractor its table maps its mode to.
+
+    With HTTP_FETCH set, the 'http' extractors run first and the browser only handles failures.
+    """
+    return await runescrape.extract_with_tables(BROWSER.extract_elements,
+                                                url_list,
+                                                extractor_tables,
+                                                modes,
+                                                HTTP_FETCHER if HTTP_FETCH else None)
+
+async def send_timed(channel, msg) -> None:
+    """Send a Discord message, recording how long the send took.
+    """
+    with METRICS.time('discord_send'):
+        await channel.send(msg)
 
 @bot.command()
 async def test(ctx, *,arg):
@@ -82,36 +167,102 @@ async def add(ctx, rune_name_or_url: str = None) -> None:
             ... # TODO: send last updated entry
             return
     
-    # Scrape web for rune; if rune scrape fails, return
+    # Scrape web for rune; a concurrent !add of the same rune shares this scrape
     prices_url = runescrape.rune_name_std_to_prices_url(rune_name_standardized)
     await ctx.send(prices_url)
+    added = await REFRESHER.single_flight(('add', rune_name_standardized),
+                                          lambda: add_rune(rune_name_standardized))
+
+    # If price scrape fails, return
+    if not added:
+        await ctx.send("Rune either lacks enough entries or does not exist on UniSat.")
+        return
+
+    await ctx.send(f"**{ticker}** added!")
+
+    return
+
+async def add_rune(rune_name_standardized: str) -> bool:
+    """Scrape a new rune's price and mint amount and add it to the db. Returns False if the price scrape fails.
+    """
+    global RUNES_DB
+
+    # The daemon scrapes and stores it; the rune arrives here as a feed update
+    if FEED is not None:
+        return await FEED.add(rune_name_standardized)
+
+    prices_url = runescrape.rune_name_std_to_prices_url(rune_name_standardized)
     mint_amt_url = runescrape.rune_name_std_to_mint_amt_url(rune_name_standardized)
 
-    price_extractor, mint_amt_extractor = runescrape.extract_prices_or_volume, runescrape.extract_mint_amount
-    prices, mint_amt = asyncio.run(runescrape.extract_elements(
+    prices, mint_amt = await scrape_elements(
         url_list = [prices_url, mint_amt_url],
-        extract_func_list = [price_extractor, mint_amt_extractor],
-        selectors_list = [PRICE_SELECTOR_LIST, MINT_AMOUNT_SELECTOR_LIST]
-        ))
+        extractor_tables = [PRICE_EXTRACTORS, MINT_AMOUNT_EXTRACTORS],
+        modes = [PRICE_EXTRACTION_MODE, MINT_AMOUNT_EXTRACTION_MODE]
+        )
 
     # If price scrape fails, return
     if isinstance(prices, Exception):
-        await ctx.send("Rune either lacks enough entries or does not exist on UniSat.")
-        return
+        return False
     
     # If mint amt scrape fails, set to one
     if isinstance(mint_amt, Exception):
         mint_amt = 1
 
-    # Add scraped data to db
+    # Add scraped data to db; file writes run in a thread so the event loop keeps serving commands
     async with lock:
-        RUNES_DB = runescrape.update_db_entries(prices_url_list=[prices_url],
-                                                cached_db=RUNES_DB,
-                                                file_path=PRICE_DATABASE_PATH,
-                                                price_elements_list=[prices],
-                                                mint_amt_element=mint_amt)
+        RUNES_DB = await asyncio.to_thread(runescrape.update_db_entries,
+                                           prices_url_list=[prices_url],
+                                           cached_db=RUNES_DB,
+                                           file_path=PRICE_DATABASE_PATH,
+                                           price_elements_list=[prices],
+                                           mint_amt_element=mint_amt,
+                                           history=HISTORY,
+                                           store=STORE,
+                                           stats=STATS,
+                                           changed=UNEVALUATED_RUNES)
+        feed_detector([rune_name_standardized])
+        refresh_status_cache([rune_name_standardized])
+        publish_to_sheets([rune_name_standardized])
+        NAME_INDEX.add(rune_name_standardized)
+        CRAWLER.mark_known([rune_name_standardized])
+        SCHEDULER.add(rune_name_standardized)
+        SCHEDULER.reschedule(rune_name_standardized, STATS.get(rune_name_standardized))
+
+    return True
 
-    await ctx.send(f"**{ticker}** added!")
+@bot.command()
+async def update(ctx, rune_name_or_url: str = None) -> None:
+    """Refresh one rune (or all runes) right away, ahead of the schedule.
+    """
+    await ctx.send("Scraping UniSat...")
+
+    async with lock:
+        if rune_name_or_url is None:
+            # Quarantined runes wait for their probe; naming one still scrapes it right away
+            rune_names = [name for name in RUNES_DB if name != 'last_updated' and scrape_allowed(name)]
+        else:
+            rune_potential_nickname = runescrape.rune_name_or_url_standardizer(rune_name_or_url)
+            rune_name_standardized = rune_nickname_check_to_std(rune_potential_nickname)
+            if isinstance(rune_name_standardized, Exception) or rune_name_standardized not in RUNES_DB:
+                await ctx.send(unresolved_msg(rune_name_standardized,
+                                              f"**{runescrape.rune_name_std_to_ticker(rune_potential_nickname)}** not found in database.\n\n"
+                                              "Please input `!add [RUNE_NAME_OR_URL]` to add runes to the database."))
+                return
+            rune_names = [rune_name_standardized]
+
+    # Runes scraped within MAX_AGE are served from memory; ones already being scraped are joined
+    outcomes = await REFRESHER.refresh_many(rune_names)
+
+    async with lock:
+        await schedule_price_mvmt_check()
+
+    if rune_name_or_url is None:
+        await ctx.send("Database updated!\n\n"
+                       "**Tip**: To save time, you can update a specific rune by sending \"!update [RUNE_NAME]\".")
+    else:
+        ticker = runescrape.rune_name_std_to_ticker(rune_names[0])
+        note = " (already up to date)" if outcomes[rune_names[0]] == 'fresh' else ""
+        await ctx.send(f"**{ticker}** updated!{note}")
 
     return
 
@@ -124,21 +275,40 @@ async def mintcnt(ctx, rune_name_or_url: str = None, mint_amt: int = 1) -> None:
     async with lock:
         global RUNES_DB
         RUNES_DB[rune_name_standardized]['tokens_per_mint'] = mint_amt
+        await asyncio.to_thread(STORE.set_fields, rune_name_standardized, {'tokens_per_mint': mint_amt})
+        refresh_status_cache([rune_name_standardized])
 
     return
 
-async def rune_nickname_check_to_std(potential_nickname: str) -> str:
+def rune_nickname_check_to_std(potential_nickname: str) -> str:
     """Check for nickname and replace to standard rune name.
+
+    Callers must hold `lock`.
     """
-    async with lock:
-        global NICKNAMES_DB
+    global NICKNAMES_DB
 
-        try:
-            rune_name_standardized = NICKNAMES_DB[potential_nickname]
-        except Exception as e:
-            return e
-        
-        return rune_name_standardized
+    # Standard names that are already tracked need no nickname
+    if potential_nickname in RUNES_DB:
+        return potential_nickname
+
+    try:
+        rune_name_standardized = NICKNAMES_DB[potential_nickname]
+    except Exception as e:
+        # Fall back to an unambiguous prefix or fuzzy match, e.g. "sat.n" -> "satoshi.nakamoto"
+        rune_name_standardized = NAME_INDEX.resolve(potential_nickname)
+        if rune_name_standardized is None:
+            candidates = NAME_INDEX.search(potential_nickname)
+            return AmbiguousName(potential_nickname, candidates) if candidates else e
+
+    return rune_name_standardized
+
+def unresolved_msg(error: Exception, msg: str) -> str:
+    """`msg`, or the candidate runes if the name was ambiguous.
+    """
+    if not isinstance(error, AmbiguousName):
+        return msg
+    tickers = ", ".join(f"**{runescrape.rune_name_std_to_ticker(match.rune)}**" for match in error.candidates)
+    return f"'{error.query}' could mean several runes: {tickers}. Please be more specific."
 
 @bot.command()
 async def nickname(ctx, rune_name_or_url: str, rune_nickname: str):
@@ -161,96 +331,149 @@ async def nickname(ctx, rune_name_or_url: str, rune_nickname: str):
         global NICKNAMES_DB
         NICKNAMES_DB.update({rune_nickname: rune_name_standardized})
         runescrape.write_json(NICKNAME_DATABASE_PATH, NICKNAMES_DB)
+        NAME_INDEX.add(runescrape.rune_name_standardizer(rune_nickname), rune_name_standardized)
         
         await ctx.send(f"**{ticker}** can now be referred as '{rune_nickname}'.")
 
         return
 
+def rune_stats_msg(rune_stats) -> str:
+    """Generate message lines for the running stats of a rune.
+    """
+    if rune_stats is None or rune_stats.count < 2:
+        return ""
+    msg = (f"**{round(rune_stats.ewma_price, 4)} sats** EWMA price | "
+           f"**{round(rune_stats.volatility, 2)}%** volatility per update\n"
+           f"**{rune_stats.min_price}-{rune_stats.max_price} sats** recent range\n\n")
+    return msg
+
 def rune_status_msg(curr_price_sats, curr_price_usd, tokens_per_mint, volume) -> str:
     """Generate message to send for rune status.
+
+    `curr_price_usd` is None while no BTC/USD rate has been fetched.
     """
+    if curr_price_usd is None:
+        return (f"**{volume} BTC** volume (24h)\n"
+                f"**{curr_price_sats} sats** per token\n**USD n/a** per token\n"
+                f"**USD n/a** per mint ({tokens_per_mint} tokens per mint)\n\n")
     msg = (f"**{volume} BTC** volume (24h)\n"
            f"**{curr_price_sats} sats** per token\n**${round(curr_price_usd, 6)}** per token\n"
            f"**${round(tokens_per_mint*curr_price_usd, 2)}** per mint ({tokens_per_mint} tokens per mint)\n\n")
     return msg
 
+def status_header() -> str:
+    """Header of the `!status` overview. Callers must hold `lock`.
+    """
+    return f"# Runes Prices\n**Last updated: {RUNES_DB['last_updated']}** (active runes update every minute, quiet ones hourly)\n\n"
+
+def render_status_block(rune_name_std: str, rune_data: dict) -> str:
+    """Generate the `!status` block of one rune with the cached BTC/USD rate.
+    """
+    ticker = runescrape.rune_name_std_to_ticker(rune_name_std)
+    curr_price_sats = rune_data['price_window'].latest_price
+    curr_price_usd = RATES.convert(curr_price_sats)
+    tokens_per_mint = int(rune_data['tokens_per_mint'])
+    volume = rune_data['volume']
+    return f"__{ticker}__:\n{rune_status_msg(curr_price_sats, curr_price_usd, tokens_per_mint, volume)}"
+
+# Rendered !status blocks and pages; only runes whose data changed (or all, on a new rate) are re-rendered
+STATUS_CACHE = StatusCache(render_status_block)
+
+def refresh_status_cache(rune_names: list = ()) -> None:
+    """Mark `rune_names` changed and re-render what is stale. Callers must hold `lock`.
+    """
+    STATUS_CACHE.invalidate(rune_names)
+    if 'last_updated' in RUNES_DB:
+        STATUS_CACHE.refresh(RUNES_DB, RATES.rate, status_header())
+
 @bot.command()
 async def status(ctx, rune_name_or_url: str = None):
-    async with lock:
-        # entries = runescrape.read_json(PRICE_DATABASE_PATH)
-        global RUNES_DB
+    # Convert with the cached BTC/USD rate; a stale rate is revalidated in the background
+    RATES.refresh_in_background()
 
-        if not RUNES_DB:
-            await ctx.send("Database is empty!\n\n"
-                        "Please input `!add [RUNE_NAME_OR_URL]` to add runes to the database.")
-            return
+    # Pages are pre-rendered, so the lock is only taken when something changed since the last render
+    if STATUS_CACHE.stale(RATES.rate):
+        async with lock:
+            refresh_status_cache()
 
-        if rune_name_or_url is None:
+    if not STATUS_CACHE.pages():
+        await ctx.send("Database is empty!\n\n"
+                       "Please input `!add [RUNE_NAME_OR_URL]` to add runes to the database.")
+        return
 
-            # Configure header of msg
-            msg = f"# Runes Prices\n**Last updated: {RUNES_DB['last_updated']}** (updates every ~5 mins)\n\n"
-
-            # Loop through db and construct msg iteratively
-            for rune_name_std, rune_data in RUNES_DB.items():
-                # Skip 'last_updated'
-                if rune_name_std == 'last_updated':
-                    continue
-                
-                # Configure vars to print
-                ticker = runescrape.rune_name_std_to_ticker(rune_name_std)
-                curr_price_sats = rune_data['price_array'][-1]
-                global CURR_PRICE_USD
-                try:
-                    curr_price_usd = sats_to_usd(curr_price_sats)
-                    CURR_PRICE_USD = curr_price_usd
-                except:
-                    curr_price_usd = CURR_PRICE_USD
-                tokens_per_mint = int(rune_data['tokens_per_mint'])
-                volume = rune_data['volume']
-
-                # Construct and add to msg
-                sub_msg = (f"__{ticker}__:\n"
-                        f"{rune_status_msg(curr_price_sats, curr_price_usd, tokens_per_mint, volume)}")
-                msg += sub_msg
-
-            await ctx.send(msg)
-            return
-        else:
+    if rune_name_or_url is None:
+        # Sent outside the lock so scrapes are never held up by Discord
+        for page in STATUS_CACHE.pages():
+            await send_timed(ctx, page)
+        return
+    else:
+        async with lock:
             # Check for nickname
             rune_potential_nickname = runescrape.rune_name_or_url_standardizer(rune_name_or_url)
             rune_name_standardized = rune_nickname_check_to_std(rune_potential_nickname)
-            if isinstance(rune_name_standardized, Exception):
-                await ctx.send('Nickname does not exist.')
+            if isinstance(rune_name_standardized, Exception) or STATUS_CACHE.block(rune_name_standardized) is None:
+                await ctx.send(unresolved_msg(rune_name_standardized, 'Nickname does not exist.'))
                 return
 
-            # Configure vars to print
-            ticker = runescrape.rune_name_std_to_ticker(rune_name_standardized)
-            curr_price_sats = RUNES_DB[rune_name_standardized]['price_array'][-1]
-            curr_price_usd = sats_to_usd(curr_price_sats)
-            tokens_per_mint = int(RUNES_DB[rune_name_standardized]['tokens_per_mint'])
-            volume = RUNES_DB[rune_name_standardized]['volume']
+            # User interest makes the scheduler refresh this rune more often
+            SCHEDULER.record_interest(rune_name_standardized)
 
             # Construct msg to send
-            msg = f"**Last updated: {RUNES_DB[rune_name_standardized]['price_timestamps'][-1]}** (updates every ~5 mins)\n\n"
-            msg += f"__{ticker}__:\n{rune_status_msg(curr_price_sats, curr_price_usd, tokens_per_mint, volume)}"
-            
-            await ctx.send(msg)
-            return
+            latest_timestamp = RUNES_DB[rune_name_standardized]['price_window'].latest_timestamp
+            update_mins = round(SCHEDULER.interval(rune_name_standardized, STATS.get(rune_name_standardized))/60)
+            msg = f"**Last updated: {runescrape.epoch_to_timestamp(latest_timestamp)}** (updates every ~{update_mins} mins)\n\n"
+            msg += STATUS_CACHE.block(rune_name_standardized)
+            msg += rune_stats_msg(STATS.get(rune_name_standardized))
+
+        await ctx.send(msg)
+        return
 
-@tasks.loop(seconds=5*60)
-async def db_check():
-    """Check if db have been corrupted and retrieve a backup if so.
+def stage_stats_msg(stages: dict) -> str:
+    """Generate message lines of per-stage timings, most total time first.
     """
-    async with lock:
-        global RUNES_DB
-        global PRICE_DATABASE_PATH
+    msg = ""
+    for stage, histogram in sorted(stages.items(), key=lambda item: -item[1].sum):
+        msg += (f"**{stage}**: {round(histogram.sum, 2)} s total over {histogram.count} | "
+                f"p50 ≤ {histogram.quantile(0.5)} s | p99 ≤ {histogram.quantile(0.99)} s\n")
+    return msg
+
+@bot.command()
+async def stats(ctx, rune_name_or_url: str = None):
+    """Show where scrape and bot time goes, overall or for one rune.
+    """
+    rune_name_standardized = None
+    if rune_name_or_url is not None:
+        async with lock:
+            rune_name_standardized = rune_nickname_check_to_std(runescrape.rune_name_or_url_standardizer(rune_name_or_url))
+        if isinstance(rune_name_standardized, Exception):
+            await ctx.send(unresolved_msg(rune_name_standardized, 'Nickname does not exist.'))
+            return
+
+    stages = METRICS.stages(rune_name_standardized)
+    if not stages:
+        await ctx.send("No timings recorded yet.")
+        return
 
-        # If db is empty but the backup is filled, reupdate RUNES_DB
-        if bool(RUNES_DB) is False and bool(runescrape.read_json(PRICE_DATABASE_PATH)) is True:
-            RUNES_DB = runescrape.read_json(PRICE_DATABASE_PATH)
+    title = "all runes" if rune_name_standardized is None else runescrape.rune_name_std_to_ticker(rune_name_standardized)
+    for page in paginate(f"# Stage timings ({title})\n", stage_stats_msg(stages).splitlines(keepends=True)):
+        await ctx.send(page)
 
+@bot.command()
+async def quarantine(ctx):
+    """List runes whose scrapes keep failing and when each is probed next.
+    """
+    entries = BREAKER.quarantined() if FEED is None else FEED_QUARANTINE or []
+    if not entries:
+        await ctx.send("No runes quarantined.")
         return
 
+    now = time.time()
+    lines = [f"**{runescrape.rune_name_std_to_ticker(entry.rune)}**: {entry.failures} failed scrapes, "
+             f"next probe in {max(0, round((entry.next_probe - now)/60))} min\n`{entry.error[:200]}`\n"
+             for entry in entries]
+    for page in paginate("# Quarantined runes\n", lines):
+        await ctx.send(page)
+
 # @tasks.loop(seconds=5*60)
 async def schedule_price_mvmt_check():
     # Load db
@@ -275,103 +498,121 @@ async def schedule_price_mvmt_check():
 
     print("Checking for price movements...")
 
-    # Check all runes for significant price mvmts
-    for rune_name, rune_data in RUNES_DB.items():
-        # Skip 'last_updated'
-        if rune_name == 'last_updated':
-            continue
-        
-        # Skip entries that have been updated within the hour
-        try:
-            last_notified = rune_data['last_notified']
-        except:
-            last_notified = -1 # holder value that should never be in the checked array
-        if last_notified in rune_data['price_timestamps']:
+    # One rate lookup per cycle; alerts still go out (with USD n/a) if CoinGecko has never answered
+    try:
+        await RATES.get_rate()
+    except Exception as e:
+        print(e)
+
+    # Evaluate every rune over every alert window in one vectorized pass
+    alerted = set()
+    # Only runes that changed since the last check can have new movements
+    with METRICS.time('alert_evaluation'):
+        alerts = DETECTOR.evaluate(UNEVALUATED_RUNES)
+    UNEVALUATED_RUNES.clear()
+    for alert in alerts:
+        rune_name = alert.rune
+        if rune_name not in RUNES_DB:
             continue
+        rune_data = RUNES_DB[rune_name]
 
-        # Extract prices particular rune
-        price_array = rune_data['price_array']
-        volume = rune_data['volume']
+        # Update db with last_notified to prevent overnotifying channel
+        alerted.add(rune_name)
+        METRICS.inc('alerts', kind='movement', rune=rune_name)
+        DETECTOR.mark_alerted(rune_name, alert.timestamp)
+        to_add = {'last_notified': alert.timestamp}
+        RUNES_DB[rune_name].update(to_add)
+        await asyncio.to_thread(STORE.set_fields, rune_name, to_add)
 
-        # Skip if not enough data 
-        if len(price_array) < PRICE_ARRAY_LEN:
-            continue
-        
-        # Extract timestamps, ticker for particular rune
-        timestamp_array = rune_data['price_timestamps']
+        # Configure vars to print
         ticker = runescrape.rune_name_std_to_ticker(rune_name)
-
-        # Check for larger than PERCENT_THRESHOLD change
-        old_price_sats = price_array[0]
-        curr_price_sats = price_array[-1]
-        curr_price_usd = sats_to_usd(curr_price_sats)
+        curr_price_sats = alert.price
+        curr_price_usd = RATES.convert(curr_price_sats)
         tokens_per_mint = int(rune_data['tokens_per_mint'])
-        percent_change = ((curr_price_sats-old_price_sats)/old_price_sats)*100
+        volume = rune_data['volume']
+        percent_change = alert.percent_change
 
         # Send message for respective direction change
-        if percent_change > PERCENT_THRESHOLD:
-            # Update db with last_notified to prevent overnotifying channel
-            to_add = {'last_notified': timestamp_array[-1]}
-            RUNES_DB[rune_name].update(to_add)
-            # runescrape.write_json(PRICE_DATABASE_PATH, RUNES_DB)
-
-            # Send price change msg
-            msg_channel = bot.get_channel(BOT_CHANNEL_ID)
-            await msg_channel.send("# Price up! We're so back.\n"
-                                   f"**__{ticker}__ is up {round(abs(percent_change),2)}%** within the last hour:\n"
+        msg_channel = bot.get_channel(BOT_CHANNEL_ID)
+        if percent_change > 0:
+            await send_timed(msg_channel, "# Price up! We're so back.\n"
+                                   f"**__{ticker}__ is up {round(abs(percent_change),2)}%** within the last {alert.window}:\n"
                                    f"{rune_status_msg(curr_price_sats, curr_price_usd, tokens_per_mint, volume)}"
                                    f"<@&{1237541939562287164}>\n\n")
-            
-        elif percent_change < -PERCENT_THRESHOLD:
-            # Update db with last_notified to prevent overnotifying channel
-            to_add = {'last_notified': timestamp_array[-1]}
-            RUNES_DB[rune_name].update(to_add)
-            # runescrape.write_json(PRICE_DATABASE_PATH, RUNES_DB) # no need to write to db
-
-            # Send price change msg
-            msg_channel = bot.get_channel(BOT_CHANNEL_ID)
-            await msg_channel.send("# Price down. It's over... <:pepehands:1237539581532966992>\n"
-                                   f"**__{ticker}__ is down {round(abs(percent_change),2)}%** within the last hour:\n"
+        else:
+            await send_timed(msg_channel, "# Price down. It's over... <:pepehands:1237539581532966992>\n"
+                                   f"**__{ticker}__ is down {round(abs(percent_change),2)}%** within the last {alert.window}:\n"
                                    f"{rune_status_msg(curr_price_sats, curr_price_usd, tokens_per_mint, volume)}"
                                    f"<@&{1237541939562287164}>\n\n")
 
+    # Statistically significant single moves, flagged as soon as a rune has a few samples
+    for z_alert in STATS.drain_alerts():
+        rune_name = z_alert.rune
+        if rune_name in alerted or rune_name not in RUNES_DB:
+            continue
+        alerted.add(rune_name)
+        METRICS.inc('alerts', kind='zscore', rune=rune_name)
+        rune_data = RUNES_DB[rune_name]
+
+        ticker = runescrape.rune_name_std_to_ticker(rune_name)
+        curr_price_sats = z_alert.price
+        curr_price_usd = RATES.convert(curr_price_sats)
+        tokens_per_mint = int(rune_data['tokens_per_mint'])
+        volume = rune_data['volume']
+        direction = "up" if z_alert.percent_change > 0 else "down"
+
+        msg_channel = bot.get_channel(BOT_CHANNEL_ID)
+        await send_timed(msg_channel, "# Unusual move!\n"
+                               f"**__{ticker}__ is {direction} {round(abs(z_alert.percent_change),2)}%** since the last update "
+                               f"({round(abs(z_alert.z_score),1)}σ):\n"
+                               f"{rune_status_msg(curr_price_sats, curr_price_usd, tokens_per_mint, volume)}"
+                               f"<@&{1237541939562287164}>\n\n")
+
     return
 
-@tasks.loop(seconds=5*60+random.uniform(-30,30)) # Check every 5 mins +/- 30 s
-async def schedule_update_db():
-    # Check db corruption
-    await db_check()
-    
-    async with lock:
-        global RUNES_DB
+def feed_detector(rune_names: list) -> None:
+    """Push the latest sample of each scraped rune into the movement detector. Callers must hold `lock`.
 
-        # Configure vars
-        rune_names = list(RUNES_DB.keys())
-        try:
-            rune_names.remove('last_updated') # skip 'last_updated'
-        except:
-            pass
-        url_list = [0]*len(rune_names)
-        for i, name in enumerate(rune_names):
-            url_list[i] = RUNES_DB[name]['url']
-        rune_cnt = len(rune_names)
-        extract_func_list = [runescrape.extract_prices_or_volume]*rune_cnt
-        selectors_list = [PRICE_VOLUME_SELECTOR_LIST]*rune_cnt
+    Every scraped sample is fed, changed or not, so each window finds a reference price near its start.
+    """
+    for rune_name in rune_names:
+        rune_data = RUNES_DB.get(rune_name)
+        if rune_data is None or not len(rune_data['price_window']):
+            continue
+        price_window = rune_data['price_window']
+        if price_window.latest_timestamp > DETECTOR.latest_timestamp(rune_name):
+            DETECTOR.update(rune_name, price_window.latest_timestamp, price_window.latest_price, rune_data['volume'])
+
+def publish_to_sheets(rune_names: list) -> None:
+    """Hand the latest prices of updated runes to the sheet sync. Callers must hold `lock`.
+    """
+    if SHEETS is None:
+        return
+    SHEETS.publish({name: RUNES_DB[name]['price_window'].latest_price for name in rune_names})
+
+async def store_price_volume(url_list: list, price_volume_elements: list) -> None:
+    """Store scraped (price, volume) pairs and pass the runes that changed downstream.
+    """
+    global RUNES_DB
 
-    # Extract price and volume elements
-    price_volume_elements = asyncio.run(runescrape.extract_elements(url_list, extract_func_list, selectors_list))
     price_elements, volume_elements = [], []
+    quarantined, recovered = [], []
     for i, pair in enumerate(price_volume_elements):
+        rune_name = runescrape.rune_name_standardizer(runescrape.prices_url_to_ticker(url_list[i]))
         try:
             price = pair[0]
             volume = pair[1]
             price_elements.append(price)
             volume_elements.append(volume)
+            if BREAKER.record_success(rune_name):
+                recovered.append(rune_name)
         except: # Append TimeoutError if the pair var is unsubscriptable
             price = TimeoutError
             volume = TimeoutError
             price_elements.append(price)
             volume_elements.append(volume)
+            if BREAKER.record_failure(rune_name, pair):
+                quarantined.append(rune_name)
 
         # # Send message if scraped element is not a number
         # if not isinstance(price, numbers.Number):
@@ -387,31 +628,233 @@ async def schedule_update_db():
     # Update cached db; skip if scrape fails
     async with lock:
         try:
-            RUNES_DB = runescrape.update_db_entries(prices_url_list=url_list,
-                                                    cached_db=RUNES_DB,
-                                                    file_path=PRICE_DATABASE_PATH,
-                                                    price_elements_list=price_elements,
-                                                    volume_elements_list=volume_elements)
+            # Only runes whose price or volume changed are persisted and passed downstream
+            changed = set()
+            RUNES_DB = await asyncio.to_thread(runescrape.update_db_entries,
+                                               prices_url_list=url_list,
+                                               cached_db=RUNES_DB,
+                                               file_path=PRICE_DATABASE_PATH,
+                                               price_elements_list=price_elements,
+                                               volume_elements_list=volume_elements,
+                                               history=HISTORY,
+                                               store=STORE,
+                                               stats=STATS,
+                                               changed=changed)
+            UNEVALUATED_RUNES.update(changed)
+            feed_detector([runescrape.rune_name_standardizer(runescrape.prices_url_to_ticker(url)) for url in url_list])
+            refresh_status_cache(changed)
+            publish_to_sheets(changed)
         except Exception as e:
             msg_channel = bot.get_channel(BOT_CHANNEL_ID)
-            await msg_channel.send(e)
-    
-    # Check db again
-    await db_check()
+            await send_timed(msg_channel, e)
+
+    if quarantined or recovered:
+        await report_breaker(quarantined, recovered)
+
+async def report_breaker(quarantined: list, recovered: list) -> None:
+    """Announce runes that were just quarantined or came back.
+    """
+    lines = []
+    for rune_name in quarantined:
+        METRICS.inc('quarantined', rune=rune_name)
+        lines.append(f"**{runescrape.rune_name_std_to_ticker(rune_name)}** quarantined after "
+                     f"{BREAKER.failures} failed scrapes; probing every {BREAKER.probe_interval//60} min or more.\n")
+    for rune_name in recovered:
+        lines.append(f"**{runescrape.rune_name_std_to_ticker(rune_name)}** scraped again; back on its normal schedule.\n")
+    msg_channel = bot.get_channel(BOT_CHANNEL_ID)
+    for page in paginate("# Scrape health\n", lines):
+        await send_timed(msg_channel, page)
+
+async def stream_price_volume(url_list: list) -> None:
+    """Scrape through the worker pool, storing results in chunks as they arrive.
+    """
+    price_volume_pair = runescrape.browser_extractor(PRICE_VOLUME_EXTRACTORS, PRICE_EXTRACTION_MODE)
+    chunk_urls, chunk_elements = [], []
+    last_flush = time.monotonic()
+    async for i, pair in BROWSER.stream(url_list,
+                                        [price_volume_pair[0]]*len(url_list),
+                                        [price_volume_pair[1]]*len(url_list)):
+        chunk_urls.append(url_list[i])
+        chunk_elements.append(pair)
+        if len(chunk_urls) >= STREAM_FLUSH_SIZE or time.monotonic() - last_flush >= STREAM_FLUSH_INTERVAL:
+            await store_price_volume(chunk_urls, chunk_elements)
+            chunk_urls, chunk_elements = [], []
+            last_flush = time.monotonic()
+    if chunk_urls:
+        await store_price_volume(chunk_urls, chunk_elements)
+
+async def refresh_runes(rune_names: list) -> None:
+    """Scrape price and volume of tracked runes and store them; used through REFRESHER.
+    """
+    # The daemon scrapes them; changed prices are applied by on_feed_update before this returns
+    if FEED is not None:
+        await FEED.refresh(rune_names)
+        return
+
+    async with lock:
+        # Configure vars
+        rune_names = [name for name in rune_names if name in RUNES_DB]
+        if not rune_names:
+            return
+        url_list = [0]*len(rune_names)
+        for i, name in enumerate(rune_names):
+            url_list[i] = RUNES_DB[name]['url']
+        rune_cnt = len(rune_names)
+
+    # Extract price and volume elements; awaited on the bot's loop so commands keep running meanwhile
+    if isinstance(BROWSER, ScrapeWorkerPool) and not HTTP_FETCH:
+        await stream_price_volume(url_list)
+    else:
+        price_volume_elements = await scrape_elements(url_list,
+                                                      [PRICE_VOLUME_EXTRACTORS]*rune_cnt,
+                                                      [PRICE_EXTRACTION_MODE]*rune_cnt)
+        await store_price_volume(url_list, price_volume_elements)
+
+    async with lock:
+        # Due times are re-jittered on every run; on-demand refreshes push the scheduled one back
+        for name in rune_names:
+            SCHEDULER.reschedule(name, STATS.get(name))
+            if BREAKER.is_open(name):
+                SCHEDULER.add(name, due=BREAKER.next_probe(name)) # quarantined; next scrape is a probe
+
+def rune_last_updated(rune_name_standardized: str):
+    """Epoch time of a rune's latest sample, or None if it has none.
+    """
+    try:
+        return RUNES_DB[rune_name_standardized]['price_window'].latest_timestamp
+    except (KeyError, IndexError):
+        return None
+
+# On-demand and scheduled refreshes of the same rune share one in-flight scrape
+REFRESHER = RefreshCoordinator(refresh_runes, rune_last_updated)
+
+def track_runes(rune_names: list) -> None:
+    """Index runes that appeared in the daemon's database. Callers must hold `lock`.
+    """
+    for name in rune_names:
+        NAME_INDEX.add(name)
+    CRAWLER.mark_known(rune_names)
+
+async def on_feed_snapshot(entries: dict) -> None:
+    """Replace the mirrored database with the daemon's, on every (re)connect.
+    """
+    global RUNES_DB
+
+    async with lock:
+        RUNES_DB = entries
+        rune_names = [name for name in RUNES_DB if name != 'last_updated']
+        track_runes(rune_names)
+        # Samples missed while disconnected; the detector only needs the newest ones
+        missed = [name for name in rune_names
+                  if len(RUNES_DB[name]['price_window'])
+                  and RUNES_DB[name]['price_window'].latest_timestamp > DETECTOR.latest_timestamp(name)]
+        feed_detector(missed)
+        refresh_status_cache(rune_names)
+        if SHEETS is not None:
+            SHEETS.publish_all(RUNES_DB)
+
+async def on_feed_update(records: list) -> None:
+    """Apply the daemon's changes and pass runes with new samples downstream.
+    """
+    async with lock:
+        touched = list({record['rune'] for record in records if 'rune' in record})
+        track_runes([name for name in touched if name not in RUNES_DB])
+        sampled = apply_records(RUNES_DB, records)
+        FEED_SAMPLED.update(sampled)
+        for name in sampled:
+            price_window = RUNES_DB[name]['price_window']
+            STATS.update(name, price_window.latest_timestamp, price_window.latest_price, RUNES_DB[name]['volume'])
+        UNEVALUATED_RUNES.update(sampled)
+        feed_detector(sampled)
+        refresh_status_cache(touched)
+        publish_to_sheets(sampled)
+        if sampled:
+            await schedule_price_mvmt_check()
+
+async def on_feed_refreshed(rune_names: list, failed: list) -> None:
+    """Advance the mirrored windows of runes the daemon scraped without a change; those are not journaled.
+
+    Matches `runescrape.update_db_entries`, which samples every scraped rune, so the mirror's
+    latest timestamps (and the detector and stats fed from them) stay current.
+    """
+    now = int(time.time())
+    async with lock:
+        unchanged = [name for name in rune_names
+                     if name not in failed and name not in FEED_SAMPLED
+                     and name in RUNES_DB and len(RUNES_DB[name]['price_window'])
+                     and RUNES_DB[name]['price_window'].latest_timestamp < now]
+        FEED_SAMPLED.difference_update(rune_names)
+        for name in unchanged:
+            price_window = RUNES_DB[name]['price_window']
+            price_window.append(price_window.latest_price, now)
+            STATS.update(name, now, price_window.latest_price, RUNES_DB[name]['volume'])
+        feed_detector(unchanged)
+        refresh_status_cache(unchanged)
+
+async def on_feed_quarantine(entries: list) -> None:
+    """Mirror the daemon's quarantined runes and announce the ones that changed.
+    """
+    global FEED_QUARANTINE
+
+    previous, FEED_QUARANTINE = FEED_QUARANTINE, entries
+    if previous is None:
+        return # first list after the bot started; nothing changed from its point of view
+    previous_runes = {entry.rune for entry in previous}
+    runes = {entry.rune for entry in entries}
+    quarantined = [entry.rune for entry in entries if entry.rune not in previous_runes]
+    recovered = [entry.rune for entry in previous if entry.rune not in runes]
+    if quarantined or recovered:
+        await report_breaker(quarantined, recovered)
+
+# With SCRAPER_FEED set, scrape_daemon.py owns scraping and the database and the bot mirrors it;
+# metadata changes (!mintcnt, last_notified) are sent to the daemon to journal
+FEED = None
+FEED_TASK = None
+
+@tasks.loop(seconds=SCHEDULER_TICK) # Scrape whichever runes the scheduler says are due
+async def schedule_update_db():
+    global BLOCK_PENDING
+
+    block_triggered = False
+    async with lock:
+        if WATCHER is None:
+            rune_names = SCHEDULER.pop_due()
+        elif BLOCK_PENDING:
+            rune_names = SCHEDULER.pop_due(BLOCK_HORIZON)
+            block_triggered = True
+            # Keep draining only while the budget holds back runes due before the horizon
+            next_due = SCHEDULER.next_due()
+            BLOCK_PENDING = next_due is not None and next_due <= BLOCK_HORIZON
+        elif time.time() - LAST_BLOCK_TIME > BLOCK_MAX_WAIT:
+            rune_names = SCHEDULER.pop_due() # slow block; do not let prices go stale meanwhile
+        else:
+            return # prices mostly move with blocks; nothing to gain between them
+    if not rune_names:
+        return
+
+    # Scheduled runes are always rescraped; runes an !update is already scraping are joined
+    refreshed = False
+    try:
+        await REFRESHER.refresh_many(rune_names, max_age=0)
+        refreshed = True
+    except Exception as e:
+        print(f"Scheduled refresh of {len(rune_names)} runes failed: {e}")
+    finally:
+        if not refreshed:
+            # Popped runes are not due again until rescheduled; keep them on their schedule
+            for name in rune_names:
+                SCHEDULER.reschedule(name, STATS.get(name))
+    if not refreshed:
+        return
 
     # Check for price changes
     async with lock:
+        if block_triggered:
+            # Scraped for this block; not due again until past its horizon, even if hot
+            for name in rune_names:
+                SCHEDULER.defer(name, BLOCK_HORIZON + SCHEDULER_TICK)
         await schedule_price_mvmt_check()
 
-    # Update spreadsheet
-    #try:
-    #    worksheet, rune_names_std = init_worksheet_and_runes(SHEETS_URL)
-    #    runes_corresponding_prices = construct_runes_corresponding_prices(rune_names_std, RUNES_DB)
-    #    print("Updating sheet...")
-    #    update_worksheet(rune_names_std, worksheet, runes_corresponding_prices)
-    #except Exception as e:
-    #    print(e)
-    
     return
 
 @schedule_update_db.before_loop
@@ -419,6 +862,76 @@ async def schedule_update_before():
     await bot.wait_until_ready()
     print("Database schedule update function ready.")
 
+async def fetch_market_page(page_number: int) -> list:
+    """(standardized name, listing order) pairs of one market listing page, newest first.
+    """
+    url = runescrape.MARKET_LISTING_URL.format(page=page_number)
+    entries, = await scrape_elements([url], [MARKET_LISTING_EXTRACTORS], [DISCOVERY_MODE])
+    if isinstance(entries, Exception):
+        raise entries
+    return entries
+
+# New runes on the market are found incrementally; runes already tracked are never reported
+CRAWLER = None
+
+@tasks.loop(seconds=DISCOVERY_INTERVAL)
+async def schedule_discovery():
+    try:
+        await CRAWLER.crawl()
+    except Exception as e:
+        print(f"Market discovery failed: {e}")
+        return
+
+    candidates = CRAWLER.drain(DISCOVERY_BATCH)
+    if not candidates:
+        return
+
+    # Scrape every candidate's price and volume in one batch, then announce them together
+    url_list = [runescrape.rune_name_std_to_prices_url(candidate.rune) for candidate in candidates]
+    price_volume_elements = await scrape_elements(url_list,
+                                                  [PRICE_VOLUME_EXTRACTORS]*len(url_list),
+                                                  [PRICE_EXTRACTION_MODE]*len(url_list))
+    blocks = []
+    for candidate, elements in zip(candidates, price_volume_elements):
+        ticker = runescrape.rune_name_std_to_ticker(candidate.rune)
+        if isinstance(elements, Exception):
+            blocks.append(f"__{ticker}__: no listings yet (`!add {candidate.rune}`)\n")
+            continue
+        price, volume = elements
+        blocks.append(f"__{ticker}__: **{price} sats** per token | **{volume} BTC** volume (24h) (`!add {candidate.rune}`)\n")
+
+    msg_channel = bot.get_channel(BOT_CHANNEL_ID)
+    for page in paginate("# New runes on the market\n", blocks):
+        await send_timed(msg_channel, page)
+
+@schedule_discovery.before_loop
+async def schedule_discovery_before():
+    await bot.wait_until_ready()
+
+async def on_new_block(height: int, previous_height: int) -> None:
+    """Queue a block-triggered scrape and announce block-height milestones.
+    """
+    global BLOCK_PENDING, LAST_BLOCK_TIME, BLOCK_HORIZON
+    BLOCK_PENDING = True
+    LAST_BLOCK_TIME = time.time()
+    BLOCK_HORIZON = LAST_BLOCK_TIME + BLOCK_LOOKAHEAD
+
+    for milestone in crossed_milestones(previous_height, height):
+        msg_channel = bot.get_channel(BOT_CHANNEL_ID)
+        await send_timed(msg_channel, f"# Block {milestone:,} reached!\n"
+                               f"Bitcoin passed block height **{milestone:,}**.")
+
+@tasks.loop(seconds=BLOCK_POLL_INTERVAL)
+async def schedule_block_watch():
+    try:
+        await WATCHER.poll()
+    except Exception as e:
+        print(f"Block height check failed: {e}")
+
+@schedule_block_watch.before_loop
+async def schedule_block_watch_before():
+    await bot.wait_until_ready()
+
 # @schedule_price_mvmt_check.before_loop
 # async def schedule_mvmt_check_before():
 #     await bot.wait_until_ready()
@@ -427,11 +940,67 @@ async def schedule_update_before():
 @bot.event
 async def on_ready():
     print(f'{bot.user.name} has connected to Discord!')
-    schedule_update_db.start()
+    RATES.refresh_in_background()
+    global METRICS_SERVER, FEED_TASK
+    if METRICS_PORT and METRICS_SERVER is None:
+        METRICS_SERVER = await METRICS.serve()
+    if SHEETS is not None:
+        SHEETS.start()
+        async with lock:
+            SHEETS.publish_all(RUNES_DB) # every row, so the sheet starts from the current prices and rate
+    if FEED is not None:
+        if FEED_TASK is None: # on_ready fires again after reconnects
+            FEED_TASK = asyncio.create_task(FEED.run())
+    if FEED is None or DISCOVERY: # in feed mode the browser is only needed to crawl the market listing
+        await BROWSER.start()
+    if FEED is None and not schedule_update_db.is_running():
+        schedule_update_db.start()
+    if WATCHER is not None and not schedule_block_watch.is_running():
+        schedule_block_watch.start()
+    if DISCOVERY and not schedule_discovery.is_running():
+        schedule_discovery.start()
     # await asyncio.sleep(5)
     # schedule_price_mvmt_check.start()
 
 
+def setup() -> None:
+    """Recover the database and build the stores, indexes and services the bot runs on.
+    """
+    global STORE, RUNES_DB, PRICE_MVMT_LAST_CHECKED, HISTORY, NICKNAMES_DB, BROWSER, CRAWLER, FEED
+    STORE = DbStore(PRICE_DATABASE_PATH, PRICE_ARRAY_LEN)
+    RUNES_DB = STORE.recover()
+    try:
+        PRICE_MVMT_LAST_CHECKED = RUNES_DB['last_updated']
+    except:
+        PRICE_MVMT_LAST_CHECKED = "04:20:69 PM, 04/20/2000"
+    HISTORY = PriceHistory()
+    RUNES_DB = runescrape.fill_windows_from_history(RUNES_DB, HISTORY)
+    DETECTOR.load_history(HISTORY, RUNES_DB)
+    STATS.load_history(HISTORY, RUNES_DB)
+    SCHEDULER.add_many([name for name in RUNES_DB if name != 'last_updated'])
+
+    try:
+        NICKNAMES_DB = runescrape.read_json(NICKNAME_DATABASE_PATH)
+    except:
+        NICKNAMES_DB = {}
+    for name in RUNES_DB:
+        if name != 'last_updated':
+            NAME_INDEX.add(name)
+    for rune_nickname, rune_name in NICKNAMES_DB.items():
+        NAME_INDEX.add(runescrape.rune_name_standardizer(rune_nickname), rune_name)
+
+    BROWSER = ScrapeWorkerPool() if SCRAPE_WORKERS else BrowserService()
+    CRAWLER = DiscoveryCrawler(fetch_market_page)
+    CRAWLER.mark_known([name for name in RUNES_DB if name != 'last_updated'])
+    if WATCHER is not None:
+        WATCHER.subscribe(on_new_block)
+    if SCRAPER_FEED:
+        FEED = FeedClient(on_feed_snapshot, on_feed_update, on_refreshed=on_feed_refreshed,
+                          on_quarantine=on_feed_quarantine)
+        STORE = FEED
+
+
 if __name__ == "__main__":
+    setup()
     bot.run(access_token)
     
@@ -0,0 +1,82 @@
+
+import os
+import time
+
+from typing import Dict, List, NamedTuple, Optional
+
+
+# Config variables
+BREAKER_FAILURES = int(os.getenv('BREAKER_FAILURES', 3)) # consecutive failed scrapes that quarantine a rune
+BREAKER_PROBE_INTERVAL = 30*60 # s between probe scrapes of a quarantined rune at first
+BREAKER_PROBE_MAX = 6*60*60 # s between probes at most; the interval doubles after each failed probe
+
+
+class Quarantined(NamedTuple):
+    rune: str
+    failures: int # consecutive failed scrapes
+    error: str # latest failure
+    since: float # epoch time the rune was quarantined
+    next_probe: float # epoch time of the next probe scrape
+
+class CircuitBreaker:
+    """Per-rune circuit breaker over scrape outcomes.
+
+    After `failures` consecutive failed scrapes a rune is quarantined (open) and
+    only probed every `probe_interval` seconds, doubling after each failed probe
+    up to `probe_max`. A successful scrape closes it again. The breaker only
+    tracks state; the caller decides what to skip and reschedules probes.
+    """
+    def __init__(self,
+                 failures: int = BREAKER_FAILURES,
+                 probe_interval: float = BREAKER_PROBE_INTERVAL,
+                 probe_max: float = BREAKER_PROBE_MAX):
+        self.failures = failures
+        self.probe_interval = probe_interval
+        self.probe_max = probe_max
+        self._failures: Dict[str, int] = {}
+        self._errors: Dict[str, str] = {}
+        self._open: Dict[str, List[float]] = {} # rune -> [since, current probe interval, next probe]
+
+    def is_open(self, rune: str) -> bool:
+        return rune in self._open
+
+    def next_probe(self, rune: str) -> Optional[float]:
+        state = self._open.get(rune)
+        return state[2] if state else None
+
+    def allow(self, rune: str, now: float = None) -> bool:
+        """False while `rune` is quarantined and its next probe is not due.
+        """
+        state = self._open.get(rune)
+        return state is None or (time.time() if now is None else now) >= state[2]
+
+    def record_success(self, rune: str) -> bool:
+        """Reset the rune's failures; returns True if this closed its quarantine.
+        """
+        self._failures.pop(rune, None)
+        self._errors.pop(rune, None)
+        return self._open.pop(rune, None) is not None
+
+    def record_failure(self, rune: str, error = None, now: float = None) -> bool:
+        """Count a failed scrape; returns True if this quarantined the rune.
+        """
+        now = time.time() if now is None else now
+        self._failures[rune] = self._failures.get(rune, 0) + 1
+        self._errors[rune] = error if isinstance(error, str) else repr(error)
+
+        state = self._open.get(rune)
+        if state is not None: # failed probe; back off further
+            state[1] = min(self.probe_max, 2*state[1])
+            state[2] = now + state[1]
+            return False
+        if self._failures[rune] < self.failures:
+            return False
+        self._open[rune] = [now, self.probe_interval, now + self.probe_interval]
+        return True
+
+    def quarantined(self) -> List[Quarantined]:
+        """Quarantined runes, longest quarantined first.
+        """
+        return sorted((Quarantined(rune, self._failures.get(rune, 0), self._errors.get(rune, ''), since, next_probe)
+                       for rune, (since, _, next_probe) in self._open.items()),
+                      key=lambda entry: entry.since)
@@ -0,0 +1,160 @@
+
+import asyncio
+
+from contextlib import asynccontextmanager
+from playwright.async_api import async_playwright
+from playwright.async_api import Page, Browser, BrowserContext, Playwright
+from typing import List, Tuple, Union, Callable, Optional
+
+import runescrape
+from runescrape import SCRAPE_CONCURRENCY, HostRateLimiter
+
+
+class BrowserService:
+    """Long-lived Chromium instance that hands out warm pages.
+
+    Start once with the bot, borrow pages with `page()`/`pages()` or scrape with
+    `extract_elements()`. If Chromium crashes it is relaunched on the next borrow.
+    """
+    def __init__(self, pool_size: int = SCRAPE_CONCURRENCY, **launch_kwargs):
+        self.pool_size = pool_size
+        self.launch_kwargs = launch_kwargs
+        self.restarts = 0
+
+        self._playwright: Optional[Playwright] = None
+        self._browser: Optional[Browser] = None
+        self._idle: asyncio.Queue = None # warm (context, page) pairs ready to borrow
+        self._slots: asyncio.Semaphore = None # bounds pages handed out at once
+        self._lock = asyncio.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def start(self) -> None:
+        """Launch Chromium if it is not already running. Safe to call repeatedly.
+        """
+        async with self._lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+                self._slots = asyncio.Semaphore(self.pool_size)
+            if not self.running:
+                await self._launch()
+
+    async def stop(self) -> None:
+        """Close Chromium and Playwright.
+        """
+        async with self._lock:
+            if self._browser is not None:
+                try:
+                    await self._browser.close()
+                except Exception as e:
+                    print(e)
+                self._browser = None
+            if self._playwright is not None:
+                await self._playwright.stop()
+                self._playwright = None
+
+    async def _launch(self) -> None:
+        """(Re)launch Chromium and drop any pages that belonged to the old instance.
+        """
+        if self._browser is not None:
+            self.restarts += 1
+            print(f"Restarting Chromium (restart #{self.restarts})...")
+        self._idle = asyncio.Queue()
+        self._browser = await self._playwright.chromium.launch(**self.launch_kwargs)
+        self._browser.on("disconnected", self._on_disconnected)
+
+    def _on_disconnected(self, browser: Browser) -> None:
+        if browser is self._browser:
+            print("Chromium disconnected.")
+
+    async def _ensure_browser(self) -> Browser:
+        if not self.running:
+            await self.start()
+        return self._browser
+
+    async def _checkout(self) -> Tuple[BrowserContext, Page]:
+        """Take a warm page from the pool or open a new one.
+        """
+        browser = await self._ensure_browser()
+        while not self._idle.empty():
+            context, page = self._idle.get_nowait()
+            if context.browser is browser and not page.is_closed():
+                return context, page
+        context = await browser.new_context()
+        page = await context.new_page()
+        return context, page
+
+    async def _checkin(self, context: BrowserContext, page: Page) -> None:
+        """Return a page to the pool; pages from a dead browser are discarded.
+        """
+        if self.running and context.browser is self._browser and not page.is_closed():
+            self._idle.put_nowait((context, page))
+            return
+        try:
+            await context.close()
+        except Exception:
+            pass
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow one warm page, e.g. for a single `!add` lookup.
+        """
+        async with self.pages(1) as pages:
+            yield pages[0]
+
+    @asynccontextmanager
+    async def pages(self, count: int):
+        """Borrow up to `count` warm pages (bounded by the pool size).
+        """
+        count = max(1, min(count, self.pool_size))
+        for _ in range(count):
+            await self._slots.acquire()
+        borrowed = []
+        try:
+            for _ in range(count):
+                borrowed.append(await self._checkout())
+            yield [page for _, page in borrowed]
+        finally:
+            for context, page in borrowed:
+                await self._checkin(context, page)
+            for _ in range(count):
+                self._slots.release()
+
+    async def extract_elements(self,
+                               url_list: List[str],
+                               extract_func_list: List[Callable[[List[int], Page], List[Union[int, float]]]],
+                               selectors_list: List[List[str]],
+                               concurrency: int = None,
+                               rate_limiter: HostRateLimiter = None) -> List[Union[List[float], float]]:
+        """Same contract as `runescrape.extract_elements` but on warm pages.
+
+        URLs that failed because Chromium crashed mid-run are retried once on the relaunched browser.
+        """
+        if not url_list:
+            return []
+        concurrency = concurrency or self.pool_size
+        rate_limiter = rate_limiter or HostRateLimiter()
+
+        restarts_before = self.restarts
+        async with self.pages(min(concurrency, len(url_list))) as pages:
+            elements = await runescrape.extract_elements_with_pages(pages, url_list, extract_func_list,
+                                                                    selectors_list, rate_limiter=rate_limiter)
+        crashed = not self.running or self.restarts != restarts_before
+        if not crashed:
+            return elements
+
+        # Retry only the URLs that failed while the browser was going down
+        failed = [i for i, el in enumerate(elements) if isinstance(el, Exception)]
+        if failed:
+            async with self.pages(min(concurrency, len(failed))) as pages:
+                retried = await runescrape.extract_elements_with_pages(pages,
+                                                                       [url_list[i] for i in failed],
+                                                                       [extract_func_list[i] for i in failed],
+                                                                       [selectors_list[i] for i in failed],
+                                                                       rate_limiter=rate_limiter)
+            for i, el in zip(failed, retried):
+                elements[i] = el
+
+        return elements
@@ -0,0 +1,140 @@
+
+import os
+import json
+import base64
+import asyncio
+import hashlib
+
+from array import array
+from bisect import bisect_left
+from typing import Awaitable, Callable, Iterable, List, NamedTuple, Optional, Tuple
+
+
+# Config variables
+DISCOVERY_STATE_PATH = os.getenv('DISCOVERY_STATE_PATH', 'discovery_state.json')
+DISCOVERY_MAX_PAGES = int(os.getenv('DISCOVERY_MAX_PAGES', 20)) # listing pages walked per pass at most
+
+
+def _rune_hash(rune: str) -> int:
+    return int.from_bytes(hashlib.blake2b(rune.encode(), digest_size=8).digest(), 'little')
+
+class KnownRunes:
+    """Compact set of rune names: a sorted array of 64-bit hashes (8 bytes per rune).
+    """
+    def __init__(self, hashes: Iterable[int] = ()):
+        self._hashes = array('Q', sorted(set(hashes)))
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    def __contains__(self, rune: str) -> bool:
+        value = _rune_hash(rune)
+        i = bisect_left(self._hashes, value)
+        return i < len(self._hashes) and self._hashes[i] == value
+
+    def add(self, rune: str) -> bool:
+        """Insert `rune`; returns False if it was already known.
+        """
+        value = _rune_hash(rune)
+        i = bisect_left(self._hashes, value)
+        if i < len(self._hashes) and self._hashes[i] == value:
+            return False
+        self._hashes.insert(i, value)
+        return True
+
+    def to_str(self) -> str:
+        return base64.b64encode(self._hashes.tobytes()).decode()
+
+    @classmethod
+    def from_str(cls, encoded: str) -> "KnownRunes":
+        known = cls()
+        known._hashes.frombytes(base64.b64decode(encoded))
+        return known
+
+class Candidate(NamedTuple):
+    rune: str # standardized rune name
+    order: Optional[float] # listing order (e.g. rune number), newest highest
+
+class DiscoveryCrawler:
+    """Incremental crawl of the runes market listing for runes not seen before.
+
+    The listing is walked newest first, one page per `fetch_page(page_number)` call,
+    which returns (standardized name, order) pairs. A pass stops at the first page
+    holding nothing new, i.e. nothing above the stored cursor (the highest order
+    seen) and nothing missing from `known`, so passes only touch recent pages.
+    The first pass only reads the newest page to set the cursor: existing runes are
+    not news. New runes are put on `candidates` for metadata scraping and notification.
+    """
+    def __init__(self,
+                 fetch_page: Callable[[int], Awaitable[List[Tuple[str, Optional[float]]]]],
+                 state_path: str = DISCOVERY_STATE_PATH,
+                 max_pages: int = DISCOVERY_MAX_PAGES):
+        self.fetch_page = fetch_page
+        self.state_path = state_path
+        self.max_pages = max_pages
+        self.cursor: Optional[float] = None
+        self.known = KnownRunes()
+        self.candidates: asyncio.Queue = asyncio.Queue()
+        self.load()
+
+    def load(self) -> None:
+        try:
+            with open(self.state_path, 'r') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return
+        self.cursor = state.get('cursor')
+        self.known = KnownRunes.from_str(state.get('known', ''))
+
+    def save(self) -> None:
+        tmp_path = self.state_path + ".tmp"
+        with open(tmp_path, 'w') as file:
+            json.dump({'cursor': self.cursor, 'known': self.known.to_str()}, file)
+        os.replace(tmp_path, self.state_path)
+
+    def mark_known(self, runes: Iterable[str]) -> None:
+        """Record runes that are already tracked so they are never reported.
+        """
+        for rune in runes:
+            self.known.add(rune)
+
+    async def crawl(self) -> int:
+        """Walk the listing until a page holds nothing new; returns the number of candidates queued.
+        """
+        baseline = self.cursor is None
+        newest = self.cursor
+        found = 0
+        for page_number in range(1, self.max_pages + 1):
+            entries = await self.fetch_page(page_number)
+            if not entries:
+                break
+
+            page_has_new = False
+            for rune, order in entries:
+                # Listings above the cursor are new; without an order only membership can tell
+                if order is None:
+                    is_new = rune not in self.known
+                else:
+                    is_new = self.cursor is None or order > self.cursor
+                    newest = order if newest is None else max(newest, order)
+                if not is_new:
+                    continue
+                page_has_new = True
+                if self.known.add(rune) and not baseline:
+                    self.candidates.put_nowait(Candidate(rune, order))
+                    found += 1
+
+            if baseline or not page_has_new:
+                break
+
+        self.cursor = newest
+        await asyncio.to_thread(self.save)
+        return found
+
+    def drain(self, max_batch: int = None) -> List[Candidate]:
+        """Take queued candidates (at most `max_batch`) without waiting.
+        """
+        candidates = []
+        while not self.candidates.empty() and (max_batch is None or len(candidates) < max_batch):
+            candidates.append(self.candidates.get_nowait())
+        return candidates
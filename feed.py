@@ -0,0 +1,283 @@
+
+import os
+import json
+import asyncio
+
+from typing import Awaitable, Callable, Dict, List, Optional, Set
+
+from runescrape import PRICE_ARRAY_LEN, load_price_windows, _encode_json_object
+from persistence import DbStore, Record, _apply_record
+from breaker import Quarantined
+
+
+# Config variables
+FEED_SOCKET_PATH = os.getenv('FEED_SOCKET_PATH', 'runescrape.sock')
+FEED_CLIENT_BUFFER = 1000 # events queued per subscriber before it is dropped (it resyncs from a snapshot)
+FEED_RECONNECT_MAX = 30 # s between reconnect attempts at most
+FEED_REQUEST_TIMEOUT = 5*60 # s to wait for the daemon to scrape requested runes
+FEED_LINE_LIMIT = 256*1024*1024 # bytes per message; a snapshot holds the whole database on one line
+
+
+# Wire format: one JSON object per line.
+#   daemon -> subscriber: {"type": "snapshot", "seq": n, "db": {...}}            (first message)
+#                         {"type": "update", "seq": n, "records": [journal records]}
+#                         {"type": "refreshed", "runes": [...], "failed": [...]}  (after each scrape batch)
+#                         {"type": "quarantine", "entries": [...]}              (after the snapshot and on changes)
+#   subscriber -> daemon: {"op": "refresh", "runes": [...]}, {"op": "add", "rune": name},
+#                         {"op": "set", "rune": name, "fields": {...}}
+
+def _encode(message: dict) -> bytes:
+    return (json.dumps(message, separators=(',', ':'), default=_encode_json_object) + "\n").encode()
+
+def load_snapshot(db: dict, price_array_len: int = PRICE_ARRAY_LEN) -> dict:
+    """Turn a snapshot's serialized database into a RUNES_DB-style dict.
+    """
+    return load_price_windows(db, price_array_len)
+
+def apply_records(entries: dict, records: List[Record], price_array_len: int = PRICE_ARRAY_LEN) -> List[str]:
+    """Apply an update's journal records to `entries`; returns the runes that got a new sample.
+    """
+    sampled = []
+    for record in records:
+        _apply_record(entries, record, price_array_len)
+        if 'sample' in record:
+            sampled.append(record['rune'])
+    return sampled
+
+class FeedServer:
+    """Unix socket pub/sub of per-rune updates, owned by the scraper daemon.
+
+    A subscriber first gets a snapshot of the whole database, then every update
+    published after it, in order. Subscribers that fall `FEED_CLIENT_BUFFER`
+    events behind are disconnected and resync from a fresh snapshot when they
+    reconnect. Requests from subscribers are passed to `on_request`.
+    """
+    def __init__(self,
+                 snapshot: Callable[[], Awaitable[dict]],
+                 on_request: Callable[[dict], Awaitable[None]] = None,
+                 path: str = FEED_SOCKET_PATH):
+        self.snapshot = snapshot
+        self.on_request = on_request
+        self.path = path
+        self.seq = 0
+        self.quarantine: List[dict] = [] # latest breaker state, as `Quarantined` dicts
+        self._clients: Set[asyncio.Queue] = set()
+        self._requests: Set[asyncio.Task] = set() # referenced until done, so they are not garbage collected
+        self._server: asyncio.AbstractServer = None
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._clients)
+
+    async def start(self) -> None:
+        if os.path.exists(self.path):
+            os.unlink(self.path) # left behind by a daemon that did not shut down cleanly
+        self._server = await asyncio.start_unix_server(self._handle, path=self.path, limit=FEED_LINE_LIMIT)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for client in list(self._clients):
+            client.put_nowait(None)
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+    def _broadcast(self, message: dict) -> None:
+        line = _encode(message) # encoded once for every subscriber
+        for client in list(self._clients):
+            try:
+                client.put_nowait(line)
+            except asyncio.QueueFull:
+                self._clients.discard(client)
+                client.get_nowait()
+                client.put_nowait(None) # too slow; drop it so it resyncs
+
+    def publish(self, records: List[Record]) -> None:
+        """Send journal records to every subscriber. Must be called on the event loop.
+        """
+        if not records:
+            return
+        self.seq += 1
+        self._broadcast({'type': 'update', 'seq': self.seq, 'records': records})
+
+    def refreshed(self, runes: List[str], failed: List[str] = ()) -> None:
+        """Tell subscribers a scrape of `runes` finished, whether or not anything changed.
+        """
+        self._broadcast({'type': 'refreshed', 'runes': list(runes), 'failed': list(failed)})
+
+    def publish_quarantine(self, entries: List[Quarantined]) -> None:
+        """Send the daemon's quarantined runes to every subscriber if they changed.
+        """
+        entries = [entry._asdict() for entry in entries]
+        if entries == self.quarantine:
+            return
+        self.quarantine = entries
+        self._broadcast({'type': 'quarantine', 'entries': entries})
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = asyncio.Queue(FEED_CLIENT_BUFFER)
+        # Snapshot and registration happen without an await in between, so no update is missed or repeated
+        db = await self.snapshot()
+        client.put_nowait(_encode({'type': 'snapshot', 'seq': self.seq, 'db': db}))
+        client.put_nowait(_encode({'type': 'quarantine', 'entries': self.quarantine}))
+        self._clients.add(client)
+
+        async def send():
+            while (line := await client.get()) is not None:
+                writer.write(line)
+                await writer.drain()
+            writer.close()
+
+        sender = asyncio.create_task(send())
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                except ValueError:
+                    continue
+                if self.on_request is not None:
+                    task = asyncio.create_task(self.on_request(request))
+                    self._requests.add(task)
+                    task.add_done_callback(self._requests.discard)
+        except ConnectionError:
+            pass
+        finally:
+            self._clients.discard(client)
+            sender.cancel()
+            writer.close()
+
+class FeedStore(DbStore):
+    """`DbStore` that also publishes every journaled record on a `FeedServer`.
+
+    `append` runs in worker threads, so records are handed to the loop thread-safely.
+    """
+    def __init__(self, snapshot_path: str, price_array_len: int, **kwargs):
+        super().__init__(snapshot_path, price_array_len, **kwargs)
+        self.server: Optional[FeedServer] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def append(self, records: List[Record]) -> None:
+        super().append(records)
+        if self.server is not None and records:
+            self.loop.call_soon_threadsafe(self.server.publish, records)
+
+class FeedClient:
+    """Subscriber side of the feed; reconnects (and resyncs) until stopped.
+
+    `on_snapshot(entries)` gets the full database after every (re)connect,
+    `on_update(records)` each later update, and (if given) `on_refreshed(runes, failed)`
+    every finished scrape batch and `on_quarantine(entries)` the daemon's quarantined
+    runes whenever they change. Requests to the daemon are sent with
+    `refresh`, `add` and `set_fields`; the latter is thread-safe and stands in for
+    `DbStore.set_fields` in processes that do not own the database.
+    """
+    def __init__(self,
+                 on_snapshot: Callable[[dict], Awaitable[None]],
+                 on_update: Callable[[List[Record]], Awaitable[None]],
+                 path: str = FEED_SOCKET_PATH,
+                 on_refreshed: Callable[[List[str], List[str]], Awaitable[None]] = None,
+                 on_quarantine: Callable[[List[Quarantined]], Awaitable[None]] = None):
+        self.on_snapshot = on_snapshot
+        self.on_update = on_update
+        self.on_refreshed = on_refreshed
+        self.on_quarantine = on_quarantine
+        self.path = path
+        self.seq = 0
+        self.connected = asyncio.Event()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._waiters: List[tuple] = [] # (runes still pending, failed, future)
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        delay = 1
+        while True:
+            try:
+                reader, self._writer = await asyncio.open_unix_connection(self.path, limit=FEED_LINE_LIMIT)
+                delay = 1
+                await self._read(reader)
+                print("Scraper feed closed; reconnecting...")
+            except OSError as e:
+                print(f"Scraper feed unavailable ({e}); retrying in {delay} s...")
+            except Exception as e:
+                print(f"Scraper feed failed ({e}); resyncing in {delay} s...")
+            finally:
+                self.connected.clear()
+                if self._writer is not None:
+                    self._writer.close()
+                    self._writer = None
+            await asyncio.sleep(delay)
+            delay = min(2*delay, FEED_RECONNECT_MAX)
+
+    async def _read(self, reader: asyncio.StreamReader) -> None:
+        while line := await reader.readline():
+            message = json.loads(line)
+            kind = message.get('type')
+            if kind == 'snapshot':
+                self.seq = message['seq']
+                await self.on_snapshot(load_snapshot(message['db']))
+                self.connected.set()
+            elif kind == 'update':
+                if message['seq'] <= self.seq:
+                    continue
+                self.seq = message['seq']
+                await self.on_update(message['records'])
+            elif kind == 'refreshed':
+                if self.on_refreshed is not None:
+                    await self.on_refreshed(message['runes'], message.get('failed', []))
+                self._resolve(message['runes'], message.get('failed', []))
+            elif kind == 'quarantine':
+                if self.on_quarantine is not None:
+                    await self.on_quarantine([Quarantined(**entry) for entry in message['entries']])
+
+    def _resolve(self, runes: List[str], failed: List[str]) -> None:
+        for waiter in list(self._waiters):
+            pending, failures, future = waiter
+            pending.difference_update(runes)
+            failures.update(set(failed) & set(runes))
+            if not pending:
+                self._waiters.remove(waiter)
+                if not future.done():
+                    future.set_result(failures)
+
+    def _send(self, request: dict) -> None:
+        if self._writer is None:
+            raise ConnectionError("Not connected to the scraper feed")
+        self._writer.write(_encode(request))
+
+    async def _request(self, request: dict, runes: List[str], timeout: float) -> Set[str]:
+        """Send a request and wait until the daemon reports every rune scraped; returns the failed ones.
+        """
+        future = self._loop.create_future()
+        waiter = (set(runes), set(), future)
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(self.connected.wait(), timeout)
+            self._send(request)
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    async def refresh(self, runes: List[str], timeout: float = FEED_REQUEST_TIMEOUT) -> Set[str]:
+        return await self._request({'op': 'refresh', 'runes': list(runes)}, runes, timeout)
+
+    async def add(self, rune: str, timeout: float = FEED_REQUEST_TIMEOUT) -> bool:
+        """Have the daemon scrape and track a new rune; False if its price scrape failed.
+        """
+        return not await self._request({'op': 'add', 'rune': rune}, [rune], timeout)
+
+    def set_fields(self, rune: str, fields: dict) -> None:
+        """Have the daemon journal a metadata change of one rune.
+        """
+        self._loop.call_soon_threadsafe(self._send_quietly, {'op': 'set', 'rune': rune, 'fields': fields})
+
+    def _send_quietly(self, request: dict) -> None:
+        try:
+            self._send(request)
+        except ConnectionError as e:
+            print(f"Dropped {request['op']} request: {e}")
@@ -0,0 +1,129 @@
+
+import os
+import sqlite3
+import threading
+
+from typing import List, Tuple, Dict, Iterable
+
+
+# Config variables
+HISTORY_DATABASE_PATH = os.getenv('HISTORY_DATABASE_PATH', 'history.sqlite3')
+
+Sample = Tuple[int, float, float] # (epoch timestamp, price in sats, volume in BTC)
+Run = Tuple[int, float, float, int] # (first ts, price, volume, last ts) of identical consecutive samples
+
+
+def _expand(runs: Iterable[Run]) -> List[Sample]:
+    """Samples of run-length-encoded rows: each run's first and (if later) last sample.
+    """
+    samples = []
+    for ts, price, volume, until_ts in runs:
+        samples.append((ts, price, volume))
+        if until_ts > ts:
+            samples.append((until_ts, price, volume))
+    return samples
+
+class PriceHistory:
+    """Append-only SQLite (WAL mode) store of every scraped rune sample.
+
+    Rows are clustered on (rune, ts), so range scans and "latest N" per rune are index seeks.
+    Consecutive identical samples of a rune are run-length encoded: the run's row keeps
+    its first `ts` and `until_ts` is moved forward; readers get the run's two endpoints.
+    """
+    def __init__(self, path: str = HISTORY_DATABASE_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False) # written from asyncio.to_thread workers
+        self._lock = threading.Lock()
+        self._last_runs: Dict[str, Run] = {} # rune -> its newest run, cached for appends
+
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL") # WAL keeps this crash-safe
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS samples (
+                    rune TEXT NOT NULL,
+                    ts INTEGER NOT NULL,
+                    price REAL,
+                    volume REAL,
+                    until_ts INTEGER,
+                    PRIMARY KEY (rune, ts)
+                ) WITHOUT ROWID
+                """)
+            # Databases from before run-length encoding: every row is a run of one sample
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(samples)")]
+            if 'until_ts' not in columns:
+                self._conn.execute("ALTER TABLE samples ADD COLUMN until_ts INTEGER")
+                self._conn.execute("UPDATE samples SET until_ts = ts")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS samples_until ON samples (rune, until_ts)")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def append(self, rune: str, ts: int, price: float, volume: float = None) -> None:
+        self.append_many([(rune, ts, price, volume)])
+
+    def _last_run(self, rune: str) -> Run:
+        if rune not in self._last_runs:
+            self._last_runs[rune] = self._conn.execute("SELECT ts, price, volume, until_ts FROM samples "
+                                                       "WHERE rune = ? ORDER BY ts DESC LIMIT 1",
+                                                       (rune,)).fetchone()
+        return self._last_runs[rune]
+
+    def append_many(self, rows: Iterable[Tuple[str, int, float, float]]) -> None:
+        """Store (rune, ts, price, volume) rows in one transaction.
+
+        A sample equal to its rune's newest one extends that run instead of adding a row.
+        """
+        inserts, extends = [], []
+        with self._lock, self._conn:
+            for rune, ts, price, volume in rows:
+                run = self._last_run(rune)
+                if run is not None and ts == run[3]:
+                    continue # a second sample in the newest sample's second; keep the first
+                if run is not None and run[1] == price and run[2] == volume and ts > run[3]:
+                    extends.append((ts, rune, run[0]))
+                    self._last_runs[rune] = (run[0], price, volume, ts)
+                else:
+                    inserts.append((rune, ts, price, volume, ts))
+                    if run is None or ts > run[3]:
+                        self._last_runs[rune] = (ts, price, volume, ts)
+                    else:
+                        self._last_runs.pop(rune) # out-of-order sample; re-read on the next append
+            # Nor does an out-of-order one landing on a stored run start
+            self._conn.executemany("INSERT OR IGNORE INTO samples (rune, ts, price, volume, until_ts) "
+                                   "VALUES (?, ?, ?, ?, ?)", inserts)
+            # After the inserts, since a run may have started earlier in this batch
+            self._conn.executemany("UPDATE samples SET until_ts = ? WHERE rune = ? AND ts = ?", extends)
+
+    def range(self, rune: str, start_ts: int, end_ts: int) -> List[Sample]:
+        """Samples of `rune` with start_ts <= ts < end_ts, oldest first.
+        """
+        with self._lock:
+            runs = self._conn.execute("SELECT ts, price, volume, until_ts FROM samples "
+                                      "WHERE rune = ? AND until_ts >= ? AND ts < ? ORDER BY ts",
+                                      (rune, start_ts, end_ts)).fetchall()
+        return [sample for sample in _expand(runs) if start_ts <= sample[0] < end_ts]
+
+    def latest(self, rune: str, n: int) -> List[Sample]:
+        """Last `n` samples of `rune`, oldest first.
+        """
+        with self._lock:
+            runs = self._conn.execute("SELECT ts, price, volume, until_ts FROM samples "
+                                      "WHERE rune = ? ORDER BY ts DESC LIMIT ?",
+                                      (rune, n)).fetchall()
+        runs.reverse()
+        return _expand(runs)[-n:] if n > 0 else []
+
+    def latest_many(self, runes: Iterable[str], n: int) -> Dict[str, List[Sample]]:
+        return {rune: self.latest(rune, n) for rune in runes}
+
+    def runes(self) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT rune FROM samples")]
+
+    def count(self, rune: str = None) -> int:
+        with self._lock:
+            if rune is None:
+                return self._conn.execute("SELECT COUNT(*) FROM samples").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM samples WHERE rune = ?", (rune,)).fetchone()[0]
@@ -0,0 +1,145 @@
+
+import os
+import time
+import bisect
+import threading
+
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from aiohttp import web
+
+
+# Config variables
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', 9108)) # 0 disables the endpoint
+METRICS_PREFIX = 'runescrape'
+# Upper bounds (s) of the latency histogram buckets; +Inf is implied
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0]
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _labels(**labels) -> Labels:
+    return tuple(sorted((key, value) for key, value in labels.items() if value is not None))
+
+def _format_labels(labels: Labels, extra: str = None) -> str:
+    parts = ['%s="%s"' % (key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for key, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class Histogram:
+    """Cumulative-bucket latency histogram in the Prometheus layout.
+    """
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self):
+        self.counts = [0]*(len(LATENCY_BUCKETS) + 1) # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float) -> None:
+        self.counts[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-quantile (inf if past the last bucket).
+        """
+        rank = q*self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank and count:
+                return LATENCY_BUCKETS[i] if i < len(LATENCY_BUCKETS) else float('inf')
+        return 0.0
+
+class Metrics:
+    """Thread-safe per-stage/per-rune latency histograms and counters.
+
+    Stages are timed with `with METRICS.time('goto', rune):`, which also works around
+    awaits, and from the worker threads `update_db_entries` runs in.
+    """
+    def __init__(self):
+        self.histograms: Dict[Labels, Histogram] = {}
+        self.counters: Dict[Tuple[str, Labels], float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float, rune: str = None) -> None:
+        key = _labels(stage=stage, rune=rune)
+        with self._lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage: str, rune: str = None):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, rune)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = (name, _labels(**labels))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def stages(self, rune: str = None) -> Dict[str, Histogram]:
+        """Histograms merged per stage, over every rune or for one rune.
+        """
+        merged = {}
+        with self._lock:
+            for labels, histogram in self.histograms.items():
+                labels = dict(labels)
+                if rune is not None and labels.get('rune') != rune:
+                    continue
+                merged.setdefault(labels['stage'], Histogram()).merge(histogram)
+        return merged
+
+    def render(self) -> str:
+        """Prometheus text exposition of every histogram and counter.
+        """
+        name = f"{METRICS_PREFIX}_stage_seconds"
+        lines = [f"# HELP {name} Time spent per stage and rune.", f"# TYPE {name} histogram"]
+        with self._lock:
+            for labels, histogram in sorted(self.histograms.items()):
+                cumulative = 0
+                for bound, count in zip(LATENCY_BUCKETS + ['+Inf'], histogram.counts):
+                    cumulative += count
+                    bucket_labels = _format_labels(labels, 'le="%s"' % bound)
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+            typed = set()
+            for (counter, labels), value in sorted(self.counters.items()):
+                full_name = f"{METRICS_PREFIX}_{counter}_total"
+                if full_name not in typed:
+                    typed.add(full_name)
+                    lines.append(f"# TYPE {full_name} counter")
+                lines.append(f"{full_name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    async def serve(self, host: str = METRICS_HOST, port: int = METRICS_PORT) -> web.AppRunner:
+        """Expose `render()` at http://host:port/metrics; returns the runner to clean up.
+        """
+        async def handle(request):
+            return web.Response(text=self.render(), content_type='text/plain', charset='utf-8')
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, host, port).start()
+        return runner
+
+# Shared instance every module records into
+METRICS = Metrics()
@@ -0,0 +1,187 @@
+
+import time
+import numpy as np
+
+from typing import List, Tuple, Dict, NamedTuple, Iterable
+
+
+# Config variables
+# (label, window length in s, percent threshold at the reference volume)
+ALERT_WINDOWS = [
+    ('15m', 15*60, 5.0),
+    ('1h', 60*60, 7.5),
+    ('24h', 24*60*60, 20.0)
+    ]
+SAMPLE_INTERVAL = 5*60 # s between scheduled scrapes; sizes the matrix
+WINDOW_SLACK = 0.5 # reference sample may be up to this fraction of the window older than the window start
+VOLUME_REFERENCE = 1.0 # BTC 24h volume at which thresholds apply unscaled
+VOLUME_SCALE_BOUNDS = (0.5, 3.0) # thin markets need bigger moves, deep ones smaller
+
+
+class Alert(NamedTuple):
+    rune: str
+    window: str
+    percent_change: float
+    price: float
+    ref_price: float
+    timestamp: int
+
+class MovementDetector:
+    """Multi-window price-movement detector over a 2-D matrix of all tracked runes.
+
+    Row r holds rune r's most recent samples as a per-row ring (prices and epoch
+    timestamps); `evaluate` computes every rune's percent change over every window
+    and its volume-weighted threshold in one vectorized pass.
+    """
+    def __init__(self,
+                 windows: List[Tuple[str, int, float]] = ALERT_WINDOWS,
+                 sample_interval: int = SAMPLE_INTERVAL,
+                 volume_reference: float = VOLUME_REFERENCE):
+        self.labels = [label for label, _, _ in windows]
+        self.lengths = np.array([length for _, length, _ in windows], dtype=np.int64)
+        self.thresholds = np.array([threshold for _, _, threshold in windows], dtype=np.float64)
+        self.volume_reference = volume_reference
+
+        self.sample_interval = sample_interval
+        longest = int(self.lengths.max()*(1 + WINDOW_SLACK))
+        self.capacity = longest//sample_interval + 2 # samples per row
+
+        self.runes: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._allocate(16)
+
+    def _allocate(self, rows: int) -> None:
+        """(Re)allocate the matrices for `rows` runes, keeping existing data.
+        """
+        old = getattr(self, 'prices', None)
+        prices = np.full((rows, self.capacity), np.nan)
+        timestamps = np.full((rows, self.capacity), -1, dtype=np.int64) # -1 marks an empty slot
+        heads = np.zeros(rows, dtype=np.int64)
+        volumes = np.zeros(rows)
+        last_alerted = np.full((rows, len(self.labels)), -1, dtype=np.int64)
+        if old is not None:
+            n = old.shape[0]
+            prices[:n], timestamps[:n], heads[:n] = self.prices, self.timestamps, self.heads
+            volumes[:n], last_alerted[:n] = self.volumes, self.last_alerted
+        self.prices, self.timestamps, self.heads = prices, timestamps, heads
+        self.volumes, self.last_alerted = volumes, last_alerted
+
+    def _row(self, rune: str) -> int:
+        row = self._rows.get(rune)
+        if row is None:
+            row = len(self.runes)
+            if row == self.prices.shape[0]:
+                self._allocate(2*row)
+            self.runes.append(rune)
+            self._rows[rune] = row
+        return row
+
+    def update(self, rune: str, ts: int, price: float, volume: float = None) -> None:
+        """Record one sample; the oldest sample of the row is overwritten once it is full.
+
+        Samples are kept at least `sample_interval` apart so the ring spans the longest
+        window however often a rune is scraped: a sample arriving sooner than that after
+        the one before the newest replaces the newest instead of taking a new slot.
+        """
+        row = self._row(rune)
+        head = self.heads[row]
+        previous = self.timestamps[row, (head - 2) % self.capacity]
+        if previous >= 0 and ts - previous < self.sample_interval:
+            head = (head - 1) % self.capacity
+        self.prices[row, head] = price
+        self.timestamps[row, head] = ts
+        self.heads[row] = (head + 1) % self.capacity
+        if volume is not None:
+            self.volumes[row] = volume
+
+    def update_many(self, samples: Iterable[Tuple[str, int, float, float]]) -> None:
+        for rune, ts, price, volume in samples:
+            self.update(rune, ts, price, volume)
+
+    def load_history(self, history, entries: dict) -> None:
+        """Seed every tracked rune from a `history.PriceHistory` and its last notification.
+        """
+        now = int(time.time())
+        span = self.capacity*self.sample_interval
+        for rune, rune_data in entries.items():
+            # Skip 'last_updated'
+            if rune == 'last_updated':
+                continue
+            for ts, price, volume in history.range(rune, now - span, now + 1):
+                self.update(rune, ts, price, volume)
+            if rune_data.get('last_notified', -1) > 0:
+                self.mark_alerted(rune, rune_data['last_notified'])
+
+    def latest_timestamp(self, rune: str) -> int:
+        """Timestamp of the newest sample of `rune`, or -1 if it has none.
+        """
+        row = self._rows.get(rune)
+        if row is None:
+            return -1
+        return int(self.timestamps[row, (self.heads[row] - 1) % self.capacity])
+
+    def mark_alerted(self, rune: str, ts: int) -> None:
+        """Suppress alerts for `rune` on every window until `ts` drops out of it.
+        """
+        self.last_alerted[self._row(rune)] = ts
+
+    def evaluate(self, runes: Iterable[str] = None) -> List[Alert]:
+        """Return at most one alert per rune: the window whose move most exceeds its threshold.
+
+        With `runes`, only those rows are evaluated (e.g. the runes whose price changed).
+        """
+        if runes is None:
+            rows = np.arange(len(self.runes))
+        else:
+            rows = np.array(sorted(self._rows[rune] for rune in set(runes) if rune in self._rows), dtype=np.int64)
+        n = len(rows)
+        if n == 0:
+            return []
+
+        heads = self.heads[rows]
+        latest_slot = (heads - 1) % self.capacity
+        latest_ts = self.timestamps[rows, latest_slot]
+        latest_price = self.prices[rows, latest_slot]
+
+        # Reference sample per rune and window: newest sample at or before latest - window.
+        # Each row read from its head is oldest to newest (empty slots, ts -1, first), so a
+        # binary search over logical positions runs for every (rune, window) at once.
+        cutoff = latest_ts[:, None] - self.lengths[None, :] # (runes, windows)
+        lo = np.zeros(cutoff.shape, dtype=np.int64)
+        hi = np.full(cutoff.shape, self.capacity, dtype=np.int64)
+        while True:
+            active = lo < hi
+            if not active.any():
+                break
+            mid = (lo + hi)//2
+            mid_ts = self.timestamps[rows[:, None], (heads[:, None] + mid) % self.capacity]
+            right = active & (mid_ts <= cutoff)
+            lo = np.where(right, mid + 1, lo)
+            hi = np.where(active & ~right, mid, hi)
+        ref_slot = (heads[:, None] + np.maximum(lo - 1, 0)) % self.capacity
+        ref_ts = np.where(lo > 0, self.timestamps[rows[:, None], ref_slot], -1)
+        ref_price = self.prices[rows[:, None], ref_slot]
+        valid = (ref_ts >= 0) & (ref_ts >= cutoff - (self.lengths*WINDOW_SLACK).astype(np.int64))
+        valid &= ref_price > 0
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percent = (latest_price[:, None] - ref_price)/ref_price*100
+
+            # Volume-weighted thresholds: scale by sqrt(reference / volume), clipped
+            scale = np.sqrt(self.volume_reference/np.maximum(self.volumes[rows], 1e-9))
+        scale = np.clip(scale, *VOLUME_SCALE_BOUNDS)
+        thresholds = self.thresholds[None, :]*scale[:, None]
+
+        # Skip windows that already alerted within their span
+        cooled_down = self.last_alerted[rows] < latest_ts[:, None] - self.lengths[None, :]
+        ratio = np.where(valid & cooled_down, np.abs(percent)/thresholds, 0)
+        best = ratio.argmax(axis=1)
+        triggered = np.nonzero(ratio[np.arange(n), best] >= 1)[0]
+
+        return [Alert(rune=self.runes[rows[r]],
+                      window=self.labels[best[r]],
+                      percent_change=float(percent[r, best[r]]),
+                      price=float(latest_price[r]),
+                      ref_price=float(ref_price[r, best[r]]),
+                      timestamp=int(latest_ts[r]))
+                for r in triggered]
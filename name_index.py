@@ -0,0 +1,172 @@
+
+from collections import Counter
+from typing import Dict, List, Set, Optional, NamedTuple
+
+
+# Config variables
+FUZZY_CANDIDATES = 20 # names sharing the most trigrams that get an exact edit distance
+FUZZY_MAX_DISTANCE = 1/3 # max edit distance as a fraction of the query length (at least 1)
+RESOLVE_MIN_SCORE = 0.8 # a non-exact match is auto-resolved above this score only if no other rune ties it
+
+
+class Match(NamedTuple):
+    rune: str # standardized rune name the match resolves to
+    name: str # indexed name that matched (the rune itself or a nickname)
+    kind: str # 'exact', 'prefix' or 'fuzzy'
+    score: float # 1.0 for exact, lower is worse
+
+
+class AmbiguousName(LookupError):
+    """A query matched several runes and none of them clearly; `candidates` are the best ones.
+    """
+    def __init__(self, query: str, candidates: List[Match]):
+        super().__init__(f"'{query}' matches {len(candidates)} runes")
+        self.query = query
+        self.candidates = candidates
+
+def _trigrams(name: str) -> Set[str]:
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a: str, b: str, max_distance: int = None) -> int:
+    """Levenshtein distance; gives up with max_distance + 1 once the bound is exceeded.
+    """
+    if max_distance is not None and abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1,
+                               current[j - 1] + 1,
+                               previous[j - 1] + (char_a != char_b)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+class NameIndex:
+    """Prefix and fuzzy lookup over standardized rune names and nicknames.
+
+    Names are split into '.'-separated segments and every segment prefix is indexed
+    per position, so "sat.n" finds "satoshi.nakamoto" by intersecting two small sets.
+    Misspellings fall back to a trigram index whose best candidates are ranked by
+    edit distance. Names are added and removed incrementally.
+    """
+    def __init__(self):
+        self.targets: Dict[str, str] = {} # indexed name -> standardized rune name
+        self._prefixes: List[Dict[str, Set[str]]] = [] # segment position -> prefix -> names
+        self._trigrams: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.targets)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.targets
+
+    def add(self, name: str, rune: str = None) -> None:
+        """Index `name`, resolving to `rune` (the name itself unless it is a nickname).
+        """
+        if name in self.targets:
+            self.targets[name] = rune or name
+            return
+        self.targets[name] = rune or name
+
+        for position, segment in enumerate(name.split('.')):
+            if position == len(self._prefixes):
+                self._prefixes.append({})
+            prefixes = self._prefixes[position]
+            for end in range(1, len(segment) + 1):
+                prefixes.setdefault(segment[:end], set()).add(name)
+        for trigram in _trigrams(name):
+            self._trigrams.setdefault(trigram, set()).add(name)
+
+    def remove(self, name: str) -> None:
+        if self.targets.pop(name, None) is None:
+            return
+        for position, segment in enumerate(name.split('.')):
+            prefixes = self._prefixes[position]
+            for end in range(1, len(segment) + 1):
+                names = prefixes[segment[:end]]
+                names.discard(name)
+                if not names:
+                    del prefixes[segment[:end]]
+        for trigram in _trigrams(name):
+            names = self._trigrams[trigram]
+            names.discard(name)
+            if not names:
+                del self._trigrams[trigram]
+
+    def prefix_matches(self, query: str) -> List[str]:
+        """Names whose leading segments start with the query's segments, e.g. "sat.n".
+        """
+        segments = query.split('.')
+        if len(segments) > len(self._prefixes):
+            return []
+        candidate_sets = []
+        for position, segment in enumerate(segments):
+            names = self._prefixes[position].get(segment) if segment else None
+            if names is None and segment:
+                return []
+            if names is not None:
+                candidate_sets.append(names)
+        if not candidate_sets:
+            return []
+        candidate_sets.sort(key=len)
+        return list(candidate_sets[0].intersection(*candidate_sets[1:]))
+
+    def fuzzy_matches(self, query: str) -> List[tuple]:
+        """(name, distance) of names within edit distance of the query, closest first.
+        """
+        counts = Counter()
+        for trigram in _trigrams(query):
+            counts.update(self._trigrams.get(trigram, ()))
+        max_distance = max(1, int(len(query)*FUZZY_MAX_DISTANCE))
+        matches = []
+        for name, _ in counts.most_common(FUZZY_CANDIDATES):
+            distance = edit_distance(query, name, max_distance)
+            if distance <= max_distance:
+                matches.append((name, distance))
+        matches.sort(key=lambda match: (match[1], match[0]))
+        return matches
+
+    def search(self, query: str, limit: int = 5) -> List[Match]:
+        """Ranked matches for `query`: exact, then prefix (closest length first), then fuzzy.
+        """
+        matches = []
+        if query in self.targets:
+            matches.append(Match(self.targets[query], query, 'exact', 1.0))
+
+        prefix_names = self.prefix_matches(query)
+        prefix_names.sort(key=lambda name: (len(name), name))
+        for name in prefix_names:
+            matches.append(Match(self.targets[name], name, 'prefix', len(query)/len(name)))
+
+        if len(matches) < limit:
+            for name, distance in self.fuzzy_matches(query):
+                matches.append(Match(self.targets[name], name, 'fuzzy', 1 - distance/max(len(query), len(name))))
+
+        # One match per rune, keeping its best-ranked name
+        ranked, seen = [], set()
+        for match in matches:
+            if match.rune not in seen:
+                seen.add(match.rune)
+                ranked.append(match)
+                if len(ranked) == limit:
+                    break
+        return ranked
+
+    def resolve(self, query: str, min_score: float = RESOLVE_MIN_SCORE) -> Optional[str]:
+        """Standardized rune name of an unambiguous match, or None.
+
+        A match is unambiguous if it is exact, the only one, or scores at least
+        `min_score` and higher than every other rune's.
+        """
+        matches = self.search(query, limit=2)
+        if not matches:
+            return None
+        best = matches[0]
+        if (best.kind == 'exact' or len(matches) == 1
+                or (best.score >= min_score and matches[1].score < best.score)):
+            return best.rune
+        return None
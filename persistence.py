@@ -0,0 +1,134 @@
+
+import os
+import json
+import threading
+
+from typing import List
+
+from price_window import PriceWindow
+from runescrape import load_price_windows, _encode_json_object
+
+
+# Config variables
+JOURNAL_SUFFIX = '.journal'
+COMPACT_EVERY = int(os.getenv('COMPACT_EVERY', 1000)) # journal records between snapshots
+GENERATION_KEY = '_journal_generation'
+
+Record = dict # {'rune': name, 'set': {field: value}, 'sample': [ts, price]} or {'last_updated': str}
+
+
+def _apply_record(entries: dict, record: Record, price_array_len: int) -> None:
+    """Replay one journal record onto the in-memory database.
+    """
+    if 'last_updated' in record:
+        entries['last_updated'] = record['last_updated']
+    if 'rune' not in record:
+        return
+
+    rune_data = entries.setdefault(record['rune'], {'last_notified': -1})
+    rune_data.update(record.get('set', {}))
+    if 'sample' in record:
+        ts, price = record['sample']
+        if 'price_window' not in rune_data:
+            rune_data['price_window'] = PriceWindow(price_array_len)
+        rune_data['price_window'].append(price, ts)
+
+class DbStore:
+    """Crash-safe persistence for RUNES_DB: a compacted snapshot plus an append-only journal.
+
+    Each update appends one JSON line per changed rune to the journal and fsyncs it;
+    every `compact_every` records the whole database is written to a temp file and
+    atomically renamed over the snapshot, after which a new journal is started.
+    Snapshot and journal carry a generation number, so a journal left behind by a
+    crash mid-compaction is not replayed twice. Recovery ignores a torn last line.
+    All methods do blocking I/O; call them from a worker thread (asyncio.to_thread).
+    """
+    def __init__(self, snapshot_path: str, price_array_len: int, compact_every: int = COMPACT_EVERY):
+        self.snapshot_path = snapshot_path
+        self.journal_path = snapshot_path + JOURNAL_SUFFIX
+        self.price_array_len = price_array_len
+        self.compact_every = compact_every
+        self._records_since_snapshot = 0
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def recover(self) -> dict:
+        """Rebuild the database from the last snapshot and the journal written after it.
+        """
+        try:
+            with open(self.snapshot_path, 'r') as file:
+                entries = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            entries = {}
+        self._generation = entries.pop(GENERATION_KEY, 0)
+        entries = load_price_windows(entries, self.price_array_len)
+
+        replayed = 0
+        journal_generation = 0 # journals written before the first snapshot have no header
+        try:
+            with open(self.journal_path, 'r') as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        break # torn write from a crash; everything after it is incomplete
+                    if GENERATION_KEY in record:
+                        journal_generation = record[GENERATION_KEY]
+                        continue
+                    if journal_generation != self._generation:
+                        break # journal predates the snapshot, which already holds its records
+                    _apply_record(entries, record, self.price_array_len)
+                    replayed += 1
+        except FileNotFoundError:
+            pass
+
+        self._records_since_snapshot = replayed
+        return entries
+
+    def append(self, records: List[Record]) -> None:
+        """Durably append records to the journal.
+        """
+        if not records:
+            return
+        lines = "".join(json.dumps(record, separators=(',', ':')) + "\n" for record in records)
+        with self._lock:
+            with open(self.journal_path, 'a') as file:
+                file.write(lines)
+                file.flush()
+                os.fsync(file.fileno())
+            self._records_since_snapshot += len(records)
+
+    def set_fields(self, rune: str, fields: dict) -> None:
+        """Journal a metadata change (e.g. tokens_per_mint, last_notified) of one rune.
+        """
+        self.append([{'rune': rune, 'set': fields}])
+
+    def needs_compaction(self) -> bool:
+        return self._records_since_snapshot >= self.compact_every
+
+    def snapshot(self, entries: dict) -> None:
+        """Atomically replace the snapshot with `entries` and start a fresh journal.
+
+        The caller must keep `entries` from being mutated until this returns.
+        """
+        tmp_path = self.snapshot_path + ".tmp"
+        with self._lock:
+            generation = self._generation + 1
+            with open(tmp_path, 'w') as file:
+                json.dump({**entries, GENERATION_KEY: generation}, file,
+                          separators=(',', ':'), default=_encode_json_object)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(tmp_path, self.snapshot_path) # atomic on POSIX; readers see old or new, never half
+            with open(self.journal_path, 'w') as file:
+                file.write(json.dumps({GENERATION_KEY: generation}) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            self._generation = generation
+            self._records_since_snapshot = 0
+
+    def compact_if_needed(self, entries: dict) -> bool:
+        if not self.needs_compaction():
+            return False
+        self.snapshot(entries)
+        return True
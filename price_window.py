@@ -0,0 +1,102 @@
+
+from array import array
+from typing import List, Iterable
+
+
+class PriceWindow:
+    """Fixed-capacity ring buffer of the most recent price samples of one rune.
+
+    Prices are float64 sats and timestamps int64 epoch seconds, both kept in flat
+    `array` buffers; appending past capacity overwrites the oldest sample in O(1).
+    """
+    __slots__ = ('capacity', '_prices', '_timestamps', '_start', '_size')
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._prices = array('d', [0.0])*capacity
+        self._timestamps = array('q', [0])*capacity
+        self._start = 0 # index of the oldest sample
+        self._size = 0
+
+    @classmethod
+    def from_samples(cls, capacity: int, prices: Iterable[float], timestamps: Iterable[int]) -> "PriceWindow":
+        window = cls(capacity)
+        for price, ts in zip(prices, timestamps):
+            window.append(price, ts)
+        return window
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PriceWindow":
+        return cls.from_samples(data['capacity'], data['prices'], data['timestamps'])
+
+    def to_dict(self) -> dict:
+        """Compact JSON-serializable form (numbers only, oldest first).
+        """
+        return {'capacity': self.capacity, 'prices': self.prices(), 'timestamps': self.timestamps()}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __repr__(self) -> str:
+        return f"PriceWindow({self._size}/{self.capacity}, prices={self.prices()})"
+
+    @property
+    def full(self) -> bool:
+        return self._size == self.capacity
+
+    def append(self, price: float, ts: int) -> None:
+        if self._size < self.capacity:
+            i = (self._start + self._size) % self.capacity
+            self._size += 1
+        else:
+            i = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._prices[i] = price
+        self._timestamps[i] = ts
+
+    def _index(self, i: int) -> int:
+        if i < 0:
+            i += self._size
+        if not 0 <= i < self._size:
+            raise IndexError("PriceWindow index out of range")
+        return (self._start + i) % self.capacity
+
+    def price(self, i: int) -> float:
+        """i-th sample from the oldest; negative indices count from the latest.
+        """
+        return self._prices[self._index(i)]
+
+    def timestamp(self, i: int) -> int:
+        return self._timestamps[self._index(i)]
+
+    @property
+    def latest_price(self) -> float:
+        return self.price(-1)
+
+    @property
+    def oldest_price(self) -> float:
+        return self.price(0)
+
+    @property
+    def latest_timestamp(self) -> int:
+        return self.timestamp(-1)
+
+    @property
+    def oldest_timestamp(self) -> int:
+        return self.timestamp(0)
+
+    def percent_change(self) -> float:
+        """Percent change from the oldest to the latest sample.
+        """
+        return ((self.latest_price - self.oldest_price)/self.oldest_price)*100
+
+    def covers(self, ts: int) -> bool:
+        """True if `ts` falls inside the time span of the window (timestamps only increase).
+        """
+        return self._size > 0 and self.oldest_timestamp <= ts <= self.latest_timestamp
+
+    def prices(self) -> List[float]:
+        return [self._prices[(self._start + i) % self.capacity] for i in range(self._size)]
+
+    def timestamps(self) -> List[int]:
+        return [self._timestamps[(self._start + i) % self.capacity] for i in range(self._size)]
@@ -0,0 +1,103 @@
+
+import time
+import asyncio
+
+from typing import Dict, List, Callable, Awaitable, Optional, Hashable, Any
+
+
+# Config variables
+MAX_AGE = 60 # s a scraped sample is served from memory instead of rescraping
+
+
+class RefreshCoordinator:
+    """Single-flight, freshness-aware refreshes of runes.
+
+    Concurrent requests for the same rune share one in-flight scrape, and runes whose
+    last sample is younger than `max_age` are not rescraped at all.
+    `scrape_func(rune_names)` must scrape and store the given runes;
+    `last_updated(rune)` returns the epoch time of a rune's latest sample (or None).
+    """
+    def __init__(self,
+                 scrape_func: Callable[[List[str]], Awaitable[Any]],
+                 last_updated: Callable[[str], Optional[float]],
+                 max_age: float = MAX_AGE):
+        self.scrape_func = scrape_func
+        self.last_updated = last_updated
+        self.max_age = max_age
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def in_flight(self, key: Hashable) -> bool:
+        return key in self._inflight
+
+    async def single_flight(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `factory()` unless a call with the same key is in flight; then share its result.
+        """
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await factory()
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception() # mark retrieved so lone failures are not logged as unhandled
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    def is_fresh(self, rune: str, max_age: float = None) -> bool:
+        max_age = self.max_age if max_age is None else max_age
+        last_updated = self.last_updated(rune)
+        return last_updated is not None and time.time() - last_updated < max_age
+
+    async def refresh_many(self, rune_names: List[str], max_age: float = None) -> Dict[str, str]:
+        """Refresh runes that are stale, joining scrapes already in flight.
+
+        Returns each rune's outcome: 'fresh' (served from memory), 'joined' (shared an
+        in-flight scrape) or 'refreshed' (scraped by this call, all in one batch).
+        """
+        outcomes = {}
+        joined, stale = [], []
+        for rune in rune_names:
+            if rune in outcomes:
+                continue
+            if self.is_fresh(rune, max_age):
+                outcomes[rune] = 'fresh'
+            elif rune in self._inflight:
+                outcomes[rune] = 'joined'
+                joined.append(self._inflight[rune])
+            else:
+                outcomes[rune] = 'refreshed'
+                stale.append(rune)
+
+        # Register every stale rune before scraping so later requests join this batch
+        loop = asyncio.get_running_loop()
+        futures = {rune: loop.create_future() for rune in stale}
+        self._inflight.update(futures)
+        try:
+            if stale:
+                await self.scrape_func(stale)
+        except BaseException as e:
+            for future in futures.values():
+                future.set_exception(e)
+                future.exception()
+            raise
+        else:
+            for future in futures.values():
+                future.set_result(None)
+        finally:
+            for rune in stale:
+                del self._inflight[rune]
+
+        if joined:
+            await asyncio.gather(*[asyncio.shield(future) for future in joined], return_exceptions=True)
+
+        return outcomes
+
+    async def refresh(self, rune: str, max_age: float = None) -> str:
+        return (await self.refresh_many([rune], max_age))[rune]
@@ -3,34 +3,75 @@ import os
 import json
 import re
 import validators
-import random
+import aiohttp
 import asyncio
 import numbers
+import random
+import time
 
 from playwright.async_api import async_playwright
 from playwright.async_api import Page, Browser
-from typing import List, Tuple, Union, Callable
+from typing import List, Tuple, Union, Callable, Dict
 from datetime import datetime
+from urllib.parse import urlparse
+from price_window import PriceWindow
+from metrics import METRICS
+from selector_registry import REGISTRY
 
 
 # Config variables
-PRICE_DATABASE_PATH = os.getenv('PRICE_DATABASE_PATH')
+PRICE_DATABASE_PATH = os.getenv('PRICE_DATABASE_PATH', 'runes_db.json')
 NICKNAME_DATABASE_PATH = os.getenv('NICKNAME_DATABASE_PATH')
 
-PRICE_ELEMENTS_PER_PAGE = 1
-PRICE_SELECTOR_LIST = [
-    f"#rc-tabs-0-panel-1 > div > div.trade-list > div:nth-child({x+1}) > div.content.display-domain.white > div.price-line > span.price"
-    for x in range(PRICE_ELEMENTS_PER_PAGE)
-    ]
-VOLUME_SELECTOR_LIST = [
-    "#__next > div.main-container.runes.market > div.brc-20-market > div.mt32.flex-row-stretch.gap24 > div > div.runes-market-info-container.mt24 > div:nth-child(1) > div.flex-row-v-center.gap-4"
-    ]
+# Page fields read by the 'dom' extractors; their selectors live in selector_registry.py
+PRICE_FIELDS = ['price']
+VOLUME_FIELDS = ['volume']
+PRICE_VOLUME_FIELDS = PRICE_FIELDS + VOLUME_FIELDS
+MINT_AMOUNT_FIELDS = ['mint_amount']
+PRICE_SELECTOR_LIST = REGISTRY.primaries(PRICE_FIELDS)
+VOLUME_SELECTOR_LIST = REGISTRY.primaries(VOLUME_FIELDS)
 PRICE_VOLUME_SELECTOR_LIST = PRICE_SELECTOR_LIST + VOLUME_SELECTOR_LIST
-MINT_AMOUNT_SELECTOR_LIST = [
-    "#__next > div.main-container.brc-20.brc-20-item-page.runes > div > div:nth-child(3) > div.ant-card-body > div > div.ml24.flex-column.gap-16 > div:nth-child(3) > div.font14.white085"
-    ]
+MINT_AMOUNT_SELECTOR_LIST = REGISTRY.primaries(MINT_AMOUNT_FIELDS)
+FIELD_POLL_INTERVAL = 100 # ms between in-page checks for fields that have not rendered yet
+
+# Network-response extraction: candidate JSON keys per field, searched in the XHR/fetch
+# responses UniSat pages make while rendering (first numeric match wins)
+PRICE_RESPONSE_KEYS = [['curPrice', 'floorPrice', 'unitPrice']]
+VOLUME_RESPONSE_KEYS = [['btcVolume24h', 'volume24h', 'amountVolume24h']]
+PRICE_VOLUME_RESPONSE_KEYS = PRICE_RESPONSE_KEYS + VOLUME_RESPONSE_KEYS
+MINT_AMOUNT_RESPONSE_KEYS = [['amountPerMint', 'mintAmount', 'amount']]
+# Market listing (new-rune discovery): keys of each listed rune's name and its listing order
+MARKET_LISTING_URL = os.getenv('MARKET_LISTING_URL', "https://unisat.io/runes/market?sort=deploy&page={page}")
+LISTING_NAME_KEYS = ['spacedRune', 'rune', 'tick']
+LISTING_ORDER_KEYS = ['number', 'runeNumber', 'deployTimestamp', 'timestamp']
+LISTING_FIELDS = [LISTING_NAME_KEYS, LISTING_ORDER_KEYS]
+RESPONSE_URL_PATTERN = re.compile(r"unisat\.io/.*(rune|market)", re.IGNORECASE)
+RESPONSE_TIMEOUT = float(os.getenv('RESPONSE_TIMEOUT', 15)) # s to wait for a field to show up in responses
+GOTO_TIMEOUT = float(os.getenv('GOTO_TIMEOUT', 20)) # s for a page to load (Playwright defaults to 30)
+SELECTOR_TIMEOUT = float(os.getenv('SELECTOR_TIMEOUT', 8)) # s for a page's fields to appear (Playwright waits 30 by default)
+SCRAPE_RETRIES = int(os.getenv('SCRAPE_RETRIES', 1)) # extra attempts per URL after a failed scrape
+RETRY_BASE_DELAY = 1.0 # s before the first retry; doubles per attempt, half of it jittered
+RETRY_MAX_DELAY = 8.0 # s before a retry at most
+BLOCKED_RESOURCE_TYPES = {'image', 'font', 'stylesheet', 'media'}
+BLOCKED_URL_PATTERN = re.compile(r"google-analytics|googletagmanager|doubleclick|hotjar|sentry|analytics", re.IGNORECASE)
+
+# Browserless HTTP fetching of the server-rendered Next.js payload
+NEXT_DATA_PATTERN = re.compile(r'<script[^>]*id="__NEXT_DATA__"[^>]*>(.*?)</script>', re.DOTALL)
+HTTP_CONCURRENCY = int(os.getenv('HTTP_CONCURRENCY', 32)) # pooled keep-alive connections
+HTTP_RATE_PER_SEC = float(os.getenv('HTTP_RATE_PER_SEC', 10.0)) # requests per second per host
+HTTP_BURST = int(os.getenv('HTTP_BURST', 20))
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 15)) # s per request
+HTTP_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml'
+    }
 
 PRICE_ARRAY_LEN = 20
+TIMESTAMP_FORMAT = "%I:%M:%S %p, %m/%d/%Y"
+
+SCRAPE_CONCURRENCY = int(os.getenv('SCRAPE_CONCURRENCY', 4)) # pages scraped at once
+HOST_RATE_PER_SEC = float(os.getenv('HOST_RATE_PER_SEC', 1.0)) # page loads per second per host
+HOST_BURST = int(os.getenv('HOST_BURST', 2)) # page loads allowed back to back per host
 
 
 # TODO: consolidate functions into class
@@ -40,6 +81,14 @@ def prices_url_to_ticker(unisat_url):
     name = re.findall(r"tick=([^&]*)", unisat_url)[0] # regex pattern to match ticker
     return name
 
+def url_to_rune_name(url: str) -> str:
+    """Standardized rune name of a UniSat market or detail URL, or None for other pages.
+    """
+    match = re.search(r"tick=([^&#]*)|/runes/detail/([^/?#]*)", url)
+    if match is None:
+        return None
+    return rune_name_standardizer(match.group(1) or match.group(2))
+
 def rune_name_standardizer(rune_name_input: str) -> str:
     """Converts rune name string to standard format.
 
@@ -89,74 +138,593 @@ def rune_name_std_to_mint_amt_url(rune_name_standardized: str) -> str:
     return url
 
 
+# Runs in the page: waits until one selector of every field has text, then parses the numbers there,
+# so a whole page costs one round trip. Each field yields {value, text, index} or null if nothing matched.
+def parse_field_number(text: str) -> float:
+    """The one number in a page field's text, e.g. '1,234.5 sats'; ValueError if there is not exactly one.
+    """
+    numbers = re.findall(r"\d*\.?\d+", text.replace(',', ''))
+    if len(numbers) != 1:
+        raise ValueError(f"Expected one number, got {text!r}")
+    return float(numbers[0])
+
+EXTRACT_FIELDS_SCRIPT = """
+async ({fields, timeout, interval}) => {
+    const find = (selectors) => {
+        for (let index = 0; index < selectors.length; index++) {
+            const element = document.querySelector(selectors[index]);
+            const text = element ? element.innerText.trim() : '';
+            if (text) {
+                return {text: text, index: index};
+            }
+        }
+        return null;
+    };
+    const deadline = Date.now() + timeout;
+    let found = fields.map(find);
+    while (found.includes(null) && Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, interval));
+        found = found.map((match, i) => match || find(fields[i]));
+    }
+    return found;
+}
+"""
+
 # TODO: consolidate functions into class
-async def extract_prices_or_volume(selectors: List[int], page: Page) -> List[float]:
-    """Extract price elements from UniSat rune marketplace page.
+async def extract_fields(fields: List[str], page: Page) -> List[float]:
+    """Extract numeric page fields (e.g. price and volume) in one in-page evaluation.
+    """
+    rune = url_to_rune_name(page.url)
+    try:
+        with METRICS.time('evaluate_fields', rune):
+            found = await page.evaluate(EXTRACT_FIELDS_SCRIPT, {
+                'fields': [REGISTRY.selectors(field) for field in fields],
+                'timeout': SELECTOR_TIMEOUT*1000,
+                'interval': FIELD_POLL_INTERVAL
+                })
+
+        elements = [0]*len(fields) # preallocate elements to save
+        for i, (field, match) in enumerate(zip(fields, found)):
+            if match is None:
+                raise TimeoutError(f"No selector for '{field}' matched within {SELECTOR_TIMEOUT} s "
+                                   f"(selector registry v{REGISTRY.version})")
+            if match['index']:
+                METRICS.inc('selector_fallbacks', field=field, index=str(match['index']))
+            try:
+                elements[i] = parse_field_number(match['text']) # assign in ascending order
+            except ValueError:
+                raise ValueError(f"Could not parse '{field}' from {match['text']!r}")
+    except Exception as e:
+        print(e)
+        return e
+
+    return elements
+
+async def extract_field(fields: List[str], page: Page) -> float:
+    """Extract a single numeric page field, e.g. the mint amount.
     """
-    elements = [0]*len(selectors) # preallocate price elements to save
+    elements = await extract_fields(fields, page)
+    return elements if isinstance(elements, Exception) else elements[0]
 
-    for i, selector in enumerate(selectors):
+def find_json_field(payload, keys: List[str]):
+    """Depth-first search of a JSON payload for the first numeric value under any of `keys`.
+    """
+    if isinstance(payload, dict):
+        for key in keys:
+            if key in payload:
+                try:
+                    return float(re.sub("[^0-9.]", "", str(payload[key])))
+                except ValueError:
+                    pass
+        values = payload.values()
+    elif isinstance(payload, list):
+        values = payload
+    else:
+        return None
+
+    for value in values:
+        found = find_json_field(value, keys)
+        if found is not None:
+            return found
+    return None
+
+class ResponseCapture:
+    """Collects JSON bodies of the XHR/fetch responses a page receives while loading.
+    """
+    def __init__(self, page: Page, url_pattern: re.Pattern = RESPONSE_URL_PATTERN):
+        self.page = page
+        self.url_pattern = url_pattern
+        self.payloads = []
+        self._arrived = asyncio.Event()
+        self._reads = set()
+
+    async def start(self, block_assets: bool = True) -> None:
+        """Start listening for responses and optionally abort asset/analytics requests.
+        """
+        self.page.on("response", self._on_response)
+        if block_assets:
+            await self.page.route("**/*", _block_assets)
+
+    async def close(self) -> None:
+        self.page.remove_listener("response", self._on_response)
         try:
-            await page.wait_for_selector(selector) # wait for the element in the page to fully load
-            element_text = await page.inner_text(selector) # extract to float
-            processed_element = float(re.sub("[^0-9.]", "", element_text))
+            await self.page.unroute("**/*", _block_assets)
+        except Exception:
+            pass
+        for read in self._reads:
+            read.cancel()
+
+    def _on_response(self, response) -> None:
+        if response.request.resource_type not in ('xhr', 'fetch'):
+            return
+        if not self.url_pattern.search(response.url):
+            return
+        read = asyncio.ensure_future(self._read(response))
+        self._reads.add(read)
+        read.add_done_callback(self._reads.discard)
+
+    async def _read(self, response) -> None:
+        try:
+            payload = await response.json()
+        except Exception:
+            return # not JSON, or the page navigated away
+        self.payloads.append(payload)
+        self._arrived.set()
+
+    async def wait_for_field(self, keys: List[str], timeout: float = RESPONSE_TIMEOUT) -> float:
+        """Wait until a captured response contains one of `keys` and return its value.
+        """
+        with METRICS.time('wait_for_response', url_to_rune_name(self.page.url)):
+            return await self.wait_for(lambda payload: find_json_field(payload, keys), keys, timeout)
+
+    async def wait_for(self, search: Callable, keys: List[str], timeout: float = RESPONSE_TIMEOUT):
+        """Wait until `search(payload)` finds something (not None) in a captured response.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        searched = 0
+        while True:
+            for payload in self.payloads[searched:]:
+                found = search(payload)
+                if found is not None:
+                    return found
+            searched = len(self.payloads)
+
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise TimeoutError(f"None of {keys} found in responses from {self.page.url}")
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+async def _block_assets(route) -> None:
+    """Abort image, font, CSS and analytics requests; let everything else through.
+    """
+    request = route.request
+    if request.resource_type in BLOCKED_RESOURCE_TYPES or BLOCKED_URL_PATTERN.search(request.url):
+        await route.abort()
+    else:
+        await route.continue_()
 
-            elements[i] = processed_element # assign in ascending order
+def network_extractor(extract_func: Callable) -> Callable:
+    """Mark an extractor as reading captured JSON responses instead of the rendered DOM.
+
+    Network extractors receive a `ResponseCapture` in place of the page.
+    """
+    extract_func.network_mode = True
+    return extract_func
+
+@network_extractor
+async def extract_prices_or_volume_from_responses(fields: List[List[str]], capture: ResponseCapture) -> List[float]:
+    """Extract price/volume from the JSON responses of a UniSat rune marketplace page.
+    """
+    elements = [0]*len(fields)
+
+    for i, keys in enumerate(fields):
+        try:
+            elements[i] = await capture.wait_for_field(keys)
         except Exception as e:
             print(e)
             return e
-        
+
     return elements
 
-async def extract_mint_amount(selectors: List[int], page: Page) -> float:
-    """Extracts mint amount for a specified rune from UniSat rune detail page.
+@network_extractor
+async def extract_mint_amount_from_responses(fields: List[List[str]], capture: ResponseCapture) -> float:
+    """Extract mint amount from the JSON responses of a UniSat rune detail page.
     """
-    
-    selector = selectors[0]
-    
     try:
-        await page.wait_for_selector(selector) # wait for the element in the page to fully load
-        element_text = await page.inner_text(selector) # extract to float
-        processed_element = float(re.sub("[^0-9.]", "", element_text))
+        element = await capture.wait_for_field(fields[0])
+    except Exception as e:
+        print(e)
+        return e
+
+    return element
+
+def find_json_records(payload, name_keys: List[str]) -> List[dict]:
+    """Depth-first search of a JSON payload for the first list of records carrying one of `name_keys`.
+    """
+    if isinstance(payload, list):
+        if payload and all(isinstance(item, dict) and any(key in item for key in name_keys) for item in payload):
+            return payload
+        values = payload
+    elif isinstance(payload, dict):
+        values = payload.values()
+    else:
+        return None
+
+    for value in values:
+        found = find_json_records(value, name_keys)
+        if found is not None:
+            return found
+    return None
+
+def listing_entries(fields: List[List[str]], records: List[dict]) -> List[Tuple[str, float]]:
+    """(standardized rune name, listing order or None) of each record of a market listing.
+    """
+    name_keys, order_keys = fields
+    entries = []
+    for record in records:
+        name = next((record[key] for key in name_keys if record.get(key)), None)
+        if name is None:
+            continue
+        entries.append((rune_name_standardizer(str(name)), find_json_field(record, order_keys)))
+    return entries
 
-        element = processed_element
+@network_extractor
+async def extract_market_listing_from_responses(fields: List[List[str]], capture: ResponseCapture) -> List[Tuple[str, float]]:
+    """Extract the listed runes from the JSON responses of a UniSat runes market listing page.
+    """
+    try:
+        records = await capture.wait_for(lambda payload: find_json_records(payload, fields[0]), fields[0])
     except Exception as e:
         print(e)
         return e
 
+    return listing_entries(fields, records)
+
+def extract_market_listing_from_payload(fields: List[List[str]], payload: dict) -> List[Tuple[str, float]]:
+    """Extract the listed runes from the embedded payload of a UniSat runes market listing page.
+    """
+    records = find_json_records(payload, fields[0])
+    if records is None:
+        raise ValueError(f"No records with {fields[0]} found in page payload")
+
+    return listing_entries(fields, records)
+
+def extract_next_data(html: str) -> dict:
+    """Parse the `__NEXT_DATA__` JSON payload embedded in a server-rendered Next.js page.
+    """
+    match = NEXT_DATA_PATTERN.search(html)
+    if match is None:
+        raise ValueError("Page has no __NEXT_DATA__ payload")
+    return json.loads(match.group(1))
+
+def extract_prices_or_volume_from_payload(fields: List[List[str]], payload: dict) -> List[float]:
+    """Extract price/volume from the embedded payload of a UniSat rune marketplace page.
+    """
+    elements = [0]*len(fields)
+
+    for i, keys in enumerate(fields):
+        element = find_json_field(payload, keys)
+        if element is None:
+            raise ValueError(f"None of {keys} found in page payload")
+        elements[i] = element
+
+    return elements
+
+def extract_mint_amount_from_payload(fields: List[List[str]], payload: dict) -> float:
+    """Extract mint amount from the embedded payload of a UniSat rune detail page.
+    """
+    element = find_json_field(payload, fields[0])
+    if element is None:
+        raise ValueError(f"None of {fields[0]} found in page payload")
+
     return element
 
+# Extractor and selectors/response keys per extraction mode ('http' extractors read the embedded payload)
+PRICE_EXTRACTORS = {
+    'dom': (extract_fields, PRICE_FIELDS),
+    'network': (extract_prices_or_volume_from_responses, PRICE_RESPONSE_KEYS),
+    'http': (extract_prices_or_volume_from_payload, PRICE_RESPONSE_KEYS)
+    }
+PRICE_VOLUME_EXTRACTORS = {
+    'dom': (extract_fields, PRICE_VOLUME_FIELDS),
+    'network': (extract_prices_or_volume_from_responses, PRICE_VOLUME_RESPONSE_KEYS),
+    'http': (extract_prices_or_volume_from_payload, PRICE_VOLUME_RESPONSE_KEYS)
+    }
+MINT_AMOUNT_EXTRACTORS = {
+    'dom': (extract_field, MINT_AMOUNT_FIELDS),
+    'network': (extract_mint_amount_from_responses, MINT_AMOUNT_RESPONSE_KEYS),
+    'http': (extract_mint_amount_from_payload, MINT_AMOUNT_RESPONSE_KEYS)
+    }
+# The listing is only read from JSON, so 'dom' falls back to the network extractor
+MARKET_LISTING_EXTRACTORS = {
+    'dom': (extract_market_listing_from_responses, LISTING_FIELDS),
+    'network': (extract_market_listing_from_responses, LISTING_FIELDS),
+    'http': (extract_market_listing_from_payload, LISTING_FIELDS)
+    }
+
+
+class TokenBucket:
+    """Token bucket rate limiter; refills `rate` tokens per second up to `burst`.
+    """
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last)*self.rate)
+        self._last = now
+
+    async def acquire(self):
+        """Wait until a token is available and take it.
+        """
+        async with self._lock: # serialize waiters so tokens are handed out in order
+            self._refill()
+            while self._tokens < 1:
+                await asyncio.sleep((1 - self._tokens)/self.rate)
+                self._refill()
+            self._tokens -= 1
+
+class HostRateLimiter:
+    """Keeps one token bucket per host so every page scraping a host shares its budget.
+    """
+    def __init__(self, rate: float = HOST_RATE_PER_SEC, burst: int = HOST_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        host = urlparse(url).netloc
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.rate, self.burst)
+        return self._buckets[host]
+
+    async def acquire(self, url: str):
+        await self.bucket(url).acquire()
+
+def retry_delay(attempt: int) -> float:
+    """Backoff before retry number `attempt` (1-based): exponential, with half of it jittered.
+    """
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY*2**(attempt - 1))
+    return delay/2 + random.uniform(0, delay/2)
+
+async def _scrape_once(page: Page,
+                       url: str,
+                       extract_func: Callable,
+                       selectors: List[str],
+                       rate_limiter: HostRateLimiter):
+    """Load `url` in `page` and extract from it; returns the elements or the exception.
+    """
+    rune = url_to_rune_name(url)
+    with METRICS.time('rate_limit_wait', rune):
+        await rate_limiter.acquire(url)
+
+    # Network extractors need their listener in place before navigation starts
+    capture = None
+    if getattr(extract_func, 'network_mode', False):
+        capture = ResponseCapture(page)
+        await capture.start()
+
+    try:
+        # If the URL times out, return the TimeoutError object
+        try:
+            with METRICS.time('goto', rune):
+                await page.goto(url, wait_until='domcontentloaded' if capture else 'load', timeout=GOTO_TIMEOUT*1000)
+        except Exception as e:
+            METRICS.inc('scrape_errors', stage='goto', rune=rune)
+            return e
+
+        print(f"Scraping {url}...")
+        try:
+            with METRICS.time('extract', rune):
+                element = await extract_func(selectors, capture or page)
+        except Exception as e:
+            element = e
+        if isinstance(element, Exception):
+            METRICS.inc('scrape_errors', stage='extract', rune=rune)
+        return element
+    finally:
+        if capture is not None:
+            await capture.close()
+
+async def _scrape_worker(page: Page,
+                         queue: asyncio.Queue,
+                         url_list: List[str],
+                         extract_func_list: List[Callable],
+                         selectors_list: List[List[str]],
+                         elements: list,
+                         rate_limiter: HostRateLimiter) -> None:
+    """Pull URL indices off the queue and scrape them with a single page, retrying failures.
+    """
+    while True:
+        try:
+            i = queue.get_nowait()
+        except asyncio.QueueEmpty:
+            return
+
+        for attempt in range(SCRAPE_RETRIES + 1):
+            if attempt:
+                METRICS.inc('scrape_retries', rune=url_to_rune_name(url_list[i]))
+                await asyncio.sleep(retry_delay(attempt))
+            elements[i] = await _scrape_once(page, url_list[i], extract_func_list[i], selectors_list[i], rate_limiter)
+            if not isinstance(elements[i], Exception):
+                break
+
+async def extract_elements_with_pages(pages: List[Page],
+                                      url_list: List[str],
+                                      extract_func_list: List[Callable[[List[int], Page], List[Union[int, float]]]],
+                                      selectors_list: List[List[str]],
+                                      rate_limiter: HostRateLimiter = None) -> List[Union[List[float], float]]:
+    """Extracts elements concurrently, one worker per page in `pages`.
+
+    Results are returned in the same order as `url_list`; failed URLs hold the exception.
+    """
+    rate_limiter = rate_limiter or HostRateLimiter()
+    elements = [None]*len(url_list) # preallocate so workers can fill out of order
+
+    queue = asyncio.Queue()
+    for i in range(len(url_list)):
+        queue.put_nowait(i)
+
+    await asyncio.gather(*[
+        _scrape_worker(page, queue, url_list, extract_func_list, selectors_list, elements, rate_limiter)
+        for page in pages
+        ])
+
+    return elements
+
+async def extract_elements_with_browser(browser: Browser,
+                                        url_list: List[str],
+                                        extract_func_list: List[Callable[[List[int], Page], List[Union[int, float]]]],
+                                        selectors_list: List[List[str]],
+                                        concurrency: int = SCRAPE_CONCURRENCY,
+                                        rate_limiter: HostRateLimiter = None) -> List[Union[List[float], float]]:
+    """Extracts elements concurrently using a bounded pool of pages from an open browser.
+    """
+    # One context per page so cookies/storage of concurrent pages do not interfere
+    pool_size = max(1, min(concurrency, len(url_list)))
+    contexts = [await browser.new_context() for _ in range(pool_size)]
+    try:
+        pages = [await context.new_page() for context in contexts]
+        elements = await extract_elements_with_pages(pages, url_list, extract_func_list, selectors_list,
+                                                     rate_limiter=rate_limiter)
+    finally:
+        for context in contexts:
+            await context.close()
+
+    return elements
+
 async def extract_elements(url_list: List[str],
                            extract_func_list: List[Callable[[List[int], Page], List[Union[int, float]]]],
                            selectors_list: List[List[str]],
-                           url_wait: Tuple[float, float] = [2, 5]) -> List[Union[List[float], float]]:
+                           concurrency: int = SCRAPE_CONCURRENCY,
+                           rate_limiter: HostRateLimiter = None) -> List[Union[List[float], float]]:
     """Extracts elements using specified extract function.
     """
     async with async_playwright() as p:
-        # Open and go to URL
         browser = await p.chromium.launch()
-        page = await browser.new_page()
-        
-        elements = []
+        try:
+            elements = await extract_elements_with_browser(browser, url_list, extract_func_list, selectors_list,
+                                                           concurrency=concurrency, rate_limiter=rate_limiter)
+        finally:
+            await browser.close()
+
+    return elements
+
+class HttpFetcher:
+    """Browserless fetcher for server-rendered rune pages over pooled keep-alive connections.
+    """
+    def __init__(self, concurrency: int = HTTP_CONCURRENCY, rate_limiter: HostRateLimiter = None):
+        self.concurrency = concurrency
+        self.rate_limiter = rate_limiter or HostRateLimiter(HTTP_RATE_PER_SEC, HTTP_BURST)
+        self._session: aiohttp.ClientSession = None
+
+    async def start(self) -> None:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector,
+                                                  headers=HTTP_HEADERS,
+                                                  timeout=aiohttp.ClientTimeout(total=HTTP_TIMEOUT))
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def fetch_payload(self, url: str) -> dict:
+        """GET a page and return its embedded `__NEXT_DATA__` payload.
+        """
+        await self.start()
+        await self.rate_limiter.acquire(url)
+        with METRICS.time('http_fetch', url_to_rune_name(url)):
+            async with self._session.get(url) as response:
+                response.raise_for_status()
+                html = await response.text()
+        return extract_next_data(html)
+
+    async def _fetch_one(self, url: str, extract_func: Callable, selectors: List[List[str]]):
+        try:
+            payload = await self.fetch_payload(url)
+            return extract_func(selectors, payload)
+        except Exception as e:
+            return e
+
+    async def extract_elements(self,
+                               url_list: List[str],
+                               extract_func_list: List[Callable[[List[List[str]], dict], Union[List[float], float]]],
+                               selectors_list: List[List[List[str]]]) -> List[Union[List[float], float]]:
+        """Same contract as `extract_elements` but with payload extractors and no browser.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def bounded(i):
+            async with semaphore:
+                return await self._fetch_one(url_list[i], extract_func_list[i], selectors_list[i])
+
+        return await asyncio.gather(*[bounded(i) for i in range(len(url_list))])
+
+async def extract_elements_http_first(fetcher: HttpFetcher,
+                                      url_list: List[str],
+                                      extract_func_list: List[Callable],
+                                      selectors_list: List[list],
+                                      fallback: Callable,
+                                      fallback_func_list: List[Callable],
+                                      fallback_selectors_list: List[list]) -> List[Union[List[float], float]]:
+    """Extract over plain HTTP and re-scrape only the failed URLs with `fallback` (e.g. the browser).
+    """
+    elements = await fetcher.extract_elements(url_list, extract_func_list, selectors_list)
+
+    failed = [i for i, el in enumerate(elements) if isinstance(el, Exception)]
+    if failed:
+        print(f"HTTP extraction failed for {len(failed)}/{len(url_list)} URLs; falling back to browser...")
+        retried = await fallback([url_list[i] for i in failed],
+                                 [fallback_func_list[i] for i in failed],
+                                 [fallback_selectors_list[i] for i in failed])
+        for i, el in zip(failed, retried):
+            elements[i] = el
 
-        for i, url in enumerate(url_list):
-            # If the URL times out, append the TimeoutError object
-            try:
-                await page.goto(url)
-            except Exception as e:
-                elements.append(e)
-                continue # no need to asyncio.sleep since program took long
-            
-            print(f"Scraping {url}...")
-            el = await extract_func_list[i](selectors_list[i], page)
-            elements.append(el)
-            wait_time = random.uniform(url_wait[0], url_wait[1])
-            await asyncio.sleep(wait_time)
-
-        await browser.close()
-    
     return elements
 
+def browser_extractor(extractor_table: dict, mode: str) -> tuple:
+    """(extract function, selectors) the browser runs for `mode`.
+
+    The 'http' extractors parse fetched payloads, not pages, so the browser reads the same
+    responses through the 'network' extractors instead.
+    """
+    return extractor_table['network' if mode == 'http' else mode]
+
+async def extract_with_tables(browser_extract: Callable,
+                              url_list: List[str],
+                              extractor_tables: List[dict],
+                              modes: List[str],
+                              http_fetcher: HttpFetcher = None) -> List[Union[List[float], float]]:
+    """Scrape each URL with the extractor its table maps its mode to.
+
+    With an `http_fetcher`, the 'http' extractors run first and `browser_extract` only handles failures.
+    """
+    browser_pairs = [browser_extractor(table, mode) for table, mode in zip(extractor_tables, modes)]
+    browser_funcs = [pair[0] for pair in browser_pairs]
+    browser_selectors = [pair[1] for pair in browser_pairs]
+    if http_fetcher is None:
+        return await browser_extract(url_list, browser_funcs, browser_selectors)
+
+    http_pairs = [table['http'] for table in extractor_tables]
+    return await extract_elements_http_first(http_fetcher,
+                                             url_list,
+                                             [pair[0] for pair in http_pairs],
+                                             [pair[1] for pair in http_pairs],
+                                             browser_extract,
+                                             browser_funcs,
+                                             browser_selectors)
+
 
 # TODO: consolidate functions into class within its own file
 def new_json(file_path: str):
@@ -177,11 +745,53 @@ def read_json(file_path: str):
             data = json.load(file)
     return data
 
+def _encode_json_object(obj):
+    """Serialize objects json does not know, e.g. `PriceWindow`.
+    """
+    if isinstance(obj, PriceWindow):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
 def write_json(file_path: str, data):
     """Write to json file.
     """
     with open(file_path, 'w') as file:
-        json.dump(data, file, indent=4)
+        json.dump(data, file, indent=4, default=_encode_json_object)
+
+def timestamp_to_epoch(timestamp: Union[str, int]) -> int:
+    """Convert a TIMESTAMP_FORMAT string (as stored by older databases) to epoch seconds.
+    """
+    if isinstance(timestamp, numbers.Number):
+        return int(timestamp)
+    return int(datetime.strptime(timestamp, TIMESTAMP_FORMAT).timestamp())
+
+def epoch_to_timestamp(epoch: int) -> str:
+    return datetime.fromtimestamp(epoch).strftime(TIMESTAMP_FORMAT)
+
+def load_price_windows(entries: dict, price_array_len: int = PRICE_ARRAY_LEN) -> dict:
+    """Turn the serialized windows of a freshly read database into `PriceWindow`s.
+
+    Also migrates the old 'price_array'/'price_timestamps' lists and string timestamps.
+    """
+    for rune_name_standardized, rune_data in entries.items():
+        # Skip 'last_updated'
+        if rune_name_standardized == 'last_updated':
+            continue
+
+        window = rune_data.get('price_window')
+        if isinstance(window, dict):
+            rune_data['price_window'] = PriceWindow.from_dict(window)
+        elif window is None:
+            timestamps = [timestamp_to_epoch(ts) for ts in rune_data.pop('price_timestamps', [])]
+            rune_data['price_window'] = PriceWindow.from_samples(price_array_len,
+                                                                 rune_data.pop('price_array', []),
+                                                                 timestamps)
+        try:
+            rune_data['last_notified'] = timestamp_to_epoch(rune_data.get('last_notified', -1))
+        except ValueError:
+            rune_data['last_notified'] = -1 # holder value that no window ever covers
+
+    return entries
 
 def update_db_entries(prices_url_list: List[str],
                       cached_db: dict,
@@ -189,12 +799,31 @@ def update_db_entries(prices_url_list: List[str],
                       price_elements_list: List[List[float]] = None,
                       volume_elements_list: List[List[float]] = None,
                       mint_amt_element: int = 1,
-                      price_array_len: int = PRICE_ARRAY_LEN) -> None:
+                      price_array_len: int = PRICE_ARRAY_LEN,
+                      history = None,
+                      store = None,
+                      stats = None,
+                      changed: set = None) -> None:
     """Update database and return updated entries.
+
+    If a `history.PriceHistory` is given, every new sample is also appended to it.
+    If a `stats.StreamingStats` is given, every new sample is folded into it.
+    If a `persistence.DbStore` is given, the changes are journaled instead of
+    rewriting `file_path`. Only runes whose price or volume changed (or that are new)
+    are persisted; they are added to `changed` if a set is given.
     """
+    with METRICS.time('update_db_entries'):
+        return _update_db_entries(prices_url_list, cached_db, file_path, price_elements_list, volume_elements_list,
+                                  mint_amt_element, price_array_len, history, store, stats, changed)
+
+def _update_db_entries(prices_url_list, cached_db, file_path, price_elements_list, volume_elements_list,
+                       mint_amt_element, price_array_len, history, store, stats, changed) -> dict:
     # Load price db
     # entries = read_json(file_path)
     entries = cached_db
+    history_rows = []
+    journal_records = []
+    curr_epoch = int(time.time())
 
     for i, url in enumerate(prices_url_list):
         # Extract standardized name and standardized url
@@ -202,79 +831,115 @@ def update_db_entries(prices_url_list: List[str],
         rune_url_standardized = rune_name_std_to_prices_url(rune_name_standardized)
 
         # Configure variables to store in db
-        curr_time = datetime.now().strftime("%I:%M:%S %p, %m/%d/%Y")
+        curr_time = epoch_to_timestamp(curr_epoch)
 
         # Update prices, volume, and timestamps
         try:
-            price_array = entries[rune_name_standardized]['price_array']
-        except:
-            price_array = []
-        try:
-            price_timestamps = entries[rune_name_standardized]['price_timestamps']
+            price_window = entries[rune_name_standardized]['price_window']
         except:
-            price_timestamps = []
+            price_window = PriceWindow(price_array_len)
         try:
             mint_amt_element = entries[rune_name_standardized]['tokens_per_mint']
         except:
             mint_amt_element = mint_amt_element
 
-        # Sometimes, a 'TimeoutError' object is assigned within price_elements_list.
+        # Sometimes, a 'TimeoutError' object is assigned within volume_elements_list.
         # If this happens, duplicate the previous value.
         try:
             volume = volume_elements_list[i]
-
-            # Doing this to induce a potential TimeoutError being assigned to volume
-            _ = []
-            _.append(volume)
-        except TypeError or TimeoutError:
+        except TypeError:
+            volume = None # no volume scraped (e.g. from !add)
+        if not isinstance(volume, numbers.Number):
             try:
                 volume = entries[rune_name_standardized]['volume']
             except:
                 volume = 0 + 0.000000001
+            if not isinstance(volume, numbers.Number):
+                volume = 0 + 0.000000001
         
         # Resolve edge case of first scraped element being a list
         price = price_elements_list[i]
         price = price[0] if type(price) is list else price
 
         # Sometimes, type 'type' gets scraped so copy last sample
-        price = price if isinstance(price, numbers.Number) else price_array[-1]
-        
-        try:
-            price_array.append(price)
-        except TypeError or TimeoutError:
-            price_array.append(price_array[-1] + 0.000000001)
-
-        price_timestamps.append(curr_time)
-        if len(price_array) > price_array_len:
-            price_array.pop(0)
-            price_timestamps.pop(0)
+        price = price if isinstance(price, numbers.Number) else price_window.latest_price
+
+        # Unchanged samples still advance the window (it dates the rune's data) but are not persisted
+        is_changed = (rune_name_standardized not in entries
+                      or len(price_window) == 0
+                      or price != price_window.latest_price
+                      or volume != entries[rune_name_standardized]['volume'])
+        if is_changed and changed is not None:
+            changed.add(rune_name_standardized)
+
+        # Ring buffer drops the oldest sample once price_array_len is reached
+        price_window.append(price, curr_epoch)
         try:
             last_notified = entries[rune_name_standardized]['last_notified']
         except:
-            last_notified = -1 # holder value that should never be in the checked array
+            last_notified = -1 # holder value that no window ever covers
 
         to_add = {
             'last_updated': curr_time,
             rune_name_standardized: {
                 'url': rune_url_standardized,
                 'tokens_per_mint': mint_amt_element, # TODO: replace the 0
-                'price_array': price_array,
-                'price_timestamps': price_timestamps,
+                'price_window': price_window,
                 'last_notified': last_notified,
                 'volume': volume
             }
         }
 
         entries.update(to_add) # update dictionary
+        history_rows.append((rune_name_standardized, curr_epoch, price, volume))
+        if stats is not None:
+            stats.update(rune_name_standardized, curr_epoch, price, volume)
+
+        if not is_changed:
+            continue
+        fields = {'url': rune_url_standardized, 'tokens_per_mint': mint_amt_element,
+                  'last_notified': last_notified, 'volume': volume}
+        journal_records.append({'rune': rune_name_standardized, 'set': fields, 'sample': [curr_epoch, price]})
+
+    # History run-length encodes unchanged samples itself
+    if history is not None:
+        with METRICS.time('history_append'):
+            history.append_many(history_rows)
+
+    # Nothing to persist if every sample repeated the previous one
+    if not journal_records:
+        return entries
 
-    try:
-        write_json("external_cache.json", entries)
-    except:
+    if store is not None:
+        journal_records.append({'last_updated': entries['last_updated']})
+        with METRICS.time('persist_journal'):
+            store.append(journal_records)
+        with METRICS.time('persist_snapshot'):
+            store.compact_if_needed(entries)
         return entries
-    
-    write_json(file_path, entries)
+
+    with METRICS.time('persist_json'):
+        write_json(file_path, entries)
 
     return entries
 
+def fill_windows_from_history(entries: dict, history, price_array_len: int = PRICE_ARRAY_LEN) -> dict:
+    """Rebuild each rune's in-memory price window from the history store.
 
+    Runes without recorded history keep whatever the JSON database held.
+    """
+    for rune_name_standardized, rune_data in entries.items():
+        # Skip 'last_updated'
+        if rune_name_standardized == 'last_updated':
+            continue
+
+        samples = history.latest(rune_name_standardized, price_array_len)
+        if not samples:
+            continue
+        rune_data['price_window'] = PriceWindow.from_samples(price_array_len,
+                                                             [price for _, price, _ in samples],
+                                                             [ts for ts, _, _ in samples])
+        if samples[-1][2] is not None:
+            rune_data['volume'] = samples[-1][2]
 
+    return entries
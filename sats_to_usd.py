@@ -1,17 +1,125 @@
-
+import time
+import asyncio
+import aiohttp
 import requests
 
+from typing import Optional, Iterable, Union, List
+from metrics import METRICS
+
+
+# Config variables
+COINGECKO_URL = 'https://api.coingecko.com/api/v3/simple/price'
+COINGECKO_PARAMS = {
+    'ids': 'bitcoin',
+    'vs_currencies': 'USD'
+    }
+SATS_PER_BTC = 100000000
+RATE_TTL = 60 # s a fetched rate counts as fresh
+RATE_TIMEOUT = 10 # s per CoinGecko request
+
+
+def _parse_sats_to_usd_rate(payload: dict) -> float:
+    return payload['bitcoin']['usd'] / SATS_PER_BTC
+
+class BtcRateService:
+    """Cached BTC/USD rate with stale-while-revalidate refreshing.
+
+    Fresh rates (younger than `ttl`) are served from memory. Stale rates are still
+    served immediately while a single background refresh runs, so any number of
+    conversions per cycle costs at most one CoinGecko request.
+    """
+    def __init__(self, ttl: float = RATE_TTL):
+        self.ttl = ttl
+        self.rate: Optional[float] = None # USD per sat
+        self.fetched_at = 0.0 # time.monotonic() of the last successful fetch
+        self._refreshing: Optional[asyncio.Task] = None
+
+    @property
+    def fresh(self) -> bool:
+        return self.rate is not None and time.monotonic() - self.fetched_at < self.ttl
+
+    def _store(self, rate: float) -> float:
+        self.rate = rate
+        self.fetched_at = time.monotonic()
+        return rate
+
+    async def _fetch(self) -> float:
+        timeout = aiohttp.ClientTimeout(total=RATE_TIMEOUT)
+        with METRICS.time('sats_to_usd'):
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                async with session.get(COINGECKO_URL, params=COINGECKO_PARAMS) as response:
+                    response.raise_for_status()
+                    payload = await response.json()
+        return self._store(_parse_sats_to_usd_rate(payload))
+
+    def refresh(self) -> asyncio.Task:
+        """Start a refresh unless one is already in flight; returns the shared task.
+        """
+        if self._refreshing is None or self._refreshing.done():
+            self._refreshing = asyncio.ensure_future(self._fetch())
+            self._refreshing.add_done_callback(_log_refresh_error)
+        return self._refreshing
+
+    def refresh_in_background(self) -> None:
+        """Revalidate a stale rate without waiting for it.
+        """
+        if not self.fresh:
+            self.refresh()
+
+    async def get_rate(self) -> float:
+        """Return the USD-per-sat rate, only waiting on the network when no rate is cached yet.
+        """
+        if self.rate is None:
+            return await asyncio.shield(self.refresh())
+        self.refresh_in_background()
+        return self.rate
+
+    def get_rate_blocking(self) -> float:
+        """Synchronous variant for scripts without an event loop (e.g. sheets.py).
+
+        A failed refresh falls back to the last rate; it only raises before the first one.
+        """
+        if self.fresh:
+            return self.rate
+        try:
+            with METRICS.time('sats_to_usd'):
+                response = requests.get(COINGECKO_URL, params=COINGECKO_PARAMS, timeout=RATE_TIMEOUT)
+                response.raise_for_status()
+            return self._store(_parse_sats_to_usd_rate(response.json()))
+        except Exception as e:
+            if self.rate is None:
+                raise
+            print(f"BTC/USD rate refresh failed, using the last rate: {e}")
+            return self.rate
+
+    def convert(self, sats: float, default: Optional[float] = None) -> Optional[float]:
+        """Convert with the cached rate; never touches the network.
+
+        Returns `default` (None, i.e. unknown) until a rate has been fetched.
+        """
+        if self.rate is None:
+            return default
+        return sats * self.rate
+
+    def convert_many(self, sats_list: Union[Iterable[float], "numpy.ndarray"], default: Optional[float] = None) -> Union[List[Optional[float]], "numpy.ndarray"]:
+        """Batch conversion with the cached rate; arrays are scaled in one operation.
+        """
+        if self.rate is None:
+            return [default for _ in sats_list]
+        if hasattr(sats_list, '__array__'):
+            return sats_list * self.rate
+        return [sats * self.rate for sats in sats_list]
+
+def _log_refresh_error(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print(f"BTC/USD rate refresh failed: {task.exception()}")
+
+# Shared instance used by the bot and sheets
+RATES = BtcRateService()
+
+
 def sats_to_usd(sats):
     """Convert sats to USD.
     """
-    url = 'https://api.coingecko.com/api/v3/simple/price'
-    params = {
-	'ids': 'bitcoin',
-	'vs_currencies': 'USD'
-    }
-    response = requests.get(url, params=params)
-    # time.sleep() # TODO: consider this if I am getting timed out
-    sats_to_usd_rate = response.json()['bitcoin']['usd'] / 100000000
     # return round(sats * sats_to_usd_rate, 2)
-    return sats * sats_to_usd_rate
-
+    return sats * RATES.get_rate_blocking()
@@ -0,0 +1,139 @@
+
+import os
+import math
+import time
+import heapq
+import random
+
+from typing import Dict, List, Tuple, Optional
+
+
+# Config variables
+MIN_INTERVAL = 60 # s between scrapes of the hottest runes
+BASE_INTERVAL = 5*60 # s between scrapes of a rune with typical activity
+MAX_INTERVAL = 60*60 # s between scrapes of dormant runes
+INTERVAL_JITTER = 0.1 # each interval is scaled by a fresh uniform(1 - j, 1 + j)
+SCRAPE_BUDGET_PER_MIN = float(os.getenv('SCRAPE_BUDGET_PER_MIN', 30)) # global cap on rune scrapes
+VOLATILITY_REFERENCE = 1.0 # % volatility per update counted as one unit of activity
+VOLUME_REFERENCE = 1.0 # BTC 24h volume counted as one unit of activity
+INTEREST_HALF_LIFE = 60*60 # s for a !status lookup to lose half its weight
+
+
+class ScrapeScheduler:
+    """Priority queue of per-rune next-due times with intervals adapted to activity.
+
+    A rune's activity is the sum of its volatility, volume and recent user interest
+    (each relative to a reference); no activity means MAX_INTERVAL, one unit means
+    BASE_INTERVAL and more shrinks towards MIN_INTERVAL. A global token budget caps
+    how many runes are handed out per minute; runes over budget stay due.
+    """
+    def __init__(self, budget_per_min: float = SCRAPE_BUDGET_PER_MIN):
+        self.budget_per_min = budget_per_min
+        self._heap: List[Tuple[float, int, str]] = [] # (due, seq, rune); stale pairs are skipped lazily
+        self._due: Dict[str, float] = {}
+        self._seq = 0
+        self._interest: Dict[str, Tuple[float, float]] = {} # rune -> (score, as of time)
+        self._budget = budget_per_min
+        self._budget_time = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._due)
+
+    def __contains__(self, rune: str) -> bool:
+        return rune in self._due
+
+    def _push(self, rune: str, due: float) -> None:
+        self._due[rune] = due
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, rune))
+
+    def add(self, rune: str, due: float = None) -> None:
+        """Track `rune`; new runes are due immediately unless `due` is given.
+        """
+        if rune not in self._due or due is not None:
+            self._push(rune, time.time() if due is None else due)
+
+    def add_many(self, runes: List[str], spread: float = MIN_INTERVAL) -> None:
+        """Track several runes, staggered over `spread` seconds to avoid a thundering herd.
+        """
+        now = time.time()
+        for rune in runes:
+            if rune not in self._due:
+                self._push(rune, now + random.uniform(0, spread))
+
+    def remove(self, rune: str) -> None:
+        self._due.pop(rune, None)
+
+    def next_due(self) -> Optional[float]:
+        """Epoch time the next rune is due, or None if nothing is tracked.
+        """
+        self._drop_stale()
+        return self._heap[0][0] if self._heap else None
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._due.get(self._heap[0][2]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+
+    def record_interest(self, rune: str, weight: float = 1.0) -> None:
+        """Count a user lookup (e.g. `!status RUNE`) towards the rune's activity.
+        """
+        self._interest[rune] = (self.interest(rune) + weight, time.time())
+
+    def interest(self, rune: str) -> float:
+        score, since = self._interest.get(rune, (0.0, 0.0))
+        return score*0.5**((time.time() - since)/INTEREST_HALF_LIFE)
+
+    def interval(self, rune: str, rune_stats = None) -> float:
+        """Refresh interval for `rune` from its `stats.RuneStats` and user interest.
+        """
+        if rune_stats is None or rune_stats.count < 2:
+            return BASE_INTERVAL # not enough data to judge
+
+        activity = rune_stats.volatility/VOLATILITY_REFERENCE + self.interest(rune)
+        if rune_stats.ewma_volume is not None:
+            activity += rune_stats.ewma_volume/VOLUME_REFERENCE
+
+        interval = MAX_INTERVAL/(1 + activity*(MAX_INTERVAL/BASE_INTERVAL - 1))
+        return min(MAX_INTERVAL, max(MIN_INTERVAL, interval))
+
+    def reschedule(self, rune: str, rune_stats = None) -> float:
+        """Set the next due time of `rune` after a scrape, with fresh jitter; returns it.
+        """
+        if rune not in self._due:
+            return None
+        jitter = random.uniform(1 - INTERVAL_JITTER, 1 + INTERVAL_JITTER)
+        due = time.time() + self.interval(rune, rune_stats)*jitter
+        self._push(rune, due)
+        return due
+
+    def defer(self, rune: str, until: float) -> None:
+        """Make sure `rune` is not due before `until`.
+        """
+        due = self._due.get(rune)
+        if due is not None and due < until:
+            self._push(rune, until)
+
+    def _refill_budget(self) -> None:
+        now = time.monotonic()
+        self._budget = min(self.budget_per_min, self._budget + (now - self._budget_time)*self.budget_per_min/60)
+        self._budget_time = now
+
+    def pop_due(self, now: float = None) -> List[str]:
+        """Hand out the runes that are due, most overdue first, within the scrape budget.
+
+        Handed-out runes are not due again until `reschedule` is called for them.
+        """
+        now = time.time() if now is None else now
+        self._refill_budget()
+
+        runes = []
+        while self._budget >= 1:
+            self._drop_stale()
+            if not self._heap or self._heap[0][0] > now:
+                break
+            _, _, rune = heapq.heappop(self._heap)
+            self._due[rune] = math.inf # in flight until rescheduled
+            self._budget -= 1
+            runes.append(rune)
+
+        return runes
@@ -0,0 +1,217 @@
+"""
+Scraper daemon: owns the browser(s), the price database and the history store,
+and publishes every database change on the feed socket (see feed.py).
+Run it once; the bot (SCRAPER_FEED=1) and the sheet sync (sheets.py --feed)
+subscribe to it and can be restarted without triggering extra scrapes.
+"""
+
+import os
+import asyncio
+import runescrape
+
+from typing import List
+from dotenv import load_dotenv
+from browser_service import BrowserService
+from worker_pool import ScrapeWorkerPool, SCRAPE_WORKERS
+from history import PriceHistory
+from stats import StreamingStats
+from scheduler import ScrapeScheduler
+from breaker import CircuitBreaker
+from feed import FeedServer, FeedStore, FEED_SOCKET_PATH
+from runescrape import PRICE_EXTRACTORS, PRICE_VOLUME_EXTRACTORS, MINT_AMOUNT_EXTRACTORS, PRICE_ARRAY_LEN
+
+load_dotenv()
+
+# Config variables
+PRICE_DATABASE_PATH = os.getenv('PRICE_DATABASE_PATH', runescrape.PRICE_DATABASE_PATH)
+PRICE_EXTRACTION_MODE = os.getenv('PRICE_EXTRACTION_MODE', 'dom') # 'dom', 'network' or 'http'
+MINT_AMOUNT_EXTRACTION_MODE = os.getenv('MINT_AMOUNT_EXTRACTION_MODE', 'dom') # 'dom', 'network' or 'http'
+HTTP_FETCH = os.getenv('HTTP_FETCH', '0') == '1' # try plain HTTP first, use the browser only for failures
+SCHEDULER_TICK = 15 # s between checks for runes that are due
+
+
+class ScrapeDaemon:
+    """Scheduled scrapes plus on-request scrapes from subscribers, published on a `FeedServer`.
+    """
+    def __init__(self,
+                 db_path: str = PRICE_DATABASE_PATH,
+                 socket_path: str = FEED_SOCKET_PATH,
+                 browser = None,
+                 history: PriceHistory = None):
+        self.db_path = db_path
+        self.store = FeedStore(db_path, PRICE_ARRAY_LEN)
+        self.runes_db = self.store.recover()
+        self.history = history or PriceHistory()
+        self.runes_db = runescrape.fill_windows_from_history(self.runes_db, self.history)
+        self.stats = StreamingStats()
+        self.stats.load_history(self.history, self.runes_db)
+        self.scheduler = ScrapeScheduler()
+        self.scheduler.add_many(self.rune_names())
+        self.breaker = CircuitBreaker()
+        self.browser = browser or (ScrapeWorkerPool() if SCRAPE_WORKERS else BrowserService())
+        self.http_fetcher = runescrape.HttpFetcher() if HTTP_FETCH else None
+        self.server = FeedServer(self.snapshot, self.handle_request, socket_path)
+        self.lock = asyncio.Lock() # guards runes_db, like the bot's lock
+
+    def rune_names(self) -> List[str]:
+        return [name for name in self.runes_db if name != 'last_updated']
+
+    async def snapshot(self) -> dict:
+        # Taken under the lock, so no update is half-applied; serialized by the server right after
+        async with self.lock:
+            return self.runes_db
+
+    async def scrape(self, url_list: list, extractor_tables: list, modes: list) -> list:
+        return await runescrape.extract_with_tables(self.browser.extract_elements,
+                                                    url_list,
+                                                    extractor_tables,
+                                                    modes,
+                                                    self.http_fetcher)
+
+    async def refresh(self, rune_names: List[str], skip_quarantined: bool = False) -> None:
+        """Scrape price and volume of tracked runes, store them and publish what changed.
+
+        With `skip_quarantined`, runes whose probe is not due are reported as failed unscraped.
+        """
+        async with self.lock:
+            skip = {name for name in rune_names if name not in self.runes_db
+                    or (skip_quarantined and not self.breaker.allow(name))}
+            skipped = [name for name in rune_names if name in skip]
+            rune_names = [name for name in rune_names if name not in skip]
+            url_list = [self.runes_db[name]['url'] for name in rune_names]
+        if not rune_names:
+            self.server.refreshed(skipped, skipped)
+            return
+
+        pairs = await self.scrape(url_list,
+                                  [PRICE_VOLUME_EXTRACTORS]*len(url_list),
+                                  [PRICE_EXTRACTION_MODE]*len(url_list))
+        price_elements, volume_elements, failed = [], [], list(skipped)
+        for name, pair in zip(rune_names, pairs):
+            try:
+                price_elements.append(pair[0])
+                volume_elements.append(pair[1])
+                if self.breaker.record_success(name):
+                    print(f"{name} scraped again; back on its normal schedule.")
+            except: # update_db_entries keeps the previous values of failed scrapes
+                price_elements.append(TimeoutError)
+                volume_elements.append(TimeoutError)
+                failed.append(name)
+                if self.breaker.record_failure(name, pair):
+                    print(f"{name} quarantined after {self.breaker.failures} failed scrapes: {pair!r}")
+
+        async with self.lock:
+            try:
+                self.runes_db = await asyncio.to_thread(runescrape.update_db_entries,
+                                                        prices_url_list=url_list,
+                                                        cached_db=self.runes_db,
+                                                        file_path=self.db_path,
+                                                        price_elements_list=price_elements,
+                                                        volume_elements_list=volume_elements,
+                                                        history=self.history,
+                                                        store=self.store,
+                                                        stats=self.stats)
+            except Exception as e:
+                print(f"Database update failed: {e}")
+                failed = skipped + rune_names
+            self.stats.drain_alerts() # subscribers detect movements from the published samples
+            for name in rune_names:
+                self.scheduler.reschedule(name, self.stats.get(name))
+                if self.breaker.is_open(name):
+                    self.scheduler.add(name, due=self.breaker.next_probe(name)) # quarantined; next scrape is a probe
+        self.server.publish_quarantine(self.breaker.quarantined()) # for subscribers' !quarantine and announcements
+        self.server.refreshed(skipped + rune_names, failed)
+
+    async def add(self, rune_name_standardized: str) -> None:
+        """Scrape a new rune's price and mint amount and start tracking it.
+        """
+        prices_url = runescrape.rune_name_std_to_prices_url(rune_name_standardized)
+        mint_amt_url = runescrape.rune_name_std_to_mint_amt_url(rune_name_standardized)
+        prices, mint_amt = await self.scrape([prices_url, mint_amt_url],
+                                             [PRICE_EXTRACTORS, MINT_AMOUNT_EXTRACTORS],
+                                             [PRICE_EXTRACTION_MODE, MINT_AMOUNT_EXTRACTION_MODE])
+        if isinstance(prices, Exception):
+            self.server.refreshed([rune_name_standardized], [rune_name_standardized])
+            return
+        if isinstance(mint_amt, Exception):
+            mint_amt = 1
+
+        failed = []
+        async with self.lock:
+            try:
+                self.runes_db = await asyncio.to_thread(runescrape.update_db_entries,
+                                                        prices_url_list=[prices_url],
+                                                        cached_db=self.runes_db,
+                                                        file_path=self.db_path,
+                                                        price_elements_list=[prices],
+                                                        mint_amt_element=mint_amt,
+                                                        history=self.history,
+                                                        store=self.store,
+                                                        stats=self.stats)
+                self.scheduler.add(rune_name_standardized)
+                self.scheduler.reschedule(rune_name_standardized, self.stats.get(rune_name_standardized))
+            except Exception as e:
+                print(f"Database update failed: {e}")
+                failed = [rune_name_standardized]
+        self.server.refreshed([rune_name_standardized], failed)
+
+    async def set_fields(self, rune_name_standardized: str, fields: dict) -> None:
+        """Store a metadata change from a subscriber (e.g. !mintcnt or last_notified).
+        """
+        async with self.lock:
+            if rune_name_standardized not in self.runes_db:
+                return
+            self.runes_db[rune_name_standardized].update(fields)
+            await asyncio.to_thread(self.store.set_fields, rune_name_standardized, fields)
+
+    async def handle_request(self, request: dict) -> None:
+        try:
+            op = request.get('op')
+            if op == 'refresh':
+                # A bulk !update leaves quarantined runes to their probes; naming one still scrapes it
+                await self.refresh(request['runes'], skip_quarantined=len(request['runes']) > 1)
+            elif op == 'add':
+                await self.add(request['rune'])
+            elif op == 'set':
+                await self.set_fields(request['rune'], request['fields'])
+        except Exception as e:
+            print(f"Feed request {request} failed: {e}")
+
+    async def refresh_scheduled(self, rune_names: List[str]) -> None:
+        """`refresh` due runes; a failed batch is logged and put back on the schedule.
+        """
+        refreshed = False
+        try:
+            await self.refresh(rune_names)
+            refreshed = True
+        except Exception as e:
+            print(f"Scheduled refresh of {len(rune_names)} runes failed: {e}")
+        finally:
+            if not refreshed:
+                # Popped runes are not due again until rescheduled
+                for name in rune_names:
+                    self.scheduler.reschedule(name, self.stats.get(name))
+                self.server.refreshed(rune_names, rune_names)
+
+    async def run(self) -> None:
+        self.store.loop = asyncio.get_running_loop()
+        self.store.server = self.server
+        await self.browser.start()
+        await self.server.start()
+        print(f"Publishing {len(self.rune_names())} runes on {self.server.path}")
+        try:
+            while True:
+                async with self.lock:
+                    rune_names = self.scheduler.pop_due()
+                if rune_names:
+                    await self.refresh_scheduled(rune_names)
+                await asyncio.sleep(SCHEDULER_TICK)
+        finally:
+            await self.server.stop()
+            await self.browser.stop()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(ScrapeDaemon().run())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,80 @@
+
+import os
+import json
+
+from typing import Dict, List
+
+
+# Config variables
+SELECTOR_REGISTRY_PATH = os.getenv('SELECTOR_REGISTRY_PATH') # optional JSON file overriding entries below
+
+# Selectors per page field, tried in order: the primary first, then looser fallbacks.
+# Bump the version with every edit; override files older than it are ignored.
+DEFAULT_REGISTRY = {
+    'version': 1,
+    'fields': {
+        'price': [
+            "#rc-tabs-0-panel-1 > div > div.trade-list > div:nth-child(1) > div.content.display-domain.white > div.price-line > span.price",
+            "div.trade-list div.price-line > span.price",
+            ],
+        'volume': [
+            "#__next > div.main-container.runes.market > div.brc-20-market > div.mt32.flex-row-stretch.gap24 > div > div.runes-market-info-container.mt24 > div:nth-child(1) > div.flex-row-v-center.gap-4",
+            "div.runes-market-info-container > div:nth-child(1) > div.flex-row-v-center.gap-4",
+            ],
+        'mint_amount': [
+            "#__next > div.main-container.brc-20.brc-20-item-page.runes > div > div:nth-child(3) > div.ant-card-body > div > div.ml24.flex-column.gap-16 > div:nth-child(3) > div.font14.white085",
+            "div.brc-20-item-page div.ml24.flex-column.gap-16 > div:nth-child(3) > div.font14.white085",
+            ],
+        }
+    }
+
+
+class SelectorRegistry:
+    """Versioned primary/fallback CSS selectors per page field.
+
+    A JSON file of the same shape ({"version": n, "fields": {field: [selectors]}})
+    replaces the selectors of the fields it lists, so a markup change on UniSat's
+    side is fixed by editing an entry rather than the scraper.
+    """
+    def __init__(self, registry: dict = DEFAULT_REGISTRY):
+        self.version: int = registry['version']
+        self.fields: Dict[str, List[str]] = {field: list(selectors) for field, selectors in registry['fields'].items()}
+
+    def selectors(self, field: str) -> List[str]:
+        return self.fields[field]
+
+    def primaries(self, fields: List[str]) -> List[str]:
+        """Primary selector of each field, e.g. to build fixture pages.
+        """
+        return [self.fields[field][0] for field in fields]
+
+    def update(self, registry: dict) -> bool:
+        """Apply an override registry; returns False (leaving entries as they are) if it is outdated.
+        """
+        if registry.get('version', 0) < self.version:
+            return False
+        fields = registry.get('fields', {})
+        for field, selectors in fields.items(): # checked up front so a bad file changes nothing
+            if not selectors:
+                raise ValueError(f"Selector registry entry '{field}' is empty")
+        for field, selectors in fields.items():
+            self.fields[field] = list(selectors)
+        self.version = registry['version']
+        return True
+
+    @classmethod
+    def load(cls, path: str = SELECTOR_REGISTRY_PATH) -> "SelectorRegistry":
+        """Built-in registry with the entries of the JSON file at `path` (if any) applied.
+        """
+        registry = cls()
+        if not path:
+            return registry
+        with open(path, 'r') as file:
+            override = json.load(file)
+        if not registry.update(override):
+            print(f"Ignoring selector registry {path}: version {override.get('version')} is older than "
+                  f"the built-in version {registry.version}")
+        return registry
+
+# Shared instance the extractors read
+REGISTRY = SelectorRegistry.load()
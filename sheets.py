@@ -5,23 +5,34 @@ at https://docs.gspread.org/en/latest/oauth2.html
 to enable gspread to edit the specified sheet.
 """
 
+import sys
 import schedule
 import time
+import asyncio
+import queue
 import gspread
+import threading
 
-from runescrape import rune_name_standardizer, read_json
-from runescrape import PRICE_DATABASE_PATH
-from sats_to_usd import sats_to_usd
+from typing import Callable, Dict, List, Optional
+from runescrape import rune_name_standardizer
+from runescrape import PRICE_DATABASE_PATH, PRICE_ARRAY_LEN
+from persistence import DbStore
+from sats_to_usd import RATES
+from feed import FeedClient, apply_records
 
 
 SHEETS_URL = r"https://docs.google.com/spreadsheets/d/1NGot3Ks3fbJL3ZRF7yCRSfBsqNKIjPXJWYMAftRkUgU/edit#gid=1484089764"
+WORKSHEET_NAME = "Accounting"
+PRICE_COLUMN = "P" # column holding each rune's USD token price
+RUNE_NOT_FOUND = 'RUNE NOT FOUND IN DB'
+RATE_CHECK_INTERVAL = 60 # s between checks for a new BTC/USD rate while no prices change
 
-def init_worksheet_and_runes(sheets_url):
+def init_worksheet_and_runes(sheets_url, client_factory: Callable = gspread.service_account):
     """Open sheet and retrieve standardized rune_names
     """
-    gc = gspread.service_account()
-    book = gc.open_by_url(SHEETS_URL)
-    worksheet = book.worksheet("Accounting") # open sheet
+    gc = client_factory()
+    book = gc.open_by_url(sheets_url)
+    worksheet = book.worksheet(WORKSHEET_NAME) # open sheet
 
     rune_names = worksheet.col_values(1) # get rune names from first col
     rune_names.pop(0), rune_names.pop(-1) # remove col title and 'totals'
@@ -30,53 +41,187 @@ def init_worksheet_and_runes(sheets_url):
 
     return worksheet, rune_names_std
 
-def construct_runes_corresponding_prices(rune_names_std, runes_db):
-    """Construct list of latest prices with indices corresponding to rune in rune_names_std
+class SheetsSync:
+    """Diff-based sync of rune prices into the Google Sheet.
+
+    The worksheet handle and the rune -> row map are opened once and kept. Callers
+    publish the latest sats price of runes that changed; a worker thread converts
+    them to USD and pushes only the cells whose value differs from what it last
+    wrote, in one `batch_update`. Every known price is re-diffed after the sheet is
+    (re)opened and whenever the BTC/USD rate changes, since all USD values move with
+    it. `client_factory` returns a gspread-like client, so a local fake can stand in
+    for Google.
     """
-    runes_corresponding_prices = [0]*len(rune_names_std) # preallocate array
-    for i, name in enumerate(rune_names_std):
+    def __init__(self, sheets_url: str = SHEETS_URL, client_factory: Callable = gspread.service_account):
+        self.sheets_url = sheets_url
+        self.client_factory = client_factory
+        self.worksheet = None
+        self.rows: Dict[str, int] = {} # standardized rune name -> sheet row
+        self._written: Dict[int, object] = {} # row -> value last pushed
+        self._pending: Dict[str, Optional[float]] = {} # rune -> latest sats price, coalesced
+        self._prices: Dict[str, Optional[float]] = {} # rune -> latest sats price ever published
+        self._complete = False # _prices holds the whole database (publish_all), so absent rows are missing runes
+        self._requeue = False # re-diff every known price on the next flush
+        self._rate: Optional[float] = None # rate the pushed values were converted with
+        self._pending_lock = threading.Lock()
+        self._wakeup = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def open(self) -> None:
+        """(Re)open the worksheet and rebuild the row map; pushed values are forgotten.
+        """
+        self.worksheet, rune_names_std = init_worksheet_and_runes(self.sheets_url, self.client_factory)
+        self.rows = {name: i + 2 for i, name in enumerate(rune_names_std)} # row 1 is the title
+        self._written.clear()
+        with self._pending_lock:
+            self._requeue = True
+
+    def publish(self, prices: Dict[str, Optional[float]]) -> None:
+        """Queue the latest sats price of changed runes (None marks a rune missing from the db).
+        """
+        with self._pending_lock:
+            self._pending.update(prices)
+            self._prices.update(prices)
+        self._wakeup.put(None)
+
+    def publish_all(self, runes_db: dict) -> None:
+        """Queue every rune of `runes_db`, e.g. at startup; sheet rows it lacks are marked missing.
+        """
+        prices = {name: rune_data['price_window'].latest_price for name, rune_data in runes_db.items()
+                  if name != 'last_updated' and len(rune_data['price_window'])}
+        with self._pending_lock:
+            self._prices = prices
+            self._complete = True
+            self._requeue = True
+        self._wakeup.put(None)
+
+    def _known_prices(self) -> Dict[str, Optional[float]]:
+        if self._complete:
+            return {name: self._prices.get(name) for name in self.rows}
+        return dict(self._prices)
+
+    def diff(self, prices: Dict[str, Optional[float]], rate: float) -> List[dict]:
+        """Cells of `prices` whose value differs from what was last pushed, as batch_update ranges.
+        """
+        updates = []
+        for name, price_sats in prices.items():
+            row = self.rows.get(name)
+            if row is None:
+                continue # rune is not on the sheet
+            value = RUNE_NOT_FOUND if price_sats is None else price_sats * rate
+            if self._written.get(row) != value:
+                updates.append({'range': f"{PRICE_COLUMN}{row}", 'values': [[value]]})
+        return updates
+
+    def flush(self) -> int:
+        """Push pending changes in one request; returns the number of cells written.
+        """
+        with self._pending_lock:
+            if not self._pending and not self._prices:
+                return 0
+        if self.worksheet is None:
+            self.open()
         try:
-            token_price_usd = sats_to_usd(runes_db[name]['price_array'][-1])
-            runes_corresponding_prices[i] = [token_price_usd]
-        except KeyError:
-            runes_corresponding_prices[i] = ['RUNE NOT FOUND IN DB']
+            rate = RATES.get_rate_blocking()
         except Exception as e:
-            print(e)
-            runes_corresponding_prices[i] = [e]
-
-    return runes_corresponding_prices
+            # Nothing to convert with yet; the sheet is fine, so keep it and the queued prices
+            print(f"Sheet sync waiting for a BTC/USD rate: {e}")
+            return 0
+
+        with self._pending_lock:
+            prices, self._pending = self._pending, {}
+            if self._requeue or rate != self._rate:
+                prices = {**self._known_prices(), **prices}
+                self._requeue = False
+        if not prices:
+            return 0
 
-def update_worksheet(rune_names_std, worksheet, runes_corresponding_prices):
-    """Update the corresponding cells of the updated prices
-    """
-    range_end = len(rune_names_std) + 1
-    worksheet.update(runes_corresponding_prices, f"P2:P{range_end}")
+        try:
+            updates = self.diff(prices, rate)
+            if updates:
+                self.worksheet.batch_update(updates)
+        except Exception:
+            # Keep the changes for the next flush, unless newer prices arrived meanwhile
+            with self._pending_lock:
+                self._pending = {**prices, **self._pending}
+            raise
+
+        self._rate = rate
+        for update in updates:
+            self._written[int(update['range'][len(PRICE_COLUMN):])] = update['values'][0][0]
+        return len(updates)
+
+    def _run(self) -> None:
+        while True:
+            try:
+                if self._wakeup.get(timeout=RATE_CHECK_INTERVAL) is StopIteration:
+                    return
+            except queue.Empty:
+                pass # no new prices; the rate may still have changed
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Sheet sync failed: {e}")
+                self.worksheet = None # reopen (re-reading the row map) on the next flush
+
+    def start(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name='sheets-sync', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout: float = None) -> None:
+        if self._thread is not None:
+            self._wakeup.put(StopIteration)
+            self._thread.join(timeout)
+            self._thread = None
+
+# Kept across runs of main() so the client, row map and pushed values survive
+SYNC = SheetsSync()
 
 def main():
-    """Retrieves rune names and updates corresponding rune prices in Google Sheets.
+    """Retrieves rune names and updates changed rune prices in Google Sheets.
     """
     print("Updating sheet...")
 
-    # Open sheet and retrieve standardized rune_names
-    worksheet, rune_names_std = init_worksheet_and_runes(SHEETS_URL)
-
     # Search database for the current prices of the runes
-    runes_db = read_json(PRICE_DATABASE_PATH)
-
-    ## Construct list of latest prices with indices corresponding to rune in rune_names_std
-    runes_corresponding_prices = construct_runes_corresponding_prices(rune_names_std, runes_db)
+    runes_db = DbStore(PRICE_DATABASE_PATH, PRICE_ARRAY_LEN).recover()
 
-    # Update the corresponding cells of the updated prices
-    update_worksheet(rune_names_std, worksheet, runes_corresponding_prices)
+    # Push the cells that changed since the last run
+    if SYNC.worksheet is None:
+        SYNC.open()
+    SYNC.publish_all(runes_db)
+    SYNC.flush()
     
     return
 
+async def follow_feed():
+    """Push prices as scrape_daemon.py publishes them instead of re-reading the database.
+    """
+    runes_db = {}
+
+    async def on_snapshot(entries: dict) -> None:
+        runes_db.clear()
+        runes_db.update(entries)
+        if SYNC.worksheet is None:
+            await asyncio.to_thread(SYNC.open)
+        SYNC.publish_all(runes_db)
+
+    async def on_update(records: list) -> None:
+        sampled = apply_records(runes_db, records)
+        SYNC.publish({name: runes_db[name]['price_window'].latest_price for name in sampled})
+
+    SYNC.start()
+    await FeedClient(on_snapshot, on_update).run()
+
 schedule.every(2.5).minutes.do(main)
 
 if __name__ == "__main__":
-    while True:
-        try:
-            schedule.run_pending()
-        except Exception as e:
-            print(e)
-        time.sleep(1)
\ No newline at end of file
+    if '--feed' in sys.argv:
+        asyncio.run(follow_feed())
+    else:
+        while True:
+            try:
+                schedule.run_pending()
+            except Exception as e:
+                print(e)
+            time.sleep(1)
\ No newline at end of file
@@ -0,0 +1,134 @@
+
+import math
+
+from collections import deque
+from typing import Dict, List, Optional, NamedTuple
+
+
+# Config variables
+STATS_ALPHA = 2/(12 + 1) # EWMA weight of a new sample (~12-sample span, i.e. 1 h at 5-min scrapes)
+STATS_WINDOW = 12 # samples covered by the rolling min/max
+Z_THRESHOLD = 4.0 # |z-score| of a single move that counts as significant
+Z_MIN_SAMPLES = 6 # returns needed before z-scores are trusted
+Z_MIN_STD = 0.005 # floor on the return std so flat runes do not alert on tiny moves
+
+
+class ZAlert(NamedTuple):
+    rune: str
+    z_score: float
+    percent_change: float # move of this sample vs the previous one
+    price: float
+    timestamp: int
+
+class RuneStats:
+    """O(1)-per-sample running statistics of one rune.
+    """
+    __slots__ = ('count', 'last_price', 'last_ts', 'ewma_price', 'ewma_volume',
+                 'return_mean', 'return_var', '_min_window', '_max_window')
+
+    def __init__(self):
+        self.count = 0
+        self.last_price = None
+        self.last_ts = None
+        self.ewma_price = None
+        self.ewma_volume = None
+        self.return_mean = 0.0 # EW mean of per-sample returns
+        self.return_var = 0.0 # EW variance of per-sample returns
+        self._min_window = deque() # (index, price) with increasing prices
+        self._max_window = deque() # (index, price) with decreasing prices
+
+    @property
+    def volatility(self) -> float:
+        """EW standard deviation of per-sample returns, in percent.
+        """
+        return math.sqrt(self.return_var)*100
+
+    @property
+    def min_price(self) -> float:
+        return self._min_window[0][1] if self._min_window else None
+
+    @property
+    def max_price(self) -> float:
+        return self._max_window[0][1] if self._max_window else None
+
+    def update(self, price: float, volume: float, ts: int, alpha: float = STATS_ALPHA) -> Optional[float]:
+        """Fold in one sample and return the z-score of its move (None until enough history).
+        """
+        z_score = None
+        if self.last_price:
+            ret = (price - self.last_price)/self.last_price
+            if self.count > Z_MIN_SAMPLES:
+                z_score = (ret - self.return_mean)/max(math.sqrt(self.return_var), Z_MIN_STD)
+
+            # Exponentially weighted mean/variance (West's incremental form)
+            diff = ret - self.return_mean
+            incr = alpha*diff
+            self.return_mean += incr
+            self.return_var = (1 - alpha)*(self.return_var + diff*incr)
+
+        self.ewma_price = price if self.ewma_price is None else self.ewma_price + alpha*(price - self.ewma_price)
+        if volume is not None:
+            self.ewma_volume = volume if self.ewma_volume is None else self.ewma_volume + alpha*(volume - self.ewma_volume)
+
+        # Rolling min/max with monotonic deques (amortized O(1))
+        index = self.count
+        while self._min_window and self._min_window[-1][1] >= price:
+            self._min_window.pop()
+        self._min_window.append((index, price))
+        while self._max_window and self._max_window[-1][1] <= price:
+            self._max_window.pop()
+        self._max_window.append((index, price))
+        for window in (self._min_window, self._max_window):
+            if window[0][0] <= index - STATS_WINDOW:
+                window.popleft()
+
+        self.count += 1
+        self.last_price = price
+        self.last_ts = ts
+        return z_score
+
+class StreamingStats:
+    """Running statistics for every rune, fed by `runescrape.update_db_entries`.
+
+    Samples whose move is statistically significant are queued as `ZAlert`s until drained.
+    """
+    def __init__(self, z_threshold: float = Z_THRESHOLD):
+        self.z_threshold = z_threshold
+        self.runes: Dict[str, RuneStats] = {}
+        self._alerts: List[ZAlert] = []
+
+    def get(self, rune: str) -> Optional[RuneStats]:
+        return self.runes.get(rune)
+
+    def update(self, rune: str, ts: int, price: float, volume: float = None) -> Optional[ZAlert]:
+        stats = self.runes.get(rune)
+        if stats is None:
+            stats = self.runes[rune] = RuneStats()
+        previous_price = stats.last_price
+
+        z_score = stats.update(price, volume, ts)
+        if z_score is None or abs(z_score) < self.z_threshold:
+            return None
+
+        alert = ZAlert(rune=rune,
+                       z_score=z_score,
+                       percent_change=(price - previous_price)/previous_price*100,
+                       price=price,
+                       timestamp=ts)
+        self._alerts.append(alert)
+        return alert
+
+    def drain_alerts(self) -> List[ZAlert]:
+        alerts, self._alerts = self._alerts, []
+        return alerts
+
+    def load_history(self, history, entries: dict, samples: int = 10*STATS_WINDOW) -> None:
+        """Warm up every tracked rune from a `history.PriceHistory` without raising alerts.
+        """
+        for rune in entries:
+            # Skip 'last_updated'
+            if rune == 'last_updated':
+                continue
+            for ts, price, volume in history.latest(rune, samples):
+                self.update(rune, ts, price, volume)
+        self._alerts.clear()
@@ -0,0 +1,74 @@
+
+from typing import Callable, Dict, Iterable, List, Optional
+
+
+# Config variables
+DISCORD_MSG_LIMIT = 2000 # characters per Discord message
+
+
+def paginate(header: str, blocks: Iterable[str], limit: int = DISCORD_MSG_LIMIT) -> List[str]:
+    """Split header + blocks into messages of at most `limit` characters, never splitting a block.
+    """
+    pages = []
+    page = header
+    for block in blocks:
+        if page and len(page) + len(block) > limit:
+            pages.append(page)
+            page = ""
+        page += block[:limit] # a single oversized block is cut rather than rejected by Discord
+    if page:
+        pages.append(page)
+    return pages
+
+class StatusCache:
+    """Memoized `!status` rendering.
+
+    Keeps one pre-formatted block per rune plus the overview already split into
+    pages. Blocks are re-rendered only for runes marked dirty, or for every rune
+    when the BTC/USD rate changes, so serving `!status` is a dictionary lookup.
+    `render_block(rune_name, rune_data)` builds one rune's block.
+    """
+    def __init__(self, render_block: Callable[[str, dict], str], limit: int = DISCORD_MSG_LIMIT):
+        self.render_block = render_block
+        self.limit = limit
+        self._blocks: Dict[str, str] = {}
+        self._dirty = set()
+        self._all_dirty = True
+        self._rate = None
+        self._pages: List[str] = []
+
+    def invalidate(self, rune_names: Iterable[str]) -> None:
+        self._dirty.update(rune_names)
+
+    def invalidate_all(self) -> None:
+        self._all_dirty = True
+
+    def stale(self, rate: Optional[float]) -> bool:
+        return self._all_dirty or bool(self._dirty) or rate != self._rate
+
+    def refresh(self, entries: dict, rate: Optional[float], header: str) -> None:
+        """Re-render what changed since the last refresh and re-split the overview.
+
+        Callers must keep `entries` from being mutated meanwhile (hold the bot's lock).
+        """
+        if rate != self._rate:
+            self._all_dirty = True
+
+        rune_names = [name for name in entries if name != 'last_updated']
+        if self._all_dirty:
+            self._blocks = {name: self.render_block(name, entries[name]) for name in rune_names}
+        else:
+            for name in self._dirty:
+                if name in entries:
+                    self._blocks[name] = self.render_block(name, entries[name])
+
+        self._pages = paginate(header, [self._blocks[name] for name in rune_names], self.limit)
+        self._dirty.clear()
+        self._all_dirty = False
+        self._rate = rate
+
+    def block(self, rune_name: str) -> Optional[str]:
+        return self._blocks.get(rune_name)
+
+    def pages(self) -> List[str]:
+        return self._pages
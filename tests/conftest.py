@@ -0,0 +1,42 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Modules read their paths from the environment at import time, so point every
+# file the bot and daemon create at a scratch directory before anything is imported
+SCRATCH_DIR = tempfile.mkdtemp(prefix='runescrape-tests-')
+os.environ.setdefault('PRICE_DATABASE_PATH', os.path.join(SCRATCH_DIR, 'runes_db.json'))
+os.environ.setdefault('HISTORY_DATABASE_PATH', os.path.join(SCRATCH_DIR, 'history.sqlite3'))
+os.environ.setdefault('DISCOVERY_STATE_PATH', os.path.join(SCRATCH_DIR, 'discovery_state.json'))
+os.environ.setdefault('FEED_SOCKET_PATH', os.path.join(SCRATCH_DIR, 'runescrape.sock'))
+os.environ.setdefault('METRICS_PORT', '0')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class Clock:
+    """Settable stand-in for time.time().
+    """
+    def __init__(self, now: float = 1_700_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr('time.time', clock)
+    return clock
+
+@pytest.fixture(scope='session')
+def bot_module():
+    import bot
+    bot.setup()
+    return bot
@@ -0,0 +1,29 @@
+import os
+import asyncio
+
+
+class FakeBrowserService:
+    """Stand-in for `BrowserService` in spawned scrape workers, so it lives in an importable module.
+
+    A URL ending in '/slow' takes SLOW_SECONDS, one ending in '/crash' kills the worker;
+    any other returns (worker pid, rate, burst, url).
+    """
+    SLOW_SECONDS = 2
+
+    def __init__(self, pool_size: int, **launch_kwargs):
+        self.pool_size = pool_size
+
+    async def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    async def extract_elements(self, url_list, extract_func_list, selectors_list,
+                               concurrency=None, rate_limiter=None) -> list:
+        url, = url_list
+        if url.endswith('/slow'):
+            await asyncio.sleep(self.SLOW_SECONDS)
+        elif url.endswith('/crash'):
+            os._exit(1)
+        return [(os.getpid(), rate_limiter.rate, rate_limiter.burst, url)]
@@ -0,0 +1,55 @@
+import asyncio
+
+import pytest
+
+from blocks import BlockWatcher, LocalBlockSource, crossed_milestones, HALVING_INTERVAL
+
+
+@pytest.mark.parametrize('previous, height, expected', [
+    (None, 840000, []),
+    (839998, 839999, []),
+    (839999, 840000, [840000]),
+    (849990, 850010, [850000]),
+    (29999, 50000, [30000, 40000, 50000]),
+    (840000, 840000, []),
+    ])
+def test_crossed_milestones(previous, height, expected):
+    assert crossed_milestones(previous, height, every=10000) == expected
+
+def test_halvings_are_milestones_whatever_the_spacing():
+    assert crossed_milestones(HALVING_INTERVAL - 1, HALVING_INTERVAL, every=1000000) == [HALVING_INTERVAL]
+
+def test_local_source_advances():
+    source = LocalBlockSource(100)
+    assert source.advance() == 101
+    assert source.advance(5) == 106
+    assert asyncio.run(source.height()) == 106
+
+def test_watcher_notifies_each_new_tip():
+    source = LocalBlockSource(840000)
+    watcher = BlockWatcher(source, poll_interval=0)
+    blocks = []
+
+    async def on_block(height, previous):
+        blocks.append((height, previous))
+
+    async def failing(height, previous):
+        raise RuntimeError("subscriber broke")
+
+    watcher.subscribe(failing)
+    watcher.subscribe(on_block)
+
+    async def main():
+        assert not await watcher.poll() # first poll only records the height
+        assert not await watcher.poll()
+        source.advance(2)
+        waiter = asyncio.create_task(watcher.wait_for_block())
+        await asyncio.sleep(0)
+        assert await watcher.poll()
+        assert await waiter == 840002
+        source.tip = 840001 # lagging backend
+        assert not await watcher.poll()
+
+    asyncio.run(main())
+    assert blocks == [(840002, 840000)]
+    assert watcher.height == 840002
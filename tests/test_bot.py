@@ -0,0 +1,150 @@
+import asyncio
+
+import runescrape
+import scheduler
+from breaker import Quarantined
+
+
+def scrape(bot, rune_name, price, volume=1.0):
+    url = runescrape.rune_name_std_to_prices_url(rune_name)
+    asyncio.run(bot.store_price_volume([url], [[price, volume]]))
+
+def test_jump_after_flat_stretch_alerts(bot_module, clock):
+    bot = bot_module
+    for _ in range(24): # two hours unchanged at 100 sats
+        scrape(bot, 'flat.then.jump', 100.0)
+        clock.advance(5*60)
+    scrape(bot, 'flat.then.jump', 120.0)
+
+    alerts = bot.DETECTOR.evaluate(['flat.then.jump'])
+    assert [(alert.window, round(alert.percent_change)) for alert in alerts] == [('15m', 20)]
+
+def test_block_scrapes_each_due_rune_once(bot_module, clock, monkeypatch):
+    bot = bot_module
+    queue = bot.ScrapeScheduler()
+    scraped = []
+
+    async def refresh_many(rune_names, max_age=None):
+        scraped.extend(rune_names)
+        for name in rune_names:
+            queue.add(name, due=clock.now + 60) # hot rune; due again every minute
+
+    async def no_check():
+        pass
+
+    monkeypatch.setattr(bot, 'SCHEDULER', queue)
+    monkeypatch.setattr(bot.REFRESHER, 'refresh_many', refresh_many)
+    monkeypatch.setattr(bot, 'schedule_price_mvmt_check', no_check)
+    monkeypatch.setattr(bot, 'WATCHER', object())
+    for name in ('BLOCK_PENDING', 'LAST_BLOCK_TIME', 'BLOCK_HORIZON'):
+        monkeypatch.setattr(bot, name, getattr(bot, name)) # restored after the test
+    queue.add('hot.rune')
+    queue.add('later.rune', due=clock.now + 5*60)
+    queue.add('next.block.rune', due=clock.now + bot.BLOCK_LOOKAHEAD + 60)
+
+    asyncio.run(bot.on_new_block(2, 1))
+    for _ in range(bot.BLOCK_LOOKAHEAD//bot.SCHEDULER_TICK):
+        asyncio.run(bot.schedule_update_db.coro())
+        clock.advance(bot.SCHEDULER_TICK)
+
+    assert sorted(scraped) == ['hot.rune', 'later.rune']
+    assert not bot.BLOCK_PENDING
+
+def test_failed_scheduled_refresh_reschedules_popped_runes(bot_module, clock, monkeypatch):
+    bot = bot_module
+    queue = bot.ScrapeScheduler()
+
+    async def refresh_many(rune_names, max_age=None):
+        raise RuntimeError("browser crashed")
+
+    monkeypatch.setattr(bot, 'SCHEDULER', queue)
+    monkeypatch.setattr(bot.REFRESHER, 'refresh_many', refresh_many)
+    monkeypatch.setattr(bot, 'WATCHER', None)
+    queue.add('crashing.rune')
+
+    asyncio.run(bot.schedule_update_db.coro())
+    assert queue.pop_due() == []
+    clock.advance(scheduler.MAX_INTERVAL)
+    assert queue.pop_due() == ['crashing.rune']
+
+class FakeContext:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, msg):
+        self.sent.append(msg)
+
+def test_quarantine_mirrors_the_daemon_in_feed_mode(bot_module, monkeypatch):
+    bot = bot_module
+    reports = []
+
+    async def report_breaker(quarantined, recovered):
+        reports.append((quarantined, recovered))
+
+    monkeypatch.setattr(bot, 'FEED', object())
+    monkeypatch.setattr(bot, 'FEED_QUARANTINE', None)
+    monkeypatch.setattr(bot, 'report_breaker', report_breaker)
+    stuck = Quarantined('stuck.rune', 3, 'TimeoutError()', 0.0, 1800.0)
+    gone = Quarantined('gone.rune', 5, 'TimeoutError()', 0.0, 1800.0)
+
+    async def main():
+        await bot.on_feed_quarantine([stuck]) # state at connect; not announced
+        await bot.on_feed_quarantine([stuck, gone])
+        await bot.on_feed_quarantine([gone])
+        ctx = FakeContext()
+        await bot.quarantine.callback(ctx)
+        return ctx.sent
+
+    sent = asyncio.run(main())
+    assert reports == [(['gone.rune'], []), ([], ['stuck.rune'])]
+    assert len(sent) == 1 and 'GONE•RUNE' in sent[0] and 'STUCK•RUNE' not in sent[0]
+
+def test_feed_mode_update_skips_runes_the_daemon_quarantined(bot_module, clock, monkeypatch):
+    monkeypatch.setattr(bot_module, 'FEED', object())
+    monkeypatch.setattr(bot_module, 'FEED_QUARANTINE', [Quarantined('stuck.rune', 3, 'TimeoutError()', clock.now, clock.now + 1800)])
+    assert not bot_module.scrape_allowed('stuck.rune')
+    assert bot_module.scrape_allowed('fine.rune')
+    clock.advance(1800) # probe due
+    assert bot_module.scrape_allowed('stuck.rune')
+
+def test_feed_refresh_advances_unchanged_mirrored_runes(bot_module, clock, monkeypatch):
+    bot = bot_module
+
+    async def no_check():
+        pass
+
+    monkeypatch.setattr(bot, 'schedule_price_mvmt_check', no_check)
+    scrape(bot, 'mirror.same', 100.0)
+    scrape(bot, 'mirror.moved', 100.0)
+    clock.advance(5*60)
+    now = int(clock.now)
+
+    async def main():
+        await bot.on_feed_update([{'rune': 'mirror.moved', 'set': {'volume': 1.0}, 'sample': [now, 110.0]}])
+        await bot.on_feed_refreshed(['mirror.same', 'mirror.moved'], [])
+
+    asyncio.run(main())
+    same, moved = bot.RUNES_DB['mirror.same']['price_window'], bot.RUNES_DB['mirror.moved']['price_window']
+    assert (same.latest_timestamp, same.latest_price, len(same)) == (now, 100.0, 2)
+    assert (moved.latest_timestamp, moved.latest_price, len(moved)) == (now, 110.0, 2) # not sampled twice
+    assert bot.DETECTOR.latest_timestamp('mirror.same') == now
+
+def test_status_without_a_rate_shows_usd_as_unavailable(bot_module):
+    msg = bot_module.rune_status_msg(12.5, None, 1000, 0.3)
+    assert "**12.5 sats** per token" in msg
+    assert "USD n/a" in msg and "$" not in msg
+    assert "**$0.0125** per token" in bot_module.rune_status_msg(12.5, 0.0125, 1000, 0.3)
+
+def test_ambiguous_names_reply_with_candidates(bot_module, monkeypatch):
+    bot = bot_module
+    index = bot.NameIndex()
+    for name in ('satoshi.nakamoto', 'sat.stacker'):
+        index.add(name)
+    monkeypatch.setattr(bot, 'NAME_INDEX', index)
+
+    assert bot.rune_nickname_check_to_std('sat.s') == 'sat.stacker'
+    error = bot.rune_nickname_check_to_std('sat')
+    assert isinstance(error, bot.AmbiguousName)
+    msg = bot.unresolved_msg(error, 'Nickname does not exist.')
+    assert 'SATOSHI•NAKAMOTO' in msg and 'SAT•STACKER' in msg
+    assert bot.unresolved_msg(bot.rune_nickname_check_to_std('zzz.qqq'), 'Nickname does not exist.') == 'Nickname does not exist.'
@@ -0,0 +1,44 @@
+from breaker import CircuitBreaker, Quarantined
+
+
+def test_quarantines_after_consecutive_failures():
+    breaker = CircuitBreaker(failures=3, probe_interval=60, probe_max=300)
+    assert not breaker.record_failure('a.rune', 'timeout', now=0)
+    assert not breaker.record_failure('a.rune', 'timeout', now=10)
+    assert breaker.record_failure('a.rune', TimeoutError('no price'), now=20)
+
+    assert breaker.is_open('a.rune')
+    assert breaker.quarantined() == [Quarantined('a.rune', 3, "TimeoutError('no price')", 20, 80)]
+    assert not breaker.allow('a.rune', now=79)
+    assert breaker.allow('a.rune', now=80)
+    assert breaker.allow('other.rune', now=0)
+
+def test_success_resets_the_count():
+    breaker = CircuitBreaker(failures=2)
+    breaker.record_failure('a.rune', now=0)
+    assert not breaker.record_success('a.rune')
+    assert not breaker.record_failure('a.rune', now=1)
+    assert not breaker.is_open('a.rune')
+
+def test_failed_probes_back_off_up_to_the_maximum():
+    breaker = CircuitBreaker(failures=1, probe_interval=60, probe_max=200)
+    breaker.record_failure('a.rune', now=0)
+    probes = []
+    for now in (60, 180, 400, 600):
+        assert not breaker.record_failure('a.rune', now=now) # already quarantined
+        probes.append(breaker.next_probe('a.rune') - now)
+    assert probes == [120, 200, 200, 200]
+
+def test_successful_probe_closes_the_quarantine():
+    breaker = CircuitBreaker(failures=1)
+    breaker.record_failure('a.rune', now=0)
+    assert breaker.record_success('a.rune')
+    assert not breaker.is_open('a.rune')
+    assert breaker.next_probe('a.rune') is None
+    assert breaker.quarantined() == []
+
+def test_longest_quarantined_first():
+    breaker = CircuitBreaker(failures=1)
+    breaker.record_failure('late.rune', now=50)
+    breaker.record_failure('early.rune', now=10)
+    assert [entry.rune for entry in breaker.quarantined()] == ['early.rune', 'late.rune']
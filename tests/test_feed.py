@@ -0,0 +1,86 @@
+import asyncio
+
+from breaker import Quarantined
+from feed import FeedServer, FeedClient, apply_records
+from price_window import PriceWindow
+
+
+def test_snapshot_update_refreshed_round_trip(tmp_path):
+    window = PriceWindow(20)
+    window.append(100.0, 1000)
+    db = {'last_updated': "12:00:00 PM, 01/01/2025",
+          'a.rune': {'url': 'https://unisat.io/runes/market?tick=A•RUNE', 'tokens_per_mint': 10,
+                     'price_window': window, 'last_notified': -1, 'volume': 1.5}}
+    mirror, refreshed = {}, []
+
+    async def snapshot():
+        return db
+
+    async def on_request(request):
+        assert request == {'op': 'refresh', 'runes': ['a.rune']}
+        server.publish([{'rune': 'a.rune', 'set': {'volume': 2.0}, 'sample': [1300, 110.0]}])
+        server.refreshed(['a.rune'], [])
+
+    async def on_snapshot(entries):
+        mirror.clear()
+        mirror.update(entries)
+
+    async def on_update(records):
+        assert apply_records(mirror, records) == ['a.rune']
+
+    async def on_refreshed(runes, failed):
+        refreshed.append((runes, failed))
+
+    async def main():
+        await server.start()
+        client = FeedClient(on_snapshot, on_update, server.path, on_refreshed=on_refreshed)
+        task = asyncio.create_task(client.run())
+        try:
+            await asyncio.wait_for(client.connected.wait(), 5)
+            assert mirror['a.rune']['price_window'].latest_price == 100.0
+            assert await client.refresh(['a.rune'], timeout=5) == set()
+        finally:
+            task.cancel()
+            await server.stop()
+
+    server = FeedServer(snapshot, on_request, str(tmp_path/'feed.sock'))
+    asyncio.run(main())
+
+    price_window = mirror['a.rune']['price_window']
+    assert (price_window.latest_timestamp, price_window.latest_price) == (1300, 110.0)
+    assert mirror['a.rune']['volume'] == 2.0
+    assert mirror['a.rune']['tokens_per_mint'] == 10
+    assert refreshed == [(['a.rune'], [])]
+    assert not server._requests
+
+def test_quarantine_is_sent_on_connect_and_on_change(tmp_path):
+    received = []
+    entry = Quarantined('a.rune', 3, 'TimeoutError()', 10.0, 1810.0)
+
+    async def snapshot():
+        return {}
+
+    async def ignore(*args):
+        pass
+
+    async def on_quarantine(entries):
+        received.append(entries)
+
+    async def main():
+        server = FeedServer(snapshot, None, str(tmp_path/'feed.sock'))
+        await server.start()
+        server.publish_quarantine([entry]) # before the subscriber connects
+        client = FeedClient(ignore, ignore, server.path, on_quarantine=on_quarantine)
+        task = asyncio.create_task(client.run())
+        try:
+            await asyncio.wait_for(client.connected.wait(), 5)
+            server.publish_quarantine([entry]) # unchanged; not sent again
+            server.publish_quarantine([])
+            while len(received) < 2:
+                await asyncio.sleep(0.01)
+        finally:
+            task.cancel()
+            await server.stop()
+
+    asyncio.run(asyncio.wait_for(main(), 5))
+    assert received == [[entry], []]
@@ -0,0 +1,50 @@
+import pytest
+
+from history import PriceHistory
+
+
+@pytest.fixture
+def history(tmp_path):
+    history = PriceHistory(str(tmp_path/'history.sqlite3'))
+    yield history
+    history.close()
+
+def test_unchanged_samples_extend_a_run(history):
+    for ts in (10, 20, 30):
+        history.append('a.rune', ts, 100.0, 1.0)
+    history.append('a.rune', 40, 110.0, 1.0)
+    assert history.count('a.rune') == 2
+    assert history.range('a.rune', 0, 100) == [(10, 100.0, 1.0), (30, 100.0, 1.0), (40, 110.0, 1.0)]
+    assert history.latest('a.rune', 2) == [(30, 100.0, 1.0), (40, 110.0, 1.0)]
+
+def test_same_second_sample_keeps_the_first(history):
+    history.append('a.rune', 10, 100.0, 1.0)
+    history.append('a.rune', 10, 999.0, 1.0)
+    history.append_many([('b.rune', 10, 5.0, 1.0), ('b.rune', 10, 6.0, 1.0)])
+    assert history.range('a.rune', 0, 100) == [(10, 100.0, 1.0)]
+    assert history.range('b.rune', 0, 100) == [(10, 5.0, 1.0)]
+
+    history.append('a.rune', 20, 100.0, 1.0) # still one run after the ignored sample
+    assert history.count('a.rune') == 1
+    assert history.range('a.rune', 0, 100) == [(10, 100.0, 1.0), (20, 100.0, 1.0)]
+
+def test_same_second_sample_after_an_extended_run_is_dropped(history):
+    history.append_many([('a.rune', 100, 1.0, 1.0), ('a.rune', 200, 1.0, 1.0), ('a.rune', 200, 2.0, 1.0)])
+    history.append('a.rune', 200, 3.0, 1.0)
+    assert history.count('a.rune') == 1
+    assert history.range('a.rune', 0, 1000) == [(100, 1.0, 1.0), (200, 1.0, 1.0)]
+
+def test_runs_survive_reopening(history):
+    history.append('a.rune', 10, 100.0, 1.0)
+    history.append('a.rune', 20, 100.0, 1.0)
+    reopened = PriceHistory(history.path)
+    reopened.append('a.rune', 30, 100.0, 1.0)
+    assert reopened.count() == 1
+    assert reopened.runes() == ['a.rune']
+    assert reopened.range('a.rune', 0, 100) == [(10, 100.0, 1.0), (30, 100.0, 1.0)]
+    reopened.close()
+
+def test_run_started_and_extended_in_one_batch(history):
+    history.append_many([('a.rune', ts, 100.0, 1.0) for ts in (10, 20, 30)] + [('a.rune', 40, 110.0, 1.0)])
+    assert history.count('a.rune') == 2
+    assert history.range('a.rune', 0, 100) == [(10, 100.0, 1.0), (30, 100.0, 1.0), (40, 110.0, 1.0)]
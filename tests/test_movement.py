@@ -0,0 +1,84 @@
+import pytest
+
+from movement import MovementDetector
+
+
+T0 = 1_700_000_000
+
+def feed(detector, rune, prices, start=T0, step=5*60, volume=1.0):
+    """Feed one sample every `step` seconds; returns the timestamp of the last one.
+    """
+    for i, price in enumerate(prices):
+        detector.update(rune, start + i*step, price, volume)
+    return start + (len(prices) - 1)*step
+
+def test_jump_after_flat_stretch_alerts_on_shortest_window():
+    detector = MovementDetector()
+    ts = feed(detector, 'a.rune', [100.0]*24 + [120.0])
+
+    alert, = detector.evaluate()
+    assert (alert.rune, alert.window, alert.price, alert.ref_price, alert.timestamp) == ('a.rune', '15m', 120.0, 100.0, ts)
+    assert alert.percent_change == pytest.approx(20.0)
+
+def test_moves_below_threshold_do_not_alert():
+    detector = MovementDetector()
+    feed(detector, 'a.rune', [100.0]*24 + [104.0])
+    assert detector.evaluate() == []
+
+def test_reference_too_old_for_a_window_is_not_used():
+    detector = MovementDetector()
+    feed(detector, 'a.rune', [100.0, 150.0], step=2*60*60) # nothing scraped in between
+    assert detector.evaluate() == []
+
+def test_slow_drift_alerts_on_the_longer_window():
+    detector = MovementDetector()
+    feed(detector, 'a.rune', [100.0 - i for i in range(13)]) # -1 sats every 5 min for an hour
+
+    alert, = detector.evaluate()
+    assert alert.window == '1h'
+    assert alert.percent_change == pytest.approx(-12.0)
+
+@pytest.mark.parametrize('volume, jump, alerts', [
+    (0.01, 110.0, False), # thin market: threshold scaled up (at most 3x)
+    (0.01, 116.0, True),
+    (100.0, 103.0, True), # deep market: threshold scaled down (at most 0.5x)
+    ])
+def test_thresholds_scale_with_volume(volume, jump, alerts):
+    detector = MovementDetector()
+    feed(detector, 'a.rune', [100.0]*4 + [jump], volume=volume)
+    assert bool(detector.evaluate()) == alerts
+
+def test_alerted_window_cools_down():
+    detector = MovementDetector()
+    ts = feed(detector, 'a.rune', [100.0]*4 + [120.0])
+    detector.mark_alerted('a.rune', ts)
+    detector.update('a.rune', ts + 5*60, 130.0, 1.0)
+    assert detector.evaluate() == []
+
+    detector.update('a.rune', ts + 20*60, 150.0, 1.0) # alert is out of the 15m window
+    assert [alert.window for alert in detector.evaluate()] == ['15m']
+
+def test_evaluate_only_the_given_runes():
+    detector = MovementDetector()
+    feed(detector, 'a.rune', [100.0]*4 + [120.0])
+    feed(detector, 'b.rune', [100.0]*4 + [80.0])
+    assert [alert.rune for alert in detector.evaluate(['b.rune', 'unknown.rune'])] == ['b.rune']
+    assert sorted(alert.rune for alert in detector.evaluate()) == ['a.rune', 'b.rune']
+    assert detector.latest_timestamp('unknown.rune') == -1
+
+def test_rows_grow_and_rings_wrap():
+    detector = MovementDetector(windows=[('15m', 15*60, 5.0)], sample_interval=5*60)
+    for i in range(40): # more runes than the initial allocation
+        ts = feed(detector, f'rune.{i}', [100.0]*(3*detector.capacity) + [100.0 + i])
+    assert detector.latest_timestamp('rune.0') == ts
+    assert {alert.rune for alert in detector.evaluate()} == {f'rune.{i}' for i in range(5, 40)}
+
+def test_frequent_sampling_still_covers_the_longest_window():
+    detector = MovementDetector()
+    # +25% over a day, one sample a minute: too slow for 15m or 1h, but the ring must
+    # still reach back 24h
+    ts = feed(detector, 'a.rune', [100.0 + 25.0*i/(24*60) for i in range(24*60 + 1)], step=60)
+
+    alert, = detector.evaluate()
+    assert (alert.window, alert.timestamp) == ('24h', ts)
+    assert alert.percent_change == pytest.approx(25.0)
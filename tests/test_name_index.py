@@ -0,0 +1,49 @@
+import pytest
+
+from name_index import NameIndex, edit_distance
+
+
+@pytest.fixture
+def index():
+    index = NameIndex()
+    for name in ('satoshi.nakamoto', 'satoshi.nakamoto.gold', 'sat.stacker', 'dog.go.to.the.moon', 'rsic.genesis.rune'):
+        index.add(name)
+    index.add('doggy', 'dog.go.to.the.moon') # nickname
+    return index
+
+@pytest.mark.parametrize('a, b, distance', [('kitten', 'sitting', 3), ('rune', 'rune', 0), ('', 'abc', 3)])
+def test_edit_distance(a, b, distance):
+    assert edit_distance(a, b) == distance
+
+def test_edit_distance_gives_up_past_the_bound():
+    assert edit_distance('abcdef', 'uvwxyz', max_distance=2) == 3
+
+def test_prefix_matches_per_segment(index):
+    assert sorted(index.prefix_matches('sat.n')) == ['satoshi.nakamoto', 'satoshi.nakamoto.gold']
+    assert index.prefix_matches('sat.s') == ['sat.stacker']
+    assert index.prefix_matches('x') == []
+    assert index.prefix_matches('a.b.c.d.e.f.g') == []
+
+def test_search_ranks_exact_then_prefix_then_fuzzy(index):
+    assert [(match.rune, match.kind) for match in index.search('satoshi.nakamoto')] == [
+        ('satoshi.nakamoto', 'exact'), ('satoshi.nakamoto.gold', 'prefix')]
+    assert [match.kind for match in index.search('doggy')] == ['exact']
+    assert index.search('doggy')[0].rune == 'dog.go.to.the.moon'
+    fuzzy, = index.search('rsic.genesis.rume')
+    assert (fuzzy.rune, fuzzy.kind) == ('rsic.genesis.rune', 'fuzzy')
+
+def test_resolve_only_unambiguous_matches(index):
+    assert index.resolve('doggy') == 'dog.go.to.the.moon' # exact nickname
+    assert index.resolve('sat.s') == 'sat.stacker' # only match
+    assert index.resolve('rsic.genesis.rume') == 'rsic.genesis.rune' # one typo, nothing else close
+    assert index.resolve('satoshi.nakamoto') == 'satoshi.nakamoto'
+    assert index.resolve('sat') is None # three runes start with it
+    assert index.resolve('sat.n') is None
+    assert index.resolve('unknown.rune.name') is None
+
+def test_removed_names_are_not_found(index):
+    index.remove('sat.stacker')
+    index.remove('not.indexed')
+    assert 'sat.stacker' not in index and len(index) == 5
+    assert index.resolve('sat.s') is None
+    assert sorted(index.prefix_matches('sat')) == ['satoshi.nakamoto', 'satoshi.nakamoto.gold']
@@ -0,0 +1,66 @@
+import json
+
+import pytest
+
+from persistence import DbStore, GENERATION_KEY
+
+
+def sample(rune, ts, price, volume=1.0):
+    return {'rune': rune, 'set': {'url': f'https://unisat.io/runes/market?tick={rune.upper()}', 'volume': volume},
+            'sample': [ts, price]}
+
+@pytest.fixture
+def store(tmp_path):
+    return DbStore(str(tmp_path/'runes_db.json'), price_array_len=5, compact_every=3)
+
+def samples(entries, rune):
+    window = entries[rune]['price_window']
+    return [(window.timestamp(i), window.price(i)) for i in range(len(window))]
+
+def test_recover_replays_the_journal(store):
+    store.append([sample('a.rune', 1, 100.0), sample('b.rune', 1, 5.0)])
+    store.append([sample('a.rune', 2, 110.0, volume=2.0), {'last_updated': "12:00:00 PM, 01/01/2025"}])
+    store.set_fields('a.rune', {'last_notified': 2})
+
+    entries = DbStore(store.snapshot_path, 5).recover()
+    assert samples(entries, 'a.rune') == [(1, 100.0), (2, 110.0)]
+    assert entries['a.rune']['volume'] == 2.0
+    assert entries['a.rune']['last_notified'] == 2
+    assert entries['b.rune']['last_notified'] == -1
+    assert entries['last_updated'] == "12:00:00 PM, 01/01/2025"
+
+def test_torn_last_line_is_ignored(store):
+    store.append([sample('a.rune', 1, 100.0), sample('a.rune', 2, 110.0)])
+    with open(store.journal_path, 'a') as file:
+        file.write('{"rune":"a.rune","sample":[3,')
+
+    assert samples(DbStore(store.snapshot_path, 5).recover(), 'a.rune') == [(1, 100.0), (2, 110.0)]
+
+def test_snapshot_starts_a_new_generation(store):
+    store.append([sample('a.rune', 1, 100.0), sample('a.rune', 2, 110.0)])
+    assert not store.compact_if_needed(store.recover())
+    store.append([sample('a.rune', 3, 120.0)])
+    assert store.compact_if_needed(store.recover())
+    store.append([sample('a.rune', 4, 130.0)])
+
+    with open(store.journal_path) as file:
+        assert json.loads(file.readline()) == {GENERATION_KEY: 1}
+    recovered = DbStore(store.snapshot_path, 5)
+    entries = recovered.recover()
+    assert samples(entries, 'a.rune') == [(1, 100.0), (2, 110.0), (3, 120.0), (4, 130.0)]
+    assert not recovered.needs_compaction()
+
+def test_journal_left_by_a_crash_mid_compaction_is_not_replayed(store):
+    store.append([sample('a.rune', 1, 100.0), sample('a.rune', 2, 110.0)])
+    entries = store.recover()
+    with open(store.journal_path) as file:
+        journal = file.read()
+    store.snapshot(entries)
+    with open(store.journal_path, 'w') as file: # crashed before the new journal was written
+        file.write(journal)
+
+    assert samples(DbStore(store.snapshot_path, 5).recover(), 'a.rune') == [(1, 100.0), (2, 110.0)]
+
+def test_window_keeps_the_newest_samples(store):
+    store.append([sample('a.rune', ts, 100.0 + ts) for ts in range(8)])
+    assert samples(DbStore(store.snapshot_path, 5).recover(), 'a.rune') == [(ts, 100.0 + ts) for ts in range(3, 8)]
@@ -0,0 +1,87 @@
+import asyncio
+
+import pytest
+
+from refresh import RefreshCoordinator
+
+
+class FakeScraper:
+    def __init__(self, clock):
+        self.clock = clock
+        self.batches = []
+        self.last_updated = {}
+        self.release = asyncio.Event()
+        self.error = None
+
+    async def scrape(self, rune_names):
+        self.batches.append(list(rune_names))
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        for rune in rune_names:
+            self.last_updated[rune] = self.clock.now
+
+def coordinator(clock, max_age=60):
+    scraper = FakeScraper(clock)
+    return scraper, RefreshCoordinator(scraper.scrape, scraper.last_updated.get, max_age)
+
+def test_fresh_runes_are_not_rescraped(clock):
+    async def main():
+        scraper, refresher = coordinator(clock)
+        scraper.release.set()
+        scraper.last_updated['fresh.rune'] = clock.now - 30
+        scraper.last_updated['stale.rune'] = clock.now - 90
+        outcomes = await refresher.refresh_many(['fresh.rune', 'stale.rune', 'new.rune', 'stale.rune'])
+        assert outcomes == {'fresh.rune': 'fresh', 'stale.rune': 'refreshed', 'new.rune': 'refreshed'}
+        assert scraper.batches == [['stale.rune', 'new.rune']]
+        assert await refresher.refresh('fresh.rune', max_age=0) == 'refreshed'
+
+    asyncio.run(main())
+
+def test_concurrent_requests_join_the_scrape_in_flight(clock):
+    async def main():
+        scraper, refresher = coordinator(clock)
+        first = asyncio.create_task(refresher.refresh_many(['a.rune', 'b.rune']))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(refresher.refresh_many(['b.rune', 'c.rune']))
+        await asyncio.sleep(0)
+        assert refresher.in_flight('b.rune')
+        scraper.release.set()
+        assert await first == {'a.rune': 'refreshed', 'b.rune': 'refreshed'}
+        assert await second == {'b.rune': 'joined', 'c.rune': 'refreshed'}
+        assert scraper.batches == [['a.rune', 'b.rune'], ['c.rune']]
+        assert not refresher.in_flight('b.rune')
+
+    asyncio.run(main())
+
+def test_failed_scrape_raises_for_its_caller_only(clock):
+    async def main():
+        scraper, refresher = coordinator(clock)
+        scraper.error = RuntimeError("page crashed")
+        first = asyncio.create_task(refresher.refresh_many(['a.rune']))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(refresher.refresh_many(['a.rune']))
+        await asyncio.sleep(0)
+        scraper.release.set()
+        with pytest.raises(RuntimeError):
+            await first
+        assert await second == {'a.rune': 'joined'}
+        assert not refresher.in_flight('a.rune')
+
+    asyncio.run(main())
+
+def test_single_flight_shares_one_call():
+    calls = []
+
+    async def factory():
+        calls.append(None)
+        await asyncio.sleep(0)
+        return len(calls)
+
+    async def main():
+        refresher = RefreshCoordinator(None, lambda rune: None)
+        results = await asyncio.gather(*[refresher.single_flight('key', factory) for _ in range(3)])
+        assert results == [1, 1, 1]
+        assert await refresher.single_flight('key', factory) == 2
+
+    asyncio.run(main())
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+import runescrape
+from runescrape import PRICE_VOLUME_EXTRACTORS, MINT_AMOUNT_EXTRACTORS
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.calls = []
+
+    async def extract_elements(self, url_list, extract_funcs, selectors_list):
+        self.calls.append((list(url_list), list(extract_funcs), list(selectors_list)))
+        return [[1.0, 2.0] for _ in url_list]
+
+@pytest.mark.parametrize('mode, expected', [('dom', 'dom'), ('network', 'network'), ('http', 'network')])
+def test_browser_runs_page_extractors_for_every_mode(mode, expected):
+    browser = FakeBrowser()
+    url = runescrape.rune_name_std_to_prices_url('a.rune')
+    asyncio.run(runescrape.extract_with_tables(browser.extract_elements, [url, url],
+                                               [PRICE_VOLUME_EXTRACTORS, MINT_AMOUNT_EXTRACTORS], [mode, mode]))
+
+    (_, extract_funcs, selectors_list), = browser.calls
+    assert extract_funcs == [PRICE_VOLUME_EXTRACTORS[expected][0], MINT_AMOUNT_EXTRACTORS[expected][0]]
+    assert selectors_list == [PRICE_VOLUME_EXTRACTORS[expected][1], MINT_AMOUNT_EXTRACTORS[expected][1]]
+
+class FakePage:
+    """Answers the in-page field lookup with canned matches.
+    """
+    def __init__(self, found):
+        self.url = runescrape.rune_name_std_to_prices_url('a.rune')
+        self.found = found
+        self.args = None
+
+    async def evaluate(self, script, args):
+        self.args = args
+        return self.found
+
+def test_extract_fields_uses_fallback_matches():
+    metrics = runescrape.METRICS
+    key = ('selector_fallbacks', (('field', 'volume'), ('index', '1')))
+    before = metrics.counters.get(key, 0)
+    page = FakePage([{'text': '1,234.5', 'index': 0}, {'text': '12.5 BTC', 'index': 1}])
+
+    assert asyncio.run(runescrape.extract_fields(['price', 'volume'], page)) == [1234.5, 12.5]
+    assert page.args['fields'] == [runescrape.REGISTRY.selectors('price'), runescrape.REGISTRY.selectors('volume')]
+    assert metrics.counters[key] == before + 1
+
+def test_extract_fields_returns_the_error_for_a_missing_field():
+    page = FakePage([{'text': '10', 'index': 0}, None])
+    error = asyncio.run(runescrape.extract_fields(['price', 'volume'], page))
+    assert isinstance(error, TimeoutError) and 'volume' in str(error)
+
+@pytest.mark.parametrize('text', ['--', '1.2.3', 'Vol 24h 1.5'])
+def test_extract_fields_rejects_text_that_is_not_one_number(text):
+    error = asyncio.run(runescrape.extract_fields(['price'], FakePage([{'text': text, 'index': 0}])))
+    assert isinstance(error, ValueError) and repr(text) in str(error)
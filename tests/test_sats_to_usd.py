@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+import requests
+
+import sats_to_usd
+from sats_to_usd import BtcRateService
+
+
+class FakeResponse:
+    def __init__(self, status, payload):
+        self.status = status
+        self.payload = payload
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise requests.HTTPError(f"{self.status} error")
+
+    def json(self):
+        return self.payload
+
+
+def test_no_usd_value_before_the_first_rate():
+    rates = BtcRateService()
+    assert rates.convert(1000) is None
+    assert rates.convert_many([1000, 2000]) == [None, None]
+    assert not rates.fresh
+
+def test_conversion_with_the_cached_rate():
+    rates = BtcRateService()
+    rates._store(0.0006)
+    assert rates.fresh
+    assert rates.convert(1000) == 0.6
+    assert rates.convert_many([1000, 2000]) == [0.6, 1.2]
+    assert np.allclose(rates.convert_many(np.array([1000.0, 2000.0])), [0.6, 1.2])
+
+def test_blocking_refresh_falls_back_to_the_last_rate(monkeypatch):
+    responses = [FakeResponse(429, {'status': {'error_code': 429}})]
+    monkeypatch.setattr(sats_to_usd.requests, 'get', lambda *args, **kwargs: responses.pop(0))
+    rates = BtcRateService(ttl=0)
+    with pytest.raises(requests.HTTPError): # nothing to fall back to
+        rates.get_rate_blocking()
+
+    responses = [FakeResponse(200, {'bitcoin': {'usd': 60000}}), FakeResponse(429, {})]
+    assert rates.get_rate_blocking() == pytest.approx(0.0006)
+    assert rates.get_rate_blocking() == pytest.approx(0.0006) # stale, refresh failed
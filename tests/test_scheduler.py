@@ -0,0 +1,79 @@
+import math
+from types import SimpleNamespace
+
+import pytest
+
+import scheduler
+from scheduler import ScrapeScheduler, BASE_INTERVAL, MIN_INTERVAL, MAX_INTERVAL, INTERVAL_JITTER
+
+
+def rune_stats(volatility=0.0, volume=None, count=10):
+    return SimpleNamespace(count=count, volatility=volatility, ewma_volume=volume)
+
+def test_new_runes_are_due_immediately_and_handed_out_once(clock):
+    queue = ScrapeScheduler()
+    queue.add('a.rune')
+    assert queue.pop_due() == ['a.rune']
+    clock.advance(MAX_INTERVAL)
+    assert queue.pop_due() == [] # in flight until rescheduled
+
+    due = queue.reschedule('a.rune')
+    assert BASE_INTERVAL*(1 - INTERVAL_JITTER) <= due - clock.now <= BASE_INTERVAL*(1 + INTERVAL_JITTER)
+    clock.advance(due - clock.now)
+    assert queue.pop_due() == ['a.rune']
+
+def test_most_overdue_first(clock):
+    queue = ScrapeScheduler()
+    queue.add('late.rune', due=clock.now - 10)
+    queue.add('later.rune', due=clock.now - 20)
+    queue.add('future.rune', due=clock.now + 10)
+    assert queue.pop_due() == ['later.rune', 'late.rune']
+    assert queue.next_due() == clock.now + 10
+
+def test_budget_holds_runes_back(clock, monkeypatch):
+    monotonic = SimpleNamespace(now=0.0)
+    monkeypatch.setattr(scheduler.time, 'monotonic', lambda: monotonic.now)
+    queue = ScrapeScheduler(budget_per_min=2)
+    for i in range(5):
+        queue.add(f'rune.{i}', due=clock.now - i)
+    assert len(queue.pop_due()) == 2
+    assert queue.pop_due() == []
+    monotonic.now += 30 # refills one token
+    assert queue.pop_due() == ['rune.2']
+
+def test_removed_and_deferred_runes(clock):
+    queue = ScrapeScheduler()
+    queue.add('gone.rune')
+    queue.add('deferred.rune')
+    queue.remove('gone.rune')
+    queue.defer('deferred.rune', clock.now + 60)
+    assert queue.pop_due() == []
+    assert queue.next_due() == clock.now + 60
+    assert 'gone.rune' not in queue and len(queue) == 1
+
+def test_defer_leaves_later_and_popped_runes(clock):
+    queue = ScrapeScheduler()
+    queue.add('later.rune', due=clock.now + 120)
+    queue.add('popped.rune')
+    queue.pop_due()
+    queue.defer('later.rune', clock.now + 60)
+    queue.defer('popped.rune', clock.now + 60)
+    assert queue.next_due() == clock.now + 120
+    assert queue._due['popped.rune'] == math.inf
+
+@pytest.mark.parametrize('stats, expected', [
+    (None, BASE_INTERVAL),
+    (rune_stats(count=1, volatility=100.0), BASE_INTERVAL),
+    (rune_stats(), MAX_INTERVAL),
+    (rune_stats(volatility=1.0), BASE_INTERVAL),
+    (rune_stats(volatility=100.0), MIN_INTERVAL),
+    ])
+def test_interval_follows_activity(clock, stats, expected):
+    assert ScrapeScheduler().interval('a.rune', stats) == pytest.approx(expected)
+
+def test_interest_shortens_interval_and_decays(clock):
+    queue = ScrapeScheduler()
+    queue.record_interest('a.rune')
+    assert queue.interval('a.rune', rune_stats()) == pytest.approx(BASE_INTERVAL)
+    clock.advance(scheduler.INTEREST_HALF_LIFE)
+    assert queue.interest('a.rune') == pytest.approx(0.5)
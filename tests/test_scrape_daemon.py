@@ -0,0 +1,51 @@
+import asyncio
+
+import scheduler
+from history import PriceHistory
+from scrape_daemon import ScrapeDaemon
+
+
+def test_failed_scheduled_refresh_is_rescheduled(tmp_path, clock, monkeypatch):
+    daemon = ScrapeDaemon(db_path=str(tmp_path/'runes_db.json'),
+                          socket_path=str(tmp_path/'feed.sock'),
+                          browser=object(),
+                          history=PriceHistory(str(tmp_path/'history.sqlite3')))
+    broadcasts = []
+
+    async def refresh(rune_names):
+        raise RuntimeError("browser crashed")
+
+    monkeypatch.setattr(daemon, 'refresh', refresh)
+    monkeypatch.setattr(daemon.server, '_broadcast', broadcasts.append)
+    daemon.scheduler.add('a.rune')
+
+    asyncio.run(daemon.refresh_scheduled(daemon.scheduler.pop_due()))
+    assert broadcasts == [{'type': 'refreshed', 'runes': ['a.rune'], 'failed': ['a.rune']}]
+    assert daemon.scheduler.pop_due() == []
+    clock.advance(scheduler.MAX_INTERVAL)
+    assert daemon.scheduler.pop_due() == ['a.rune']
+
+def test_bulk_refresh_request_skips_quarantined_runes(tmp_path, clock, monkeypatch):
+    daemon = ScrapeDaemon(db_path=str(tmp_path/'runes_db.json'),
+                          socket_path=str(tmp_path/'feed.sock'),
+                          browser=object(),
+                          history=PriceHistory(str(tmp_path/'history.sqlite3')))
+    broadcasts, scraped = [], []
+
+    async def scrape(url_list, extractor_tables, modes):
+        scraped.append(url_list)
+        raise RuntimeError("browser crashed")
+
+    monkeypatch.setattr(daemon, 'scrape', scrape)
+    monkeypatch.setattr(daemon.server, '_broadcast', broadcasts.append)
+    daemon.runes_db = {'a.rune': {'url': 'https://example.com/a'}, 'b.rune': {'url': 'https://example.com/b'}}
+    for name in daemon.runes_db:
+        for _ in range(daemon.breaker.failures):
+            daemon.breaker.record_failure(name, TimeoutError())
+
+    asyncio.run(daemon.handle_request({'op': 'refresh', 'runes': ['a.rune', 'b.rune']}))
+    assert scraped == []
+    assert broadcasts == [{'type': 'refreshed', 'runes': ['a.rune', 'b.rune'], 'failed': ['a.rune', 'b.rune']}]
+
+    asyncio.run(daemon.handle_request({'op': 'refresh', 'runes': ['a.rune']})) # named; scraped anyway
+    assert scraped == [['https://example.com/a']]
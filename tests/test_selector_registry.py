@@ -0,0 +1,36 @@
+import json
+
+import pytest
+
+from selector_registry import SelectorRegistry, DEFAULT_REGISTRY
+
+
+def test_override_replaces_only_the_fields_it_lists():
+    registry = SelectorRegistry()
+    assert registry.update({'version': 2, 'fields': {'price': ['span.new-price']}})
+    assert registry.version == 2
+    assert registry.selectors('price') == ['span.new-price']
+    assert registry.selectors('volume') == DEFAULT_REGISTRY['fields']['volume']
+    assert registry.primaries(['price', 'volume']) == ['span.new-price', DEFAULT_REGISTRY['fields']['volume'][0]]
+
+def test_outdated_override_is_ignored():
+    registry = SelectorRegistry({'version': 3, 'fields': {'price': ['span.price']}})
+    assert not registry.update({'version': 2, 'fields': {'price': ['span.old-price']}})
+    assert (registry.version, registry.selectors('price')) == (3, ['span.price'])
+
+def test_empty_entry_is_rejected_without_applying_any():
+    registry = SelectorRegistry()
+    with pytest.raises(ValueError, match='volume'):
+        registry.update({'version': 2, 'fields': {'price': ['span.new-price'], 'volume': []}})
+    assert registry.version == DEFAULT_REGISTRY['version']
+    assert registry.selectors('price') == DEFAULT_REGISTRY['fields']['price']
+
+def test_load_applies_a_json_file(tmp_path):
+    path = tmp_path/'selectors.json'
+    path.write_text(json.dumps({'version': 5, 'fields': {'mint_amount': ['div.mint']}}))
+    registry = SelectorRegistry.load(str(path))
+    assert (registry.version, registry.selectors('mint_amount')) == (5, ['div.mint'])
+
+    path.write_text(json.dumps({'version': 0, 'fields': {'mint_amount': ['div.mint']}}))
+    assert SelectorRegistry.load(str(path)).selectors('mint_amount') == DEFAULT_REGISTRY['fields']['mint_amount']
+    assert SelectorRegistry.load(None).version == DEFAULT_REGISTRY['version']
@@ -0,0 +1,94 @@
+import pytest
+
+import sheets
+from price_window import PriceWindow
+from sheets import SheetsSync, RUNE_NOT_FOUND
+
+
+class FakeWorksheet:
+    def __init__(self, names):
+        self.names = names
+        self.batches = []
+        self.error = None
+
+    def col_values(self, col):
+        assert col == 1
+        return ['Rune'] + self.names + ['Totals']
+
+    def batch_update(self, updates):
+        if self.error is not None:
+            raise self.error
+        self.batches.append({update['range']: update['values'][0][0] for update in updates})
+
+class FakeClient:
+    def __init__(self, worksheet):
+        self.worksheet_ = worksheet
+
+    def open_by_url(self, url):
+        return self
+
+    def worksheet(self, name):
+        assert name == sheets.WORKSHEET_NAME
+        return self.worksheet_
+
+def entry(price):
+    window = PriceWindow(20)
+    window.append(price, 1000)
+    return {'price_window': window, 'volume': 1.0}
+
+@pytest.fixture
+def rate(monkeypatch):
+    rate = {'usd_per_sat': 0.001}
+    monkeypatch.setattr(sheets.RATES, 'get_rate_blocking', lambda: rate['usd_per_sat'])
+    return rate
+
+@pytest.fixture
+def worksheet():
+    return FakeWorksheet(['A•RUNE', 'B•RUNE', 'C•RUNE'])
+
+@pytest.fixture
+def sync(worksheet):
+    sync = SheetsSync(client_factory=lambda: FakeClient(worksheet))
+    sync.publish_all({'last_updated': "12:00:00 PM, 01/01/2025", 'a.rune': entry(100.0), 'b.rune': entry(200.0)})
+    return sync
+
+def test_flush_writes_only_changed_cells_in_one_batch(sync, worksheet, rate):
+    assert sync.flush() == 3
+    assert worksheet.batches == [{'P2': pytest.approx(0.1), 'P3': pytest.approx(0.2), 'P4': RUNE_NOT_FOUND}]
+
+    sync.publish({'a.rune': 100.0, 'b.rune': 250.0, 'not.on.sheet': 1.0})
+    assert sync.flush() == 1
+    assert worksheet.batches[-1] == {'P3': pytest.approx(0.25)}
+
+    assert sync.flush() == 0
+    assert len(worksheet.batches) == 2
+
+def test_rate_change_rewrites_every_price(sync, worksheet, rate):
+    sync.flush()
+    rate['usd_per_sat'] = 0.002
+    assert sync.flush() == 2 # missing runes do not depend on the rate
+    assert worksheet.batches[-1] == {'P2': pytest.approx(0.2), 'P3': pytest.approx(0.4)}
+
+def test_reopen_rewrites_every_row(sync, worksheet, rate):
+    sync.flush()
+    sync.open()
+    assert sync.flush() == 3
+    assert worksheet.batches[-1].keys() == {'P2', 'P3', 'P4'}
+
+def test_failed_batch_is_retried(sync, worksheet, rate):
+    worksheet.error = ConnectionError("quota exceeded")
+    with pytest.raises(ConnectionError):
+        sync.flush()
+    worksheet.error = None
+    assert sync.flush() == 3
+
+def test_missing_rate_keeps_the_worksheet_and_the_queue(sync, worksheet, monkeypatch):
+    def no_rate():
+        raise ConnectionError("rate limited")
+
+    monkeypatch.setattr(sheets.RATES, 'get_rate_blocking', no_rate)
+    assert sync.flush() == 0
+    assert sync.worksheet is worksheet and worksheet.batches == []
+
+    monkeypatch.setattr(sheets.RATES, 'get_rate_blocking', lambda: 0.001)
+    assert sync.flush() == 3
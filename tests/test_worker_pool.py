@@ -0,0 +1,82 @@
+import queue
+import asyncio
+import threading
+
+import pytest
+
+import worker_pool
+from worker_pool import ScrapeWorkerPool, _next_task
+from fake_service import FakeBrowserService
+
+
+URLS = [f'https://magiceden.io/runes/RUNE•{i}' for i in range(8)]
+
+def run(pool, coro):
+    """Run `coro` and stop `pool` in the same event loop its result reader delivers to.
+    """
+    async def main():
+        try:
+            return await coro
+        finally:
+            await pool.stop()
+    return asyncio.run(main())
+
+async def scrape(pool, urls):
+    return await pool.extract_elements(urls, [None]*len(urls), [[]]*len(urls))
+
+@pytest.fixture
+def make_pool(monkeypatch):
+    monkeypatch.setattr(worker_pool, 'HOST_RATE_PER_SEC', 1.0)
+    monkeypatch.setattr(worker_pool, 'HOST_BURST', 3)
+    return lambda workers: ScrapeWorkerPool(workers, pages_per_worker=1, service_class=FakeBrowserService)
+
+def test_host_budget_is_split_within_the_limits(make_pool):
+    pool = make_pool(2)
+    budgets = [pool._host_budget(worker_id) for worker_id in range(pool.workers)]
+    assert budgets == [(0.5, 2), (0.5, 1)]
+    assert make_pool(5).workers == 3 # one whole token of burst per worker
+
+def test_urls_shard_by_hash_and_results_keep_their_index(make_pool):
+    pool = make_pool(2)
+    assert [pool._shard(url) for url in URLS] == [pool._shard(url) for url in URLS]
+    assert {pool._shard(url) for url in URLS} == {0, 1}
+
+    elements = run(pool, scrape(pool, URLS))
+    assert [element[3] for element in elements] == URLS
+    assert {(rate, burst) for _, rate, burst, _ in elements} <= {(0.5, 2), (0.5, 1)}
+
+def test_idle_worker_steals_from_other_shards():
+    shards = [queue.Queue(), queue.Queue()]
+    shards[1].put('task')
+    stop = threading.Event()
+    assert _next_task(0, shards, stop) == 'task'
+    stop.set()
+    assert _next_task(0, shards, stop) is None
+
+def test_batch_timeout_fails_the_missing_urls_and_purges_their_tasks(make_pool, monkeypatch):
+    monkeypatch.setattr(worker_pool, 'BATCH_TIMEOUT', 0.5)
+    pool = make_pool(1)
+    urls = [URLS[0] + '/slow', URLS[1], URLS[2]] # the only page is busy with the slow one
+
+    async def scrape_and_drain():
+        elements = await scrape(pool, urls)
+        with pytest.raises(queue.Empty):
+            pool._shards[0].get(timeout=0.5)
+        return elements
+
+    elements = run(pool, scrape_and_drain())
+    assert all(isinstance(element, TimeoutError) for element in elements)
+
+def test_dead_worker_is_respawned(make_pool, monkeypatch):
+    monkeypatch.setattr(worker_pool, 'BATCH_TIMEOUT', 2)
+    pool = make_pool(1)
+
+    async def crash_then_scrape():
+        crashed, = await scrape(pool, [URLS[0] + '/crash'])
+        await asyncio.to_thread(pool._processes[0].join, 5)
+        return crashed, await scrape(pool, [URLS[1]])
+
+    crashed, (element,) = run(pool, crash_then_scrape())
+    assert isinstance(crashed, TimeoutError)
+    assert element[3] == URLS[1]
+    assert pool.restarts == 1
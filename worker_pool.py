@@ -0,0 +1,254 @@
+
+import os
+import zlib
+import queue
+import random
+import pickle
+import asyncio
+import itertools
+import threading
+import multiprocessing
+
+from typing import AsyncIterator, Callable, Dict, List, Tuple, Union
+
+from browser_service import BrowserService
+from runescrape import SCRAPE_CONCURRENCY, HOST_RATE_PER_SEC, HOST_BURST, HostRateLimiter
+
+
+# Config variables
+SCRAPE_WORKERS = int(os.getenv('SCRAPE_WORKERS', 0)) # worker processes; 0 scrapes in the bot's process
+STEAL_POLL = 0.05 # s a worker waits on its own shard before trying to steal again
+BATCH_TIMEOUT = 5*60 # s without any result after which a batch's missing URLs are failed
+
+
+def _picklable(result):
+    """Playwright errors do not always pickle; send those back as RuntimeError with the message.
+    """
+    try:
+        pickle.dumps(result)
+        return result
+    except Exception:
+        return RuntimeError(f"{type(result).__name__}: {result}")
+
+def _next_task(worker_id: int, shards: list, stop) -> tuple:
+    """Take a task from this worker's shard, or steal one from another shard; None on shutdown.
+    """
+    others = [shard for i, shard in enumerate(shards) if i != worker_id]
+    while not stop.is_set():
+        try:
+            return shards[worker_id].get_nowait()
+        except queue.Empty:
+            pass
+        random.shuffle(others)
+        for shard in others:
+            try:
+                return shard.get_nowait()
+            except queue.Empty:
+                pass
+        try:
+            return shards[worker_id].get(timeout=STEAL_POLL)
+        except queue.Empty:
+            pass
+    return None
+
+async def _worker_loop(worker_id: int, shards: list, results, stop, pages: int,
+                       rate: float, burst: int, service_class, launch_kwargs: dict) -> None:
+    service = service_class(pages, **launch_kwargs)
+    await service.start()
+    rate_limiter = HostRateLimiter(rate, burst)
+
+    async def page_loop():
+        while True:
+            task = await asyncio.to_thread(_next_task, worker_id, shards, stop)
+            if task is None:
+                return
+            batch, i, url, extract_func, selectors = task
+            try:
+                elements = await service.extract_elements([url], [extract_func], [selectors],
+                                                          concurrency=1, rate_limiter=rate_limiter)
+                result = elements[0]
+            except Exception as e:
+                result = e
+            results.put((batch, i, _picklable(result)))
+
+    try:
+        await asyncio.gather(*[page_loop() for _ in range(pages)])
+    finally:
+        await service.stop()
+
+def _worker_main(*args) -> None:
+    """Entry point of a worker process.
+    """
+    try:
+        asyncio.run(_worker_loop(*args))
+    except KeyboardInterrupt:
+        pass
+
+class ScrapeWorkerPool:
+    """Scrapes across worker processes, each running its own Chromium via `BrowserService`.
+
+    URLs are sharded by hash so a rune keeps landing on the same worker, and idle
+    workers steal from other shards so one slow page does not hold a shard back.
+    Results stream back over a queue. Same `start`/`stop`/`extract_elements`
+    contract as `BrowserService`, so the bot can use either. The per-host rate
+    and burst are split between the workers so their sum stays within the limit;
+    every worker needs a whole token of burst, so there are at most HOST_BURST.
+    """
+    def __init__(self,
+                 workers: int = SCRAPE_WORKERS or os.cpu_count(),
+                 pages_per_worker: int = SCRAPE_CONCURRENCY,
+                 service_class = BrowserService,
+                 **launch_kwargs):
+        self.workers = max(1, min(workers, HOST_BURST))
+        if self.workers < workers:
+            print(f"Using {self.workers} scrape workers instead of {workers}: HOST_BURST is {HOST_BURST}.")
+        self.pages_per_worker = pages_per_worker
+        self.service_class = service_class
+        self.launch_kwargs = launch_kwargs
+        self.restarts = 0
+
+        self._mp = multiprocessing.get_context('spawn') # never fork the bot's event loop
+        self._shards = [self._mp.Queue() for _ in range(self.workers)]
+        self._results = self._mp.Queue()
+        self._stop = self._mp.Event()
+        self._processes: List[multiprocessing.Process] = [None]*self.workers
+        self._reader: threading.Thread = None
+        self._loop: asyncio.AbstractEventLoop = None
+        self._batches: Dict[int, asyncio.Queue] = {}
+        self._batch_ids = itertools.count()
+
+    @property
+    def running(self) -> bool:
+        return any(process is not None and process.is_alive() for process in self._processes)
+
+    def _host_budget(self, worker_id: int) -> Tuple[float, int]:
+        """(rate, burst) of the per-host limit given to `worker_id`.
+        """
+        burst = HOST_BURST//self.workers + (1 if worker_id < HOST_BURST % self.workers else 0)
+        return HOST_RATE_PER_SEC/self.workers, burst
+
+    def _spawn(self, worker_id: int) -> None:
+        rate, burst = self._host_budget(worker_id)
+        process = self._mp.Process(target=_worker_main,
+                                   args=(worker_id, self._shards, self._results, self._stop, self.pages_per_worker,
+                                         rate, burst, self.service_class, self.launch_kwargs),
+                                   name=f'scrape-worker-{worker_id}',
+                                   daemon=True)
+        process.start()
+        self._processes[worker_id] = process
+
+    def _ensure_workers(self) -> None:
+        """(Re)spawn workers that are not running; a dead worker's queued URLs get stolen meanwhile.
+        """
+        for worker_id, process in enumerate(self._processes):
+            if process is None or not process.is_alive():
+                if process is not None:
+                    self.restarts += 1
+                    print(f"Restarting scrape worker {worker_id} (exit code {process.exitcode})...")
+                self._spawn(worker_id)
+
+    async def start(self) -> None:
+        """Spawn the workers and the result reader. Safe to call repeatedly.
+        """
+        self._loop = asyncio.get_running_loop()
+        self._stop.clear()
+        self._ensure_workers()
+        if self._reader is None or not self._reader.is_alive():
+            self._reader = threading.Thread(target=self._read_results, name='scrape-results', daemon=True)
+            self._reader.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        for process in self._processes:
+            if process is not None:
+                await asyncio.to_thread(process.join, 10)
+                if process.is_alive():
+                    process.terminate()
+        self._processes = [None]*self.workers
+        if self._reader is not None:
+            self._results.put(None)
+            await asyncio.to_thread(self._reader.join, 10)
+            self._reader = None
+
+    def _read_results(self) -> None:
+        while True:
+            item = self._results.get()
+            if item is None:
+                return
+            self._loop.call_soon_threadsafe(self._deliver, *item)
+
+    def _deliver(self, batch: int, i: int, result) -> None:
+        results = self._batches.get(batch)
+        if results is not None: # late results of a timed-out batch are dropped
+            results.put_nowait((i, result))
+
+    def _purge(self, batch: int) -> int:
+        """Drop the tasks of `batch` no worker has taken yet; returns how many were dropped.
+        """
+        dropped = 0
+        for shard in self._shards:
+            keep = []
+            while True:
+                try:
+                    task = shard.get_nowait()
+                except queue.Empty:
+                    break
+                if task[0] == batch:
+                    dropped += 1
+                else:
+                    keep.append(task)
+            for task in keep:
+                shard.put(task)
+        return dropped
+
+    def _shard(self, url: str) -> int:
+        return zlib.crc32(url.encode()) % self.workers
+
+    async def stream(self,
+                     url_list: List[str],
+                     extract_func_list: List[Callable],
+                     selectors_list: List[list]) -> AsyncIterator[Tuple[int, Union[List[float], float]]]:
+        """Yield (index in url_list, result) as workers finish, in completion order.
+        """
+        if self._loop is None or not self.running:
+            await self.start()
+        else:
+            self._ensure_workers()
+
+        batch = next(self._batch_ids)
+        results = self._batches[batch] = asyncio.Queue()
+        pending = set(range(len(url_list)))
+        try:
+            for i, (url, extract_func, selectors) in enumerate(zip(url_list, extract_func_list, selectors_list)):
+                self._shards[self._shard(url)].put((batch, i, url, extract_func, selectors))
+
+            while pending:
+                try:
+                    i, result = await asyncio.wait_for(results.get(), BATCH_TIMEOUT)
+                except asyncio.TimeoutError:
+                    self._purge(batch) # so workers do not go on to scrape URLs already failed here
+                    timed_out, pending = sorted(pending), set()
+                    for i in timed_out:
+                        yield i, TimeoutError(f"No result for {url_list[i]} from the scrape workers")
+                    return
+                if i in pending:
+                    pending.discard(i)
+                    yield i, result
+        finally:
+            del self._batches[batch]
+            if pending: # abandoned by the caller
+                self._purge(batch)
+
+    async def extract_elements(self,
+                               url_list: List[str],
+                               extract_func_list: List[Callable],
+                               selectors_list: List[list],
+                               concurrency: int = None,
+                               rate_limiter: HostRateLimiter = None) -> List[Union[List[float], float]]:
+        """Same contract as `BrowserService.extract_elements`; `concurrency` and `rate_limiter`
+        are fixed per worker and ignored here.
+        """
+        elements = [None]*len(url_list)
+        async for i, result in self.stream(url_list, extract_func_list, selectors_list):
+            elements[i] = result
+        return elements